@@ -6,11 +6,15 @@ Each agent is specialized for different forecasting and analysis tasks
 """
 from phi.agent import Agent
 from phi.model.openai import OpenAIChat
-from typing import Dict, Any, Optional, List
+from openai import OpenAI
+from typing import Dict, Any, Callable, Optional, List
+import httpx
 import logging
 import os
 from dotenv import load_dotenv
 
+from llm_providers import LLMProvider, ProviderAgent, get_llm_provider
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -19,14 +23,37 @@ logger = logging.getLogger(__name__)
 class AgentFactory:
     """Factory for creating specialized agents"""
 
-    def __init__(self):
-        """Initialize agent factory with OpenAI configuration"""
+    def __init__(self, provider: Optional[LLMProvider] = None):
+        """
+        Initialize agent factory with OpenAI configuration
+
+        Args:
+            provider: Optional offline LLM provider; defaults to LLM_PROVIDER from env
+        """
+        self.provider = provider or get_llm_provider()
         self.api_key = os.getenv('OPENAI_API_KEY')
-        if not self.api_key:
+        if not self.api_key and self.provider is None:
             raise ValueError("OPENAI_API_KEY environment variable not set")
 
         self.default_model = os.getenv('OPENAI_MODEL', 'gpt-4-turbo-preview')
-        logger.info(f"AgentFactory initialized with model: {self.default_model}")
+
+        # One pooled client shared by every agent so TLS connections are reused
+        self.openai_client: Optional[OpenAI] = None
+        if self.provider is None:
+            self.openai_client = OpenAI(
+                api_key=self.api_key,
+                timeout=float(os.getenv('OPENAI_TIMEOUT_SECONDS', 120)),
+                http_client=httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=int(os.getenv('OPENAI_MAX_CONNECTIONS', 100)),
+                        max_keepalive_connections=int(os.getenv('OPENAI_MAX_KEEPALIVE', 20)),
+                        keepalive_expiry=float(os.getenv('OPENAI_KEEPALIVE_SECONDS', 60))
+                    )
+                )
+            )
+
+        provider_name = self.provider.name if self.provider else "openai"
+        logger.info(f"AgentFactory initialized with model: {self.default_model} (provider: {provider_name})")
 
     def _create_base_agent(
         self,
@@ -36,12 +63,22 @@ class AgentFactory:
         model: Optional[str] = None
     ) -> Agent:
         """Create base agent with common configuration"""
+        if self.provider is not None:
+            return ProviderAgent(
+                name=name,
+                role=role,
+                instructions=instructions,
+                provider=self.provider,
+                model=model or self.default_model
+            )
+
         return Agent(
             name=name,
             role=role,
             model=OpenAIChat(
                 id=model or self.default_model,
-                api_key=self.api_key
+                api_key=self.api_key,
+                client=self.openai_client
             ),
             instructions=instructions,
             markdown=True,
@@ -213,6 +250,24 @@ class AgentFactory:
             ]
         )
 
+    def _agent_map(self) -> Dict[str, Callable[[], Agent]]:
+        """Map of agent type names to their creators"""
+        return {
+            "Onboarding": self.create_onboarding_agent,
+            "Data Analysis": self.create_data_analysis_agent,
+            "Forecasting": lambda: self.create_forecasting_agent("General"),
+            "Short Term Forecasting": lambda: self.create_forecasting_agent("Short Term Forecasting"),
+            "Long Term Forecasting": lambda: self.create_forecasting_agent("Long Term Forecasting"),
+            "Tactical Capacity Planning": lambda: self.create_capacity_planning_agent("Tactical"),
+            "Strategic Capacity Planning": lambda: self.create_capacity_planning_agent("Strategic"),
+            "What If & Scenario Analyst": self.create_scenario_analyst_agent,
+            "Occupancy Modeling": self.create_occupancy_modeling_agent
+        }
+
+    def agent_types(self) -> List[str]:
+        """Names of all supported agent types"""
+        return list(self._agent_map())
+
     def get_agent(self, agent_type: str) -> Agent:
         """
         Get appropriate agent based on type
@@ -226,21 +281,28 @@ class AgentFactory:
         Raises:
             ValueError: If agent type is not recognized
         """
-        agent_map = {
-            "Onboarding": self.create_onboarding_agent,
-            "Data Analysis": self.create_data_analysis_agent,
-            "Forecasting": lambda: self.create_forecasting_agent("General"),
-            "Short Term Forecasting": lambda: self.create_forecasting_agent("Short Term Forecasting"),
-            "Long Term Forecasting": lambda: self.create_forecasting_agent("Long Term Forecasting"),
-            "Tactical Capacity Planning": lambda: self.create_capacity_planning_agent("Tactical"),
-            "Strategic Capacity Planning": lambda: self.create_capacity_planning_agent("Strategic"),
-            "What If & Scenario Analyst": self.create_scenario_analyst_agent,
-            "Occupancy Modeling": self.create_occupancy_modeling_agent
-        }
-
-        creator = agent_map.get(agent_type)
+        creator = self._agent_map().get(agent_type)
         if not creator:
             raise ValueError(f"Unknown agent type: {agent_type}")
 
         logger.info(f"Creating agent: {agent_type}")
         return creator()
+
+    def warmup(self):
+        """
+        Build each agent type once and open the LLM connection pool
+
+        Agents are still created per run because Phidata agents keep run
+        memory; warming pays the one-off import/validation cost and the TLS
+        handshake to the model endpoint before the first request.
+        """
+        for agent_type in self.agent_types():
+            self.get_agent(agent_type)
+
+        if self.openai_client is not None:
+            try:
+                self.openai_client.models.list()
+                logger.info("OpenAI connection pool warmed")
+            except Exception as e:
+                # Not fatal: the first request will connect on demand
+                logger.warning(f"OpenAI warmup failed: {str(e)}")
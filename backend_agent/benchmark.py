@@ -0,0 +1,359 @@
+"""
+Load Test & Benchmark Harness for AI Agent Backend
+Drives /api/agent/execute, /api/session/{id} and /health at a configurable
+concurrency or arrival rate and reports latency percentiles, throughput and
+error rates as machine-readable JSON
+
+By default the app runs in-process with the mock LLM provider and the
+in-memory Redis stand-in, so results are reproducible offline:
+
+    python benchmark.py --duration 30 --concurrency 16 --output results.json
+
+Against a running server (uses whatever LLM/Redis that server is configured with):
+
+    python benchmark.py --url http://localhost:8000 --rate 20 --duration 60
+
+Compare with a previous run and fail on regressions:
+
+    python benchmark.py --output new.json --baseline results.json --max-regression 10
+"""
+from typing import Dict, Any, Optional, List
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+
+ENDPOINTS = ("execute", "session", "health")
+
+AGENT_TYPES = ["Onboarding", "Data Analysis", "Short Term Forecasting", "Tactical Capacity Planning"]
+
+
+def build_execute_payload(rng: random.Random) -> Dict[str, Any]:
+    """Build a representative /api/agent/execute request body"""
+    return {
+        "agent_type": rng.choice(AGENT_TYPES),
+        "business_unit": {
+            "id": 1,
+            "code": "CS",
+            "display_name": "Customer Service",
+            "description": "Customer Support Operations"
+        },
+        "line_of_business": {
+            "id": 5,
+            "code": "TECH",
+            "name": "Technical Support",
+            "description": "Technical customer support"
+        },
+        "prompt": "Generate a 2-week forecast for call volume based on recent trends",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = rank - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+class BenchmarkRecorder:
+    """Collects per-request samples and summarizes them"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[Dict[str, Any]]] = {name: [] for name in ENDPOINTS}
+        self.session_ids: List[str] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def record(self, endpoint: str, latency: float, status: int, error: Optional[str] = None):
+        self.samples[endpoint].append({"latency": latency, "status": status, "error": error})
+
+    def _summarize(self, samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(s["latency"] * 1000 for s in samples)
+        errors = [s for s in samples if s["error"] or s["status"] >= 400]
+        status_counts: Dict[str, int] = {}
+        for s in samples:
+            status_counts[str(s["status"])] = status_counts.get(str(s["status"]), 0) + 1
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value, 2) if value is not None else None
+
+        return {
+            "requests": len(samples),
+            "errors": len(errors),
+            "error_rate": round(len(errors) / len(samples), 4) if samples else 0.0,
+            "throughput_rps": round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "mean": ms(sum(latencies) / len(latencies)) if latencies else None,
+                "p50": ms(percentile(latencies, 50)),
+                "p95": ms(percentile(latencies, 95)),
+                "p99": ms(percentile(latencies, 99)),
+                "max": ms(latencies[-1]) if latencies else None
+            },
+            "status_codes": status_counts
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = (self.finished_at or time.perf_counter()) - (self.started_at or time.perf_counter())
+        all_samples = [s for samples in self.samples.values() for s in samples]
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "overall": self._summarize(all_samples, elapsed),
+            "endpoints": {
+                name: self._summarize(samples, elapsed)
+                for name, samples in self.samples.items() if samples
+            }
+        }
+
+
+class LoadGenerator:
+    """Issues requests against the backend in closed- or open-loop mode"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: BenchmarkRecorder, args: argparse.Namespace):
+        self.client = client
+        self.recorder = recorder
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.mix = self._parse_mix(args.mix)
+
+    @staticmethod
+    def _parse_mix(mix: str) -> Dict[str, float]:
+        """Parse 'execute=1,session=3,health=1' into normalized weights"""
+        weights = {}
+        for part in mix.split(","):
+            name, _, weight = part.partition("=")
+            name = name.strip()
+            if name not in ENDPOINTS:
+                raise ValueError(f"Unknown endpoint in mix: {name}")
+            weights[name] = float(weight or 1)
+        total = sum(weights.values())
+        return {name: weight / total for name, weight in weights.items()}
+
+    def _pick_endpoint(self) -> str:
+        endpoint = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        # Session reads need a session; fall back to execute until one exists
+        if endpoint == "session" and not self.recorder.session_ids:
+            return "execute"
+        return endpoint
+
+    async def _send(self, endpoint: str, scheduled_at: Optional[float] = None, record: bool = True):
+        """Send one request; latency is measured from the scheduled time when given"""
+        start = scheduled_at if scheduled_at is not None else time.perf_counter()
+        status = 0
+        error = None
+        try:
+            if endpoint == "execute":
+                response = await self.client.post(
+                    "/api/agent/execute",
+                    json=build_execute_payload(self.rng),
+                    timeout=self.args.timeout
+                )
+                if response.status_code == 200:
+                    self.recorder.session_ids.append(response.json()["session_id"])
+            elif endpoint == "session":
+                session_id = self.rng.choice(self.recorder.session_ids)
+                response = await self.client.get(f"/api/session/{session_id}", timeout=self.args.timeout)
+            else:
+                response = await self.client.get("/health", timeout=self.args.timeout)
+            status = response.status_code
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        if record:
+            self.recorder.record(endpoint, time.perf_counter() - start, status, error)
+
+    async def warmup(self):
+        """Prime connections and seed at least one session, unrecorded"""
+        for _ in range(self.args.warmup):
+            await self._send("execute", record=False)
+            await self._send("health", record=False)
+
+    async def run_closed_loop(self, deadline: float, max_requests: Optional[int]):
+        """Fixed number of workers, each sending back-to-back requests"""
+        sent = 0
+
+        async def worker():
+            nonlocal sent
+            while time.perf_counter() < deadline and (max_requests is None or sent < max_requests):
+                sent += 1
+                await self._send(self._pick_endpoint())
+
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+
+    async def run_open_loop(self, deadline: float, max_requests: Optional[int]):
+        """
+        Poisson arrivals at --rate requests/second
+
+        Latency counts from each request's scheduled arrival, so queueing
+        behind the in-flight cap shows up in the percentiles instead of
+        being hidden (no coordinated omission).
+        """
+        in_flight = asyncio.Semaphore(self.args.concurrency)
+        tasks = []
+        next_arrival = time.perf_counter()
+        sent = 0
+
+        async def fire(endpoint: str, scheduled_at: float):
+            async with in_flight:
+                await self._send(endpoint, scheduled_at=scheduled_at)
+
+        while next_arrival < deadline and (max_requests is None or sent < max_requests):
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(fire(self._pick_endpoint(), next_arrival)))
+            sent += 1
+            next_arrival += self.rng.expovariate(self.args.rate)
+
+        await asyncio.gather(*tasks)
+
+
+def compare_to_baseline(result: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Return human-readable regressions beyond max_regression percent"""
+    regressions = []
+    for name, current in result["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        for pct in ("p50", "p95", "p99"):
+            old, new = previous["latency_ms"].get(pct), current["latency_ms"].get(pct)
+            if old and new and (new - old) / old * 100 > max_regression:
+                regressions.append(f"{name} {pct}: {old}ms -> {new}ms")
+        old_tp, new_tp = previous["throughput_rps"], current["throughput_rps"]
+        if old_tp and (old_tp - new_tp) / old_tp * 100 > max_regression:
+            regressions.append(f"{name} throughput: {old_tp} -> {new_tp} rps")
+        if current["error_rate"] > previous["error_rate"] + max_regression / 100:
+            regressions.append(f"{name} error rate: {previous['error_rate']} -> {current['error_rate']}")
+    return regressions
+
+
+def print_summary(result: Dict[str, Any]):
+    """Print a compact table of the run"""
+    print(f"\nMode: {result['config']['mode']}  Elapsed: {result['summary']['elapsed_seconds']}s")
+    print(f"{'endpoint':<10}{'reqs':>8}{'err%':>8}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    rows = dict(result["summary"]["endpoints"], overall=result["summary"]["overall"])
+    for name, stats in rows.items():
+        lat = stats["latency_ms"]
+        print(
+            f"{name:<10}{stats['requests']:>8}{stats['error_rate'] * 100:>8.2f}{stats['throughput_rps']:>10.2f}"
+            f"{lat['p50'] or 0:>10.1f}{lat['p95'] or 0:>10.1f}{lat['p99'] or 0:>10.1f}"
+        )
+
+
+async def open_client(args: argparse.Namespace, stack: contextlib.AsyncExitStack) -> httpx.AsyncClient:
+    """HTTP client for a remote server, or an in-process ASGI client"""
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.url:
+        return await stack.enter_async_context(httpx.AsyncClient(base_url=args.url, limits=limits))
+
+    # Offline defaults must be in place before main.py is imported
+    os.environ.setdefault("LLM_PROVIDER", "mock")
+    os.environ.setdefault("REDIS_BACKEND", "memory")
+    from main import app
+
+    # ASGITransport does not send lifespan events, so run them here
+    await stack.enter_async_context(app.router.lifespan_context(app))
+    transport = httpx.ASGITransport(app=app)
+    return await stack.enter_async_context(
+        httpx.AsyncClient(transport=transport, base_url="http://benchmark", limits=limits)
+    )
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    recorder = BenchmarkRecorder()
+
+    async with contextlib.AsyncExitStack() as stack:
+        client = await open_client(args, stack)
+        generator = LoadGenerator(client, recorder, args)
+        await generator.warmup()
+
+        recorder.started_at = time.perf_counter()
+        deadline = recorder.started_at + args.duration
+        if args.rate:
+            await generator.run_open_loop(deadline, args.requests)
+        else:
+            await generator.run_closed_loop(deadline, args.requests)
+        recorder.finished_at = time.perf_counter()
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": {
+            "mode": f"open-loop {args.rate} rps" if args.rate else f"closed-loop x{args.concurrency}",
+            "target": args.url or "in-process",
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "duration": args.duration,
+            "requests": args.requests,
+            "mix": generator.mix,
+            "seed": args.seed,
+            "llm_provider": os.getenv("LLM_PROVIDER", "openai") if not args.url else None,
+            "redis_backend": os.getenv("REDIS_BACKEND", "redis") if not args.url else None
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "summary": recorder.summary()
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the AI Agent Backend")
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process app)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Workers (closed loop) or in-flight cap (open loop)")
+    parser.add_argument("--rate", type=float, help="Open-loop Poisson arrival rate in requests/second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured run time in seconds")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--mix", default="execute=1,session=3,health=1", help="Endpoint weights")
+    parser.add_argument("--warmup", type=int, default=3, help="Unrecorded warmup request rounds")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for endpoint choice and arrivals")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--baseline", help="Previous JSON results to compare against")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="Allowed regression percent")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    result = asyncio.run(run_benchmark(args))
+    print_summary(result)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(result["summary"], baseline["summary"], args.max_regression)
+        result["baseline"] = {"file": args.baseline, "max_regression": args.max_regression, "regressions": regressions}
+        if regressions:
+            print(f"\nRegressions beyond {args.max_regression}%:")
+            for line in regressions:
+                print(f"  {line}")
+            exit_code = 1
+        else:
+            print(f"\nNo regressions beyond {args.max_regression}% against {args.baseline}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
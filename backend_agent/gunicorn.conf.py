@@ -0,0 +1,56 @@
+"""
+Gunicorn Configuration
+Production entry point running the FastAPI app on uvicorn workers
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Workers are sized to the available cores and share no process-local state:
+sessions and workflow state live in Redis, so any worker (or node) can serve
+any request. On SIGTERM the master stops accepting connections and gives
+in-flight workflows up to GRACEFUL_TIMEOUT seconds to finish before workers
+run their lifespan shutdown and exit.
+"""
+import multiprocessing
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Server socket
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 8000)}"
+backlog = int(os.getenv('BACKLOG', 2048))
+
+# Workers - the app is async and I/O bound, so one event loop per core
+workers = int(os.getenv('WORKERS') or multiprocessing.cpu_count())
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Agent workflows chain several LLM calls; allow them to finish
+timeout = int(os.getenv('WORKER_TIMEOUT', 180))
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', 120))
+keepalive = int(os.getenv('KEEPALIVE', 5))
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.getenv('MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('MAX_REQUESTS_JITTER', 200))
+
+# Each worker builds its own resources in the FastAPI lifespan
+preload_app = False
+
+# Logging
+loglevel = os.getenv('LOG_LEVEL', 'info')
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """Refuse configurations that would split session state across workers"""
+    if workers > 1 and os.getenv('REDIS_BACKEND', 'redis').lower() == "memory":
+        raise RuntimeError(
+            "REDIS_BACKEND=memory keeps sessions in process memory and cannot be "
+            "shared between workers; use a Redis server or WORKERS=1"
+        )
+    server.log.info(f"Starting {workers} {worker_class} workers on {bind}")
+
+
+def worker_exit(server, worker):
+    server.log.info(f"Worker {worker.pid} exited")
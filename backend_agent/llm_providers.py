@@ -0,0 +1,267 @@
+"""
+LLM Providers
+Pluggable LLM backends for the agent layer
+
+The default "openai" provider keeps the Phidata agents talking to OpenAI.
+The "mock" and "replay" providers run fully offline with configurable latency,
+token streaming and error injection, so workflows can be load tested without
+API keys or network access.
+"""
+from typing import Dict, Any, Optional, List, Iterator
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class MockLLMError(RuntimeError):
+    """Error raised by the mock provider when error injection triggers"""
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+class LLMProvider:
+    """Base interface for LLM providers"""
+
+    name = "base"
+
+    def complete(self, messages: List[Dict[str, str]], model: Optional[str] = None) -> str:
+        """Return the full completion for a list of chat messages"""
+        return "".join(self.stream(messages, model=model))
+
+    def stream(self, messages: List[Dict[str, str]], model: Optional[str] = None) -> Iterator[str]:
+        """Yield completion tokens as they are produced"""
+        raise NotImplementedError("Subclasses must implement stream()")
+
+
+class MockLLMProvider(LLMProvider):
+    """
+    Offline LLM provider with deterministic, configurable behaviour
+
+    Latency is drawn per call from the configured distribution, tokens are
+    emitted at a fixed rate, and a fraction of calls fail with an injected
+    error. All randomness comes from a seeded generator so runs are reproducible.
+    """
+
+    name = "mock"
+
+    LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+    ERROR_KINDS = ("timeout", "rate_limit", "server_error")
+
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        latency_jitter_ms: float = 50.0,
+        latency_distribution: str = "normal",
+        tokens_per_second: float = 0.0,
+        response_tokens: int = 120,
+        error_rate: float = 0.0,
+        seed: Optional[int] = 42
+    ):
+        if latency_distribution not in self.LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency_distribution}")
+
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.latency_distribution = latency_distribution
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+
+        # Agents run on worker threads, so guard the shared generator
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+        logger.info(
+            f"{self.__class__.__name__} initialized - latency: {latency_distribution} "
+            f"{latency_ms}±{latency_jitter_ms}ms, error rate: {error_rate}"
+        )
+
+    @classmethod
+    def from_env(cls, **overrides) -> "MockLLMProvider":
+        """Build provider from MOCK_LLM_* environment variables"""
+        config = _mock_config_from_env()
+        config.update(overrides)
+        return cls(**config)
+
+    def _sample_latency(self) -> float:
+        """Draw time-to-first-token latency in seconds"""
+        mean = self.latency_ms
+        jitter = self.latency_jitter_ms
+        with self._rng_lock:
+            if self.latency_distribution == "fixed":
+                value = mean
+            elif self.latency_distribution == "uniform":
+                value = self._rng.uniform(mean - jitter, mean + jitter)
+            elif self.latency_distribution == "normal":
+                value = self._rng.gauss(mean, jitter)
+            elif self.latency_distribution == "lognormal":
+                # Parameterised so the distribution mean matches latency_ms
+                sigma = jitter / mean if mean > 0 else 0.0
+                value = mean * self._rng.lognormvariate(-(sigma ** 2) / 2, sigma)
+            else:
+                value = self._rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+        return max(value, 0.0) / 1000.0
+
+    def _maybe_fail(self):
+        """Raise an injected error with probability error_rate"""
+        if self.error_rate <= 0:
+            return
+        with self._rng_lock:
+            triggered = self._rng.random() < self.error_rate
+            kind = self._rng.choice(self.ERROR_KINDS)
+        if triggered:
+            raise MockLLMError(kind, f"Injected mock LLM error: {kind}")
+
+    def _render_response(self, messages: List[Dict[str, str]], model: Optional[str]) -> str:
+        """Build a deterministic response for the given prompt"""
+        prompt = messages[-1]["content"] if messages else ""
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+        words = [f"token{i}" for i in range(max(self.response_tokens - 4, 0))]
+        return f"[mock:{model or 'default'}:{digest}] " + " ".join(words)
+
+    def stream(self, messages: List[Dict[str, str]], model: Optional[str] = None) -> Iterator[str]:
+        """Yield the mock response word by word after the sampled latency"""
+        time.sleep(self._sample_latency())
+        self._maybe_fail()
+
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for i, word in enumerate(self._render_response(messages, model).split(" ")):
+            if delay:
+                time.sleep(delay)
+            yield word if i == 0 else f" {word}"
+
+
+class ReplayLLMProvider(MockLLMProvider):
+    """
+    Replays recorded responses from a JSONL file
+
+    Each line holds {"prompt": ..., "response": ...}. Prompts are matched by
+    hash; unmatched prompts cycle through the recorded responses in order.
+    Latency and error injection behave exactly like MockLLMProvider.
+    """
+
+    name = "replay"
+
+    def __init__(self, replay_file: str, **kwargs):
+        super().__init__(**kwargs)
+        self.replay_file = replay_file
+        self._by_prompt: Dict[str, str] = {}
+        self._responses: List[str] = []
+        self._cursor = 0
+
+        with open(replay_file, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self._responses.append(record["response"])
+                if record.get("prompt"):
+                    self._by_prompt[self._prompt_key(record["prompt"])] = record["response"]
+
+        if not self._responses:
+            raise ValueError(f"Replay file has no recorded responses: {replay_file}")
+        logger.info(f"Loaded {len(self._responses)} recorded responses from {replay_file}")
+
+    @staticmethod
+    def _prompt_key(prompt: str) -> str:
+        return hashlib.sha256(prompt.strip().encode()).hexdigest()
+
+    def _render_response(self, messages: List[Dict[str, str]], model: Optional[str]) -> str:
+        prompt = messages[-1]["content"] if messages else ""
+        recorded = self._by_prompt.get(self._prompt_key(prompt))
+        if recorded is not None:
+            return recorded
+        with self._rng_lock:
+            response = self._responses[self._cursor % len(self._responses)]
+            self._cursor += 1
+        return response
+
+
+class ProviderRunResponse:
+    """Minimal stand-in for Phidata's RunResponse"""
+
+    def __init__(self, content: str, model: Optional[str] = None):
+        self.content = content
+        self.model = model
+
+
+class ProviderAgent:
+    """
+    Agent backed by an LLMProvider instead of a Phidata model
+
+    Exposes the same run() surface the orchestrator uses on Phidata agents.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        role: str,
+        instructions: List[str],
+        provider: LLMProvider,
+        model: Optional[str] = None
+    ):
+        self.name = name
+        self.role = role
+        self.instructions = instructions
+        self.provider = provider
+        self.model = model
+
+    def _build_messages(self, message: str) -> List[Dict[str, str]]:
+        system_prompt = "\n".join([f"You are {self.name}. {self.role}.", *self.instructions])
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": message}
+        ]
+
+    def run(self, message: str, stream: bool = False):
+        """Run the agent; returns a token iterator when stream=True"""
+        messages = self._build_messages(message)
+        if stream:
+            return self.provider.stream(messages, model=self.model)
+        return ProviderRunResponse(self.provider.complete(messages, model=self.model), model=self.model)
+
+
+def get_llm_provider(provider_name: Optional[str] = None) -> Optional[LLMProvider]:
+    """
+    Resolve the configured offline provider
+
+    Returns None for "openai", meaning agents use the Phidata OpenAI model.
+    """
+    provider_name = (provider_name or os.getenv('LLM_PROVIDER', 'openai')).lower()
+
+    if provider_name == "openai":
+        return None
+    if provider_name == "mock":
+        return MockLLMProvider.from_env()
+    if provider_name == "replay":
+        replay_file = os.getenv('MOCK_LLM_REPLAY_FILE')
+        if not replay_file:
+            raise ValueError("MOCK_LLM_REPLAY_FILE must be set when LLM_PROVIDER=replay")
+        return ReplayLLMProvider.from_env(replay_file=replay_file)
+
+    raise ValueError(f"Unknown LLM_PROVIDER: {provider_name}")
+
+
+def _mock_config_from_env() -> Dict[str, Any]:
+    """Read MOCK_LLM_* settings shared by the offline providers"""
+    seed = os.getenv('MOCK_LLM_SEED', '42')
+    return {
+        "latency_ms": float(os.getenv('MOCK_LLM_LATENCY_MS', 200)),
+        "latency_jitter_ms": float(os.getenv('MOCK_LLM_LATENCY_JITTER_MS', 50)),
+        "latency_distribution": os.getenv('MOCK_LLM_LATENCY_DISTRIBUTION', 'normal'),
+        "tokens_per_second": float(os.getenv('MOCK_LLM_TOKENS_PER_SECOND', 0)),
+        "response_tokens": int(os.getenv('MOCK_LLM_RESPONSE_TOKENS', 120)),
+        "error_rate": float(os.getenv('MOCK_LLM_ERROR_RATE', 0)),
+        "seed": int(seed) if seed else None,
+    }
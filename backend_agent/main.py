@@ -2,13 +2,18 @@
 FastAPI Backend for AI Agent System
 Receives requests from Frontend, processes through Langraph workflow orchestrator
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any
+from contextlib import asynccontextmanager
 from datetime import datetime
+import asyncio
 import logging
+import os
 import sys
+import time
 
 # Import our custom modules
 from redis_manager import RedisContextManager
@@ -24,11 +29,74 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+WARMUP_RETRY_SECONDS = float(os.getenv('WARMUP_RETRY_SECONDS', 5))
+
+
+async def warm_up(app: FastAPI) -> bool:
+    """
+    Pre-establish Redis connections, compile workflows and warm LLM connections
+
+    Returns:
+        bool: True once the worker is ready to take traffic
+    """
+    start_time = time.time()
+    try:
+        await app.state.redis_manager.warmup()
+        await app.state.orchestrator.warmup()
+    except Exception as e:
+        logger.warning(f"Worker {os.getpid()} warmup failed: {str(e)}")
+        return False
+
+    app.state.ready = True
+    logger.info(f"Worker {os.getpid()} warm in {time.time() - start_time:.2f}s")
+    return True
+
+
+async def retry_warm_up(app: FastAPI):
+    """Keep retrying warmup in the background until it succeeds"""
+    while not await warm_up(app):
+        await asyncio.sleep(WARMUP_RETRY_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create and warm per-worker resources on startup, release them on shutdown
+
+    Each worker process owns its Redis client and orchestrator; all session
+    state the workflows depend on lives in Redis, so workers are interchangeable.
+    The worker reports ready only after warmup, so load balancers polling
+    /health/ready route traffic to warm workers only.
+    """
+    redis_manager = RedisContextManager()
+    app.state.redis_manager = redis_manager
+    app.state.orchestrator = WorkflowOrchestrator(redis_manager)
+    app.state.ready = False
+
+    # If a dependency is down at boot, stay live but unready and keep trying
+    warmup_task = None
+    if not await warm_up(app):
+        warmup_task = asyncio.create_task(retry_warm_up(app))
+    logger.info(f"Worker {os.getpid()} started")
+
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        if warmup_task:
+            warmup_task.cancel()
+        await redis_manager.close()
+        logger.info(f"Worker {os.getpid()} shut down")
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AI Agent Backend",
     description="Backend service for multi-agent workflow orchestration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -40,9 +108,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Redis context manager and orchestrator
-redis_manager = RedisContextManager()
-orchestrator = WorkflowOrchestrator(redis_manager)
+
+# Per-worker dependencies (created in lifespan)
+def get_redis_manager(request: Request) -> RedisContextManager:
+    return request.app.state.redis_manager
+
+
+def get_orchestrator(request: Request) -> WorkflowOrchestrator:
+    return request.app.state.orchestrator
 
 
 # Request/Response Models
@@ -91,18 +164,51 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
+async def health_check(
+    request: Request,
+    redis_manager: RedisContextManager = Depends(get_redis_manager)
+):
     """Detailed health check"""
     redis_status = await redis_manager.health_check()
     return {
         "status": "healthy",
+        "ready": request.app.state.ready,
         "redis": redis_status,
+        "worker_pid": os.getpid(),
         "timestamp": datetime.utcnow().isoformat()
     }
 
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the worker process is up and serving requests"""
+    return {"status": "alive", "worker_pid": os.getpid()}
+
+
+@app.get("/health/ready")
+async def readiness_check(
+    request: Request,
+    redis_manager: RedisContextManager = Depends(get_redis_manager)
+):
+    """Readiness probe: 200 only when the worker is warm and Redis is reachable"""
+    redis_status = await redis_manager.health_check()
+    ready = request.app.state.ready and redis_status.get("status") == "connected"
+    return ORJSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "warm": request.app.state.ready,
+            "redis": redis_status,
+            "worker_pid": os.getpid()
+        }
+    )
+
+
 @app.post("/api/agent/execute", response_model=AgentExecutionResponse)
-async def execute_agent(request: AgentExecutionRequest):
+async def execute_agent(
+    request: AgentExecutionRequest,
+    orchestrator: WorkflowOrchestrator = Depends(get_orchestrator)
+):
     """
     Main endpoint to execute agent workflow
 
@@ -127,15 +233,17 @@ async def execute_agent(request: AgentExecutionRequest):
 
         logger.info(f"Workflow execution completed. Session ID: {result['session_id']}")
 
-        return AgentExecutionResponse(
-            success=True,
-            response=result['response'],
-            session_id=result['session_id'],
-            agent_type=request.agent_type,
-            workflow_steps=result.get('workflow_steps'),
-            execution_time=result.get('execution_time'),
-            metadata=result.get('metadata')
-        )
+        # Returning the response directly skips response_model re-validation;
+        # the model still documents the schema in OpenAPI
+        return ORJSONResponse({
+            "success": True,
+            "response": result['response'],
+            "session_id": result['session_id'],
+            "agent_type": request.agent_type,
+            "workflow_steps": result.get('workflow_steps'),
+            "execution_time": result.get('execution_time'),
+            "metadata": result.get('metadata')
+        })
 
     except Exception as e:
         logger.error(f"Error executing agent workflow: {str(e)}", exc_info=True)
@@ -146,13 +254,17 @@ async def execute_agent(request: AgentExecutionRequest):
 
 
 @app.get("/api/session/{session_id}")
-async def get_session_context(session_id: str):
+async def get_session_context(
+    session_id: str,
+    redis_manager: RedisContextManager = Depends(get_redis_manager)
+):
     """Retrieve stored session context from Redis"""
     try:
-        context = await redis_manager.get_context(session_id)
-        if not context:
+        # Contexts are stored as JSON, so pass the payload through untouched
+        raw_context = await redis_manager.get_context_raw(session_id)
+        if not raw_context:
             raise HTTPException(status_code=404, detail="Session not found")
-        return context
+        return Response(content=raw_context, media_type="application/json")
     except HTTPException:
         raise
     except Exception as e:
@@ -161,7 +273,10 @@ async def get_session_context(session_id: str):
 
 
 @app.delete("/api/session/{session_id}")
-async def clear_session(session_id: str):
+async def clear_session(
+    session_id: str,
+    redis_manager: RedisContextManager = Depends(get_redis_manager)
+):
     """Clear session context from Redis"""
     try:
         success = await redis_manager.clear_context(session_id)
@@ -172,11 +287,12 @@ async def clear_session(session_id: str):
 
 
 if __name__ == "__main__":
+    # Development server; use `gunicorn -c gunicorn.conf.py main:app` in production
     import uvicorn
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
+        host=os.getenv('HOST', '0.0.0.0'),
+        port=int(os.getenv('PORT', 8000)),
+        reload=os.getenv('RELOAD', 'true').lower() == 'true',
+        log_level=os.getenv('LOG_LEVEL', 'info')
     )
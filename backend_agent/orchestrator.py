@@ -16,6 +16,8 @@ from redis_manager import RedisContextManager, generate_session_id
 
 logger = logging.getLogger(__name__)
 
+FORECASTING_AGENT_TYPES = ("Forecasting", "Short Term Forecasting", "Long Term Forecasting")
+
 
 # Define State for the workflow
 class WorkflowState(TypedDict):
@@ -40,8 +42,38 @@ class WorkflowOrchestrator:
         """Initialize orchestrator with Redis manager and agent factory"""
         self.redis_manager = redis_manager
         self.agent_factory = AgentFactory()
+
+        # Compiled graphs are stateless, so one per agent type is shared by all runs
+        self._compiled_workflows: Dict[str, Any] = {}
         logger.info("WorkflowOrchestrator initialized")
 
+    def get_compiled_workflow(self, agent_type: str):
+        """Return the compiled workflow for an agent type, compiling it once"""
+        compiled = self._compiled_workflows.get(agent_type)
+        if compiled is not None:
+            return compiled
+
+        if agent_type in FORECASTING_AGENT_TYPES:
+            # Use comprehensive forecasting workflow
+            compiled = self._create_forecasting_workflow(agent_type).compile()
+            logger.info(f"Compiled comprehensive forecasting workflow for {agent_type}")
+        else:
+            # Use simple single-agent workflow
+            compiled = self._create_simple_workflow(agent_type).compile()
+            logger.info(f"Compiled simple single-agent workflow for {agent_type}")
+
+        # Only cache known types so arbitrary request values can't grow the cache
+        if agent_type in self.agent_factory.agent_types():
+            self._compiled_workflows[agent_type] = compiled
+        return compiled
+
+    async def warmup(self):
+        """Compile every workflow and warm the agents and LLM connections"""
+        for agent_type in self.agent_factory.agent_types():
+            self.get_compiled_workflow(agent_type)
+        await asyncio.to_thread(self.agent_factory.warmup)
+        logger.info(f"Orchestrator warmed: {len(self._compiled_workflows)} workflows compiled")
+
     def _create_context_prompt(
         self,
         business_unit: Dict[str, Any],
@@ -250,18 +282,8 @@ class WorkflowOrchestrator:
                 "metadata": {}
             }
 
-            # Determine which workflow to use
-            if agent_type in ["Forecasting", "Short Term Forecasting", "Long Term Forecasting"]:
-                # Use comprehensive forecasting workflow
-                workflow = self._create_forecasting_workflow(agent_type)
-                logger.info("Using comprehensive forecasting workflow")
-            else:
-                # Use simple single-agent workflow
-                workflow = self._create_simple_workflow(agent_type)
-                logger.info("Using simple single-agent workflow")
-
-            # Compile and run workflow
-            app = workflow.compile()
+            # Run the (cached) compiled workflow for this agent type
+            app = self.get_compiled_workflow(agent_type)
             final_state = await app.ainvoke(initial_state)
 
             execution_time = time.time() - start_time
@@ -3,12 +3,14 @@ Redis Context Manager
 Stores and retrieves BU/LOB context, conversation history, and workflow state
 """
 import redis.asyncio as redis
-import json
+import asyncio
+import orjson
 import uuid
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 import logging
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,6 +18,49 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 
+class InMemoryRedis:
+    """
+    Process-local stand-in for the subset of redis.asyncio.Redis we use
+
+    Intended for offline benchmarks and local development only: data is not
+    shared between processes and is lost on restart.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+
+    def _live_value(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def ping(self) -> bool:
+        return True
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._live_value(key)
+
+    async def setex(self, key: str, ttl: int, value: str) -> bool:
+        self._data[key] = (value, time.monotonic() + ttl)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._live_value(key) is not None:
+                del self._data[key]
+                removed += 1
+        return removed
+
+    async def close(self):
+        self._data.clear()
+
+
 class RedisContextManager:
     """Manages Redis connection and context storage for agent sessions"""
 
@@ -26,25 +71,60 @@ class RedisContextManager:
         self.redis_db = int(os.getenv('REDIS_DB', 0))
         self.redis_password = os.getenv('REDIS_PASSWORD', None)
 
+        # "redis" for a real server, "memory" for the offline stand-in
+        self.redis_backend = os.getenv('REDIS_BACKEND', 'redis').lower()
+
+        # Connection pool sizing (per worker)
+        self.max_connections = int(os.getenv('REDIS_MAX_CONNECTIONS', 50))
+        self.warm_connections = int(os.getenv('REDIS_WARM_CONNECTIONS', 4))
+        self.pool_timeout = float(os.getenv('REDIS_POOL_TIMEOUT', 5))
+        self.connect_timeout = float(os.getenv('REDIS_CONNECT_TIMEOUT', 5))
+
         # TTL for session context (24 hours)
         self.context_ttl = int(os.getenv('CONTEXT_TTL_SECONDS', 86400))
 
+        self.pool: Optional[redis.BlockingConnectionPool] = None
         self.client: Optional[redis.Redis] = None
-        logger.info(f"RedisContextManager initialized - Host: {self.redis_host}:{self.redis_port}")
+        logger.info(
+            f"RedisContextManager initialized - Host: {self.redis_host}:{self.redis_port} "
+            f"(backend: {self.redis_backend})"
+        )
 
     async def get_client(self) -> redis.Redis:
         """Get or create Redis client"""
-        if self.client is None:
-            self.client = await redis.Redis(
+        if self.client is None and self.redis_backend == "memory":
+            self.client = InMemoryRedis()
+            logger.info("Using in-memory Redis stand-in")
+        elif self.client is None:
+            # Bounded pool: callers wait up to pool_timeout for a free connection
+            self.pool = redis.BlockingConnectionPool(
                 host=self.redis_host,
                 port=self.redis_port,
                 db=self.redis_db,
                 password=self.redis_password,
-                decode_responses=True
+                decode_responses=True,
+                max_connections=self.max_connections,
+                timeout=self.pool_timeout,
+                socket_connect_timeout=self.connect_timeout
             )
+            self.client = redis.Redis(connection_pool=self.pool)
             logger.info("Redis client connection established")
         return self.client
 
+    async def warmup(self) -> int:
+        """
+        Open pooled connections ahead of the first request
+
+        Returns:
+            int: Number of connections warmed
+        """
+        client = await self.get_client()
+        count = max(1, min(self.warm_connections, self.max_connections))
+        # Concurrent pings each check out their own pooled connection
+        await asyncio.gather(*(client.ping() for _ in range(count)))
+        logger.info(f"Redis pool warmed with {count} connections")
+        return count
+
     async def health_check(self) -> Dict[str, Any]:
         """Check Redis connection health"""
         try:
@@ -102,7 +182,7 @@ class RedisContextManager:
             await client.setex(
                 key,
                 self.context_ttl,
-                json.dumps(context)
+                orjson.dumps(context)
             )
 
             logger.info(f"Context stored for session: {session_id}")
@@ -128,7 +208,7 @@ class RedisContextManager:
 
             context_json = await client.get(key)
             if context_json:
-                context = json.loads(context_json)
+                context = orjson.loads(context_json)
                 logger.info(f"Context retrieved for session: {session_id}")
                 return context
             else:
@@ -139,6 +219,24 @@ class RedisContextManager:
             logger.error(f"Failed to retrieve context: {str(e)}")
             return None
 
+    async def get_context_raw(self, session_id: str) -> Optional[str]:
+        """
+        Retrieve the stored session context JSON without decoding it
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            JSON string as stored in Redis, or None if not found
+        """
+        try:
+            client = await self.get_client()
+            return await client.get(f"session:{session_id}")
+
+        except Exception as e:
+            logger.error(f"Failed to retrieve raw context: {str(e)}")
+            return None
+
     async def update_context(
         self,
         session_id: str,
@@ -172,7 +270,7 @@ class RedisContextManager:
             await client.setex(
                 key,
                 self.context_ttl,
-                json.dumps(context)
+                orjson.dumps(context)
             )
 
             logger.info(f"Context updated for session: {session_id}")
@@ -281,6 +379,10 @@ class RedisContextManager:
         """Close Redis connection"""
         if self.client:
             await self.client.close()
+            self.client = None
+        if self.pool:
+            await self.pool.disconnect()
+            self.pool = None
             logger.info("Redis connection closed")
 
 
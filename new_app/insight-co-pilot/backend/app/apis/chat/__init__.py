@@ -1,17 +1,19 @@
 """Conversational AI chat API with context awareness and agent orchestration."""
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
-import databutton as db
-import asyncpg
+import base64
 import json
+import os
 import uuid
 
 # Import agent workflow
 from app.libs.agent_workflow import get_workflow
+from app.libs.database import DbConnection, acquire
+from app.libs.system_context import get_system_context
 
 router = APIRouter(prefix="/chat")
 
@@ -27,6 +29,7 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
+    polish: bool = False  # Have the LLM rewrite template-rendered answers
 
 class ChatSession(BaseModel):
     session_id: str
@@ -34,171 +37,93 @@ class ChatSession(BaseModel):
     created_at: datetime
     updated_at: datetime
     messages: List[ChatMessage] = []
+    next_cursor: Optional[str] = None  # Cursor for the next page of messages
 
 class ChatSessionList(BaseModel):
     sessions: List[ChatSession]
-    total: int
+    total: int  # Estimated from table statistics
+    next_cursor: Optional[str] = None
 
 # ============================================================================
-# Database Connection Helper
+# Settings Helpers
 # ============================================================================
 
-async def get_db_connection():
-    """Get database connection."""
-    database_url = db.secrets.get("DATABASE_URL_DEV")
-    return await asyncpg.connect(database_url)
-
-# ============================================================================
-# Context Building Functions
-# ============================================================================
-
-async def get_context_info() -> str:
-    """Gather context about available data for the AI."""
-    conn = await get_db_connection()
-    context_parts = []
+def settings_from_row(row) -> Dict[str, Any]:
+    """Map a user_settings row to the API configuration used by the workflow."""
+    if row and row['openai_api_key']:
+        return {
+            "api_key": row['openai_api_key'],
+            "model": row['selected_model'] or "gpt-4o-mini"
+        }
     
-    try:
-        # Get business units
-        business_units = await conn.fetch(
-            "SELECT id, name, description FROM business_units ORDER BY name"
-        )
-        if business_units:
-            bu_list = [f"- {row['name']} (ID: {row['id']})" for row in business_units]
-            if business_units[0]['description']:
-                bu_list = [f"- {row['name']} (ID: {row['id']}, Description: {row['description']})" for row in business_units]
-            context_parts.append("Available Business Units:\n" + "\n".join(bu_list))
-        
-        # Get LOBs
-        lobs = await conn.fetch(
-            """
-            SELECT l.id, l.name, l.business_unit_id, bu.name as bu_name
-            FROM lobs l
-            JOIN business_units bu ON l.business_unit_id = bu.id
-            ORDER BY l.name
-            """
-        )
-        if lobs:
-            lob_list = [f"- {row['name']} (ID: {row['id']}, under {row['bu_name']})" for row in lobs]
-            context_parts.append("Available Lines of Business (LOBs):\n" + "\n".join(lob_list))
-        
-        # Get datasets
-        datasets = await conn.fetch(
-            """
-            SELECT d.id, d.name, d.description, d.row_count, d.column_count,
-                   d.columns_info, d.uploaded_at,
-                   COALESCE(bu.name, l.name) as parent_name
-            FROM datasets d
-            LEFT JOIN business_units bu ON d.business_unit_id = bu.id
-            LEFT JOIN lobs l ON d.lob_id = l.id
-            ORDER BY d.uploaded_at DESC
-            LIMIT 10
-            """
-        )
-        if datasets:
-            ds_list = []
-            for row in datasets:
-                cols_info = json.loads(row['columns_info']) if row['columns_info'] else {}
-                col_names = ', '.join(list(cols_info.keys())[:5])
-                if len(cols_info) > 5:
-                    col_names += f" (and {len(cols_info) - 5} more)"
-                ds_list.append(
-                    f"- '{row['name']}' (ID: {row['id']}, {row['row_count']} rows, {row['column_count']} cols)\n" +
-                    f"  Columns: {col_names}\n" +
-                    f"  Under: {row['parent_name']}"
-                )
-            context_parts.append("Available Datasets:\n" + "\n".join(ds_list))
-        
-        # Get weekly metrics summary
-        metrics_count = await conn.fetchval(
-            "SELECT COUNT(*) FROM weekly_metrics"
-        )
-        if metrics_count > 0:
-            context_parts.append(f"Weekly Metrics: {metrics_count} records available")
-        
-        if not context_parts:
-            return "No business units, LOBs, or datasets have been created yet. The user should start by uploading data or creating business structures."
-        
-        return "\n\n".join(context_parts)
-        
-    finally:
-        await conn.close()
-
-async def get_user_settings(session_id: str) -> Dict[str, Any]:
-    """Get user settings for API configuration."""
-    conn = await get_db_connection()
-    try:
-        settings = await conn.fetchrow(
-            "SELECT openai_api_key, selected_model FROM user_settings WHERE session_id = $1",
-            session_id
-        )
-        
-        if settings and settings['openai_api_key']:
-            return {
-                "api_key": settings['openai_api_key'],
-                "model": settings['selected_model'] or "gpt-4o-mini"
-            }
-        
-        # Return None if no settings found - workflow will use defaults
-        return {"api_key": None, "model": None}
-    finally:
-        await conn.close()
+    # Return None if no settings found - workflow will use defaults
+    return {"api_key": None, "model": None}
 
 # ============================================================================
 # Chat Management Functions
 # ============================================================================
 
-async def get_or_create_session(session_id: Optional[str] = None) -> str:
-    """Get existing session or create new one."""
-    if not session_id:
-        session_id = str(uuid.uuid4())
+# Upserts the session, stores the user message and reads the session's
+# settings in a single statement. (xmax = 0) is true only for freshly
+# inserted rows, which tells a new session apart from a resumed one.
+START_TURN_QUERY = """
+    WITH session AS (
+        INSERT INTO chat_sessions (session_id, title)
+        VALUES ($1, 'New Conversation')
+        ON CONFLICT (session_id) DO UPDATE SET updated_at = CURRENT_TIMESTAMP
+        RETURNING session_id, (xmax = 0) AS created
+    ), message AS (
+        INSERT INTO chat_messages (session_id, role, content)
+        SELECT session_id, 'user', $2 FROM session
+    )
+    SELECT session.created, settings.openai_api_key, settings.selected_model
+    FROM session
+    LEFT JOIN user_settings settings ON settings.session_id = session.session_id
+"""
+
+SAVE_MESSAGE_QUERY = """
+    WITH message AS (
+        INSERT INTO chat_messages (session_id, role, content)
+        VALUES ($1, $2, $3)
+    )
+    UPDATE chat_sessions SET updated_at = CURRENT_TIMESTAMP WHERE session_id = $1
+"""
+
+async def start_turn(session_id: str, message: str) -> Dict[str, Any]:
+    """Persist the start of a chat turn in one round trip.
     
-    conn = await get_db_connection()
-    try:
-        # Check if session exists
-        existing = await conn.fetchval(
-            "SELECT session_id FROM chat_sessions WHERE session_id = $1",
-            session_id
-        )
-        
-        if not existing:
-            # Create new session
-            await conn.execute(
-                "INSERT INTO chat_sessions (session_id, title) VALUES ($1, $2)",
-                session_id, "New Conversation"
-            )
-            print(f"Created new chat session: {session_id}")
+    Creates the session if needed, saves the user message and loads the
+    session's API settings.
+    
+    Args:
+        session_id: Chat session ID
+        message: User message text
         
-        return session_id
-    finally:
-        await conn.close()
+    Returns:
+        User settings dict with api_key and model
+    """
+    async with acquire() as conn:
+        row = await conn.fetchrow(START_TURN_QUERY, session_id, message)
+    
+    if row['created']:
+        print(f"Created new chat session: {session_id}")
+    
+    return settings_from_row(row)
 
 async def save_message(session_id: str, role: str, content: str):
-    """Save a message to the database."""
-    conn = await get_db_connection()
-    try:
-        await conn.execute(
-            "INSERT INTO chat_messages (session_id, role, content) VALUES ($1, $2, $3)",
-            session_id, role, content
-        )
-        
-        # Update session timestamp
-        await conn.execute(
-            "UPDATE chat_sessions SET updated_at = CURRENT_TIMESTAMP WHERE session_id = $1",
-            session_id
-        )
-    finally:
-        await conn.close()
+    """Save a message and touch the session timestamp in one round trip."""
+    async with acquire() as conn:
+        await conn.execute(SAVE_MESSAGE_QUERY, session_id, role, content)
 
 async def get_conversation_history(session_id: str, limit: int = 20) -> List[Dict[str, str]]:
     """Get conversation history for a session."""
-    conn = await get_db_connection()
-    try:
+    async with acquire() as conn:
         messages = await conn.fetch(
             """
             SELECT role, content, created_at
             FROM chat_messages
             WHERE session_id = $1
-            ORDER BY created_at DESC
+            ORDER BY created_at DESC, id DESC
             LIMIT $2
             """,
             session_id, limit
@@ -209,34 +134,146 @@ async def get_conversation_history(session_id: str, limit: int = 20) -> List[Dic
             {"role": msg['role'], "content": msg['content']}
             for msg in reversed(messages)
         ]
-    finally:
-        await conn.close()
+
+# ============================================================================
+# Pagination Helpers
+# ============================================================================
+
+SESSION_PAGE_SIZE = int(os.environ.get("CHAT_SESSION_PAGE_SIZE", 50))
+MAX_SESSION_PAGE_SIZE = 200
+MESSAGE_PAGE_SIZE = int(os.environ.get("CHAT_MESSAGE_PAGE_SIZE", 100))
+MAX_MESSAGE_PAGE_SIZE = 5000
+MESSAGE_STREAM_THRESHOLD = int(os.environ.get("CHAT_MESSAGE_STREAM_THRESHOLD", 500))
+MESSAGE_STREAM_PREFETCH = 200
+
+def encode_cursor(timestamp: datetime, key: Any) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor."""
+    payload = json.dumps([timestamp.isoformat(), key], default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, Any]:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, key = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), key
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+async def estimate_row_count(conn, table: str) -> int:
+    """Planner row estimate for a table, falling back to COUNT(*) before the first ANALYZE."""
+    estimate = await conn.fetchval(
+        "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass($1)",
+        table
+    )
+    if estimate is None or estimate < 0:
+        return await conn.fetchval(f"SELECT COUNT(*) FROM {table}")
+    return estimate
+
+def message_page_query(session_id: str, after: Optional[Tuple[datetime, Any]], limit: int):
+    """Build the keyset query for one page of a session's messages.
+    
+    One row beyond limit is fetched so the caller can tell whether another
+    page follows.
+    """
+    if after:
+        return (
+            """
+            SELECT id, role, content, created_at
+            FROM chat_messages
+            WHERE session_id = $1 AND (created_at, id) > ($2, $3)
+            ORDER BY created_at, id
+            LIMIT $4
+            """,
+            (session_id, after[0], after[1], limit + 1)
+        )
+    return (
+        """
+        SELECT id, role, content, created_at
+        FROM chat_messages
+        WHERE session_id = $1
+        ORDER BY created_at, id
+        LIMIT $2
+        """,
+        (session_id, limit + 1)
+    )
+
+async def stream_session_json(session: Dict[str, Any], query: str, args: tuple, limit: int):
+    """Yield a ChatSession JSON document, encoding messages as they are read.
+    
+    Rows come from a server-side cursor, so memory stays flat no matter how
+    large the page is. next_cursor is written last, once it is known.
+    """
+    header = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in session.items()}
+    yield json.dumps(header)[:-1] + ', "messages": ['
+    
+    last = None
+    count = 0
+    has_more = False
+    buffer = []
+    async with acquire() as conn:
+        async with conn.transaction():
+            async for msg in conn.cursor(query, *args, prefetch=MESSAGE_STREAM_PREFETCH):
+                if count == limit:
+                    # The extra row only signals that another page exists
+                    has_more = True
+                    break
+                buffer.append(json.dumps({
+                    "role": msg['role'],
+                    "content": msg['content'],
+                    "created_at": msg['created_at'].isoformat() if msg['created_at'] else None
+                }))
+                last = msg
+                count += 1
+                if len(buffer) >= MESSAGE_STREAM_PREFETCH:
+                    yield ("," if count > len(buffer) else "") + ",".join(buffer)
+                    buffer = []
+    
+    if buffer:
+        yield ("," if count > len(buffer) else "") + ",".join(buffer)
+    
+    next_cursor = encode_cursor(last['created_at'], last['id']) if has_more else None
+    yield '], "next_cursor": ' + json.dumps(next_cursor) + "}"
 
 # ============================================================================
 # Endpoints
 # ============================================================================
 
+def sse_event(event: str, data: Any) -> str:
+    """Frame one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @router.post("/message", tags=["stream"])
 async def chat_message(request: ChatRequest):
-    """Send a message and get streaming response with agent orchestration."""
+    """Send a message and stream the response as server-sent events.
+    
+    Events, in order:
+        session: {"session_id"} once the turn is persisted
+        token: {"text"} response text as the LLM generates it
+        chart: {"type", "config"} Plotly chart, if the agent produced one
+        done: {"agent_used", "success"} after the response is saved
+        error: {"message"} instead of done when the turn fails
+    """
     
     async def generate_response():
         session_id = None
         try:
-            # Get or create session
-            session_id = await get_or_create_session(request.session_id)
+            turn_session_id = request.session_id or str(uuid.uuid4())
             
-            # Send session ID first
-            yield f"SESSION_ID:{session_id}\n"
+            # Read prior turns before this turn's message is stored
+            history = []
+            if request.session_id:
+                history = await get_conversation_history(request.session_id)
             
-            # Save user message
-            await save_message(session_id, "user", request.message)
+            # Create the session, save the user message and load settings together
+            user_settings = await start_turn(turn_session_id, request.message)
+            session_id = turn_session_id
             
-            # Get user settings for API configuration
-            user_settings = await get_user_settings(session_id)
+            # Send session ID first
+            yield sse_event("session", {"session_id": session_id})
             
-            # Get context info
-            context_info = await get_context_info()
+            # Get cached context info
+            context_info = await get_system_context()
             
             # Get workflow with user's API key and model
             workflow = get_workflow(
@@ -246,112 +283,166 @@ async def chat_message(request: ChatRequest):
             
             print(f"[Chat API] Processing message with model: {user_settings.get('model', 'default')}")
             
-            # Process query through agent workflow
-            result = await workflow.process_query(
+            # Stream the response while the agent workflow runs
+            streamed = []
+            result = {}
+            async for kind, payload in workflow.stream_query(
                 user_query=request.message,
                 session_id=session_id,
-                context={"system_context": context_info}
-            )
+                context={"system_context": context_info, "history": history, "polish": request.polish}
+            ):
+                if kind == "token":
+                    streamed.append(payload)
+                    yield sse_event("token", {"text": payload})
+                else:
+                    result = payload
             
-            # Get the response
-            response_text = result.get("response", "I apologize, but I couldn't generate a response.")
+            response_text = "".join(streamed)
+            if not response_text:
+                # Responses built without the LLM (e.g. errors) arrive whole
+                response_text = result.get("response") or "I apologize, but I couldn't generate a response."
+                yield sse_event("token", {"text": response_text})
             
             # Check if there's a visualization
             visualization = result.get("visualization")
             if visualization and visualization.get("config"):
-                # Append visualization marker
+                yield sse_event("chart", visualization)
+                # Stored messages keep the inline marker used by session history
                 response_text += "\n\n[PLOTLY_CHART]" + json.dumps(visualization["config"]) + "[/PLOTLY_CHART]"
             
-            # Stream the response
-            for char in response_text:
-                yield char
-            
             # Save assistant message
             await save_message(session_id, "assistant", response_text)
             
+            yield sse_event("done", {
+                "agent_used": result.get("agent_used", "none"),
+                "success": result.get("success", False)
+            })
+            
         except Exception as e:
             error_msg = f"I encountered an error: {str(e)}. Please check your API key in settings if you've configured one."
             print(f"[Chat API Error] {str(e)}")
-            yield error_msg
+            yield sse_event("error", {"message": error_msg})
             
             if session_id:
                 await save_message(session_id, "assistant", error_msg)
     
-    return StreamingResponse(generate_response(), media_type="text/plain")
+    return StreamingResponse(
+        generate_response(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/sessions", response_model=ChatSessionList)
-async def list_sessions():
-    """List all chat sessions."""
-    conn = await get_db_connection()
-    try:
+async def list_sessions(
+    conn: DbConnection,
+    limit: int = Query(SESSION_PAGE_SIZE, ge=1, le=MAX_SESSION_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """List chat sessions, most recently updated first.
+    
+    Pass the returned next_cursor back as cursor to fetch the following page.
+    """
+    if cursor:
+        updated_at, last_session_id = decode_cursor(cursor)
         sessions = await conn.fetch(
             """
             SELECT session_id, title, created_at, updated_at
             FROM chat_sessions
-            ORDER BY updated_at DESC
-            LIMIT 50
-            """
-        )
-        
-        result = []
-        for session in sessions:
-            result.append(ChatSession(
-                session_id=session['session_id'],
-                title=session['title'],
-                created_at=session['created_at'],
-                updated_at=session['updated_at']
-            ))
-        
-        return ChatSessionList(sessions=result, total=len(result))
-    finally:
-        await conn.close()
-
-@router.get("/sessions/{session_id}", response_model=ChatSession)
-async def get_session(session_id: str):
-    """Get a specific chat session with messages."""
-    conn = await get_db_connection()
-    try:
-        # Get session
-        session = await conn.fetchrow(
-            "SELECT session_id, title, created_at, updated_at FROM chat_sessions WHERE session_id = $1",
-            session_id
+            WHERE (updated_at, session_id) < ($1, $2)
+            ORDER BY updated_at DESC, session_id DESC
+            LIMIT $3
+            """,
+            updated_at, last_session_id, limit + 1
         )
-        
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        # Get messages
-        messages = await conn.fetch(
-            "SELECT role, content, created_at FROM chat_messages WHERE session_id = $1 ORDER BY created_at",
-            session_id
+    else:
+        sessions = await conn.fetch(
+            """
+            SELECT session_id, title, created_at, updated_at
+            FROM chat_sessions
+            ORDER BY updated_at DESC, session_id DESC
+            LIMIT $1
+            """,
+            limit + 1
         )
-        
-        return ChatSession(
+    
+    # The extra row only signals that another page exists
+    next_cursor = None
+    if len(sessions) > limit:
+        sessions = sessions[:limit]
+        last = sessions[-1]
+        next_cursor = encode_cursor(last['updated_at'], last['session_id'])
+    
+    result = []
+    for session in sessions:
+        result.append(ChatSession(
             session_id=session['session_id'],
             title=session['title'],
             created_at=session['created_at'],
-            updated_at=session['updated_at'],
-            messages=[
-                ChatMessage(role=msg['role'], content=msg['content'], created_at=msg['created_at'])
-                for msg in messages
-            ]
+            updated_at=session['updated_at']
+        ))
+    
+    total = await estimate_row_count(conn, "chat_sessions")
+    return ChatSessionList(sessions=result, total=max(total, len(result)), next_cursor=next_cursor)
+
+@router.get("/sessions/{session_id}", response_model=ChatSession)
+async def get_session(
+    conn: DbConnection,
+    session_id: str,
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MAX_MESSAGE_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """Get a chat session with one page of its messages, oldest first.
+    
+    Pages larger than CHAT_MESSAGE_STREAM_THRESHOLD are streamed as JSON from a
+    server-side cursor instead of being built in memory.
+    """
+    # Get session
+    session = await conn.fetchrow(
+        "SELECT session_id, title, created_at, updated_at FROM chat_sessions WHERE session_id = $1",
+        session_id
+    )
+    
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    after = decode_cursor(cursor) if cursor else None
+    query, args = message_page_query(session_id, after, limit)
+    
+    if limit > MESSAGE_STREAM_THRESHOLD:
+        return StreamingResponse(
+            stream_session_json(dict(session), query, args, limit),
+            media_type="application/json"
         )
-    finally:
-        await conn.close()
+    
+    # Get messages
+    messages = await conn.fetch(query, *args)
+    
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1]['created_at'], messages[-1]['id'])
+    
+    return ChatSession(
+        session_id=session['session_id'],
+        title=session['title'],
+        created_at=session['created_at'],
+        updated_at=session['updated_at'],
+        messages=[
+            ChatMessage(role=msg['role'], content=msg['content'], created_at=msg['created_at'])
+            for msg in messages
+        ],
+        next_cursor=next_cursor
+    )
 
 @router.delete("/sessions/{session_id}")
-async def delete_session(session_id: str):
+async def delete_session(conn: DbConnection, session_id: str):
     """Delete a chat session."""
-    conn = await get_db_connection()
-    try:
-        result = await conn.execute(
-            "DELETE FROM chat_sessions WHERE session_id = $1",
-            session_id
-        )
-        
-        if result == "DELETE 0":
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        return {"message": "Session deleted successfully"}
-    finally:
-        await conn.close()
+    result = await conn.execute(
+        "DELETE FROM chat_sessions WHERE session_id = $1",
+        session_id
+    )
+    
+    if result == "DELETE 0":
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    return {"message": "Session deleted successfully"}
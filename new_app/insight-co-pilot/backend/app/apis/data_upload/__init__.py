@@ -4,13 +4,14 @@ from fastapi import APIRouter, HTTPException, UploadFile, File, Form
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-import databutton as db
-import asyncpg
 import pandas as pd
 import numpy as np
 import io
 import json
 
+from app.libs.database import DbConnection, acquire
+from app.libs.system_context import invalidate_system_context
+
 router = APIRouter(prefix="/data")
 
 # ============================================================================
@@ -60,15 +61,6 @@ class StatisticalProfileResponse(BaseModel):
     categorical_columns_count: int
     datetime_columns_count: int
 
-# ============================================================================
-# Database Connection Helper
-# ============================================================================
-
-async def get_db_connection():
-    """Get database connection."""
-    database_url = db.secrets.get("DATABASE_URL_DEV")
-    return await asyncpg.connect(database_url)
-
 # ============================================================================
 # Helper Functions
 # ============================================================================
@@ -210,8 +202,7 @@ async def upload_dataset(
                 "dtype": str(df[col].dtype)
             }
         
-        conn = await get_db_connection()
-        try:
+        async with acquire() as conn:
             async with conn.transaction():
                 # Insert dataset metadata
                 dataset_row = await conn.fetchrow(
@@ -252,21 +243,22 @@ async def upload_dataset(
                     print(f"Inserted batch {i//batch_size + 1}: {len(values)} rows")
                 
                 print(f"Dataset {dataset_id} uploaded successfully")
-                
-                return DatasetResponse(
-                    id=dataset_row['id'],
-                    name=dataset_row['name'],
-                    description=dataset_row['description'],
-                    lob_id=dataset_row['lob_id'],
-                    business_unit_id=dataset_row['business_unit_id'],
-                    filename=dataset_row['filename'],
-                    row_count=dataset_row['row_count'],
-                    column_count=dataset_row['column_count'],
-                    columns_info=json.loads(dataset_row['columns_info']),
-                    uploaded_at=dataset_row['uploaded_at']
-                )
-        finally:
-            await conn.close()
+            
+            # Invalidate after commit so a concurrent rebuild sees the new dataset
+            invalidate_system_context()
+            
+            return DatasetResponse(
+                id=dataset_row['id'],
+                name=dataset_row['name'],
+                description=dataset_row['description'],
+                lob_id=dataset_row['lob_id'],
+                business_unit_id=dataset_row['business_unit_id'],
+                filename=dataset_row['filename'],
+                row_count=dataset_row['row_count'],
+                column_count=dataset_row['column_count'],
+                columns_info=json.loads(dataset_row['columns_info']),
+                uploaded_at=dataset_row['uploaded_at']
+            )
             
     except pd.errors.EmptyDataError:
         raise HTTPException(status_code=400, detail="CSV file is empty or invalid")
@@ -278,74 +270,36 @@ async def upload_dataset(
 
 @router.get("/datasets", response_model=DatasetListResponse)
 async def list_datasets(
+    conn: DbConnection,
     lob_id: Optional[int] = None,
     business_unit_id: Optional[int] = None
 ):
     """List all uploaded datasets."""
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT id, name, description, lob_id, business_unit_id, 
-                   filename, row_count, column_count, columns_info, uploaded_at
-            FROM datasets
-            WHERE 1=1
-        """
-        params = []
-        param_count = 0
-        
-        if lob_id:
-            param_count += 1
-            query += f" AND lob_id = ${param_count}"
-            params.append(lob_id)
-        
-        if business_unit_id:
-            param_count += 1
-            query += f" AND business_unit_id = ${param_count}"
-            params.append(business_unit_id)
-        
-        query += " ORDER BY uploaded_at DESC"
-        
-        rows = await conn.fetch(query, *params)
-        
-        datasets = [
-            DatasetResponse(
-                id=row['id'],
-                name=row['name'],
-                description=row['description'],
-                lob_id=row['lob_id'],
-                business_unit_id=row['business_unit_id'],
-                filename=row['filename'],
-                row_count=row['row_count'],
-                column_count=row['column_count'],
-                columns_info=json.loads(row['columns_info']),
-                uploaded_at=row['uploaded_at']
-            )
-            for row in rows
-        ]
-        
-        return DatasetListResponse(datasets=datasets, total=len(datasets))
-    finally:
-        await conn.close()
-
-@router.get("/datasets/{dataset_id}", response_model=DatasetResponse)
-async def get_dataset(dataset_id: int):
-    """Get dataset metadata."""
-    conn = await get_db_connection()
-    try:
-        row = await conn.fetchrow(
-            """
-            SELECT id, name, description, lob_id, business_unit_id, 
-                   filename, row_count, column_count, columns_info, uploaded_at
-            FROM datasets
-            WHERE id = $1
-            """,
-            dataset_id
-        )
-        
-        if not row:
-            raise HTTPException(status_code=404, detail="Dataset not found")
-        
-        return DatasetResponse(
+    query = """
+        SELECT id, name, description, lob_id, business_unit_id, 
+               filename, row_count, column_count, columns_info, uploaded_at
+        FROM datasets
+        WHERE 1=1
+    """
+    params = []
+    param_count = 0
+    
+    if lob_id:
+        param_count += 1
+        query += f" AND lob_id = ${param_count}"
+        params.append(lob_id)
+    
+    if business_unit_id:
+        param_count += 1
+        query += f" AND business_unit_id = ${param_count}"
+        params.append(business_unit_id)
+    
+    query += " ORDER BY uploaded_at DESC"
+    
+    rows = await conn.fetch(query, *params)
+    
+    datasets = [
+        DatasetResponse(
             id=row['id'],
             name=row['name'],
             description=row['description'],
@@ -357,59 +311,83 @@ async def get_dataset(dataset_id: int):
             columns_info=json.loads(row['columns_info']),
             uploaded_at=row['uploaded_at']
         )
-    finally:
-        await conn.close()
+        for row in rows
+    ]
+    
+    return DatasetListResponse(datasets=datasets, total=len(datasets))
+
+@router.get("/datasets/{dataset_id}", response_model=DatasetResponse)
+async def get_dataset(conn: DbConnection, dataset_id: int):
+    """Get dataset metadata."""
+    row = await conn.fetchrow(
+        """
+        SELECT id, name, description, lob_id, business_unit_id, 
+               filename, row_count, column_count, columns_info, uploaded_at
+        FROM datasets
+        WHERE id = $1
+        """,
+        dataset_id
+    )
+    
+    if not row:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    return DatasetResponse(
+        id=row['id'],
+        name=row['name'],
+        description=row['description'],
+        lob_id=row['lob_id'],
+        business_unit_id=row['business_unit_id'],
+        filename=row['filename'],
+        row_count=row['row_count'],
+        column_count=row['column_count'],
+        columns_info=json.loads(row['columns_info']),
+        uploaded_at=row['uploaded_at']
+    )
 
 @router.get("/datasets/{dataset_id}/analyze", response_model=StatisticalProfileResponse)
-async def analyze_dataset(dataset_id: int):
+async def analyze_dataset(conn: DbConnection, dataset_id: int):
     """Perform statistical profiling on a dataset (DataExplorer agent functionality)."""
-    conn = await get_db_connection()
-    try:
-        # Get dataset metadata
-        dataset_row = await conn.fetchrow(
-            "SELECT id, name, row_count FROM datasets WHERE id = $1",
-            dataset_id
-        )
-        
-        if not dataset_row:
-            raise HTTPException(status_code=404, detail="Dataset not found")
-        
-        # Fetch all data rows
-        rows = await conn.fetch(
-            "SELECT data FROM dataset_rows WHERE dataset_id = $1 ORDER BY row_number",
-            dataset_id
-        )
-        
-        if not rows:
-            raise HTTPException(status_code=400, detail="Dataset has no data")
-        
-        # Convert to DataFrame
-        data_list = [json.loads(row['data']) for row in rows]
-        df = pd.DataFrame(data_list)
-        
-        print(f"Analyzing dataset {dataset_id}: {len(df)} rows, {len(df.columns)} columns")
-        
-        # Perform statistical analysis
-        analysis = await analyze_dataframe(df, dataset_id, dataset_row['name'])
-        
-        return analysis
-        
-    finally:
-        await conn.close()
+    # Get dataset metadata
+    dataset_row = await conn.fetchrow(
+        "SELECT id, name, row_count FROM datasets WHERE id = $1",
+        dataset_id
+    )
+    
+    if not dataset_row:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    # Fetch all data rows
+    rows = await conn.fetch(
+        "SELECT data FROM dataset_rows WHERE dataset_id = $1 ORDER BY row_number",
+        dataset_id
+    )
+    
+    if not rows:
+        raise HTTPException(status_code=400, detail="Dataset has no data")
+    
+    # Convert to DataFrame
+    data_list = [json.loads(row['data']) for row in rows]
+    df = pd.DataFrame(data_list)
+    
+    print(f"Analyzing dataset {dataset_id}: {len(df)} rows, {len(df.columns)} columns")
+    
+    # Perform statistical analysis
+    analysis = await analyze_dataframe(df, dataset_id, dataset_row['name'])
+    
+    return analysis
+    
 
 @router.delete("/datasets/{dataset_id}")
-async def delete_dataset(dataset_id: int):
+async def delete_dataset(conn: DbConnection, dataset_id: int):
     """Delete a dataset and all its data."""
-    conn = await get_db_connection()
-    try:
-        result = await conn.execute(
-            "DELETE FROM datasets WHERE id = $1",
-            dataset_id
-        )
-        
-        if result == "DELETE 0":
-            raise HTTPException(status_code=404, detail="Dataset not found")
-        
-        return {"message": "Dataset deleted successfully"}
-    finally:
-        await conn.close()
+    result = await conn.execute(
+        "DELETE FROM datasets WHERE id = $1",
+        dataset_id
+    )
+    
+    if result == "DELETE 0":
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    invalidate_system_context()
+    return {"message": "Dataset deleted successfully"}
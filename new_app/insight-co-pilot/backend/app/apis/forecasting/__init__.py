@@ -0,0 +1,144 @@
+"""API for forecast training jobs and batch forecasts across all series."""
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+import json
+
+from app.libs.backtesting import backtest_cache_stats
+from app.libs.batch_forecast import latest_forecast, run_batch
+from app.libs.model_store import forecast_series, get_model_store
+from app.libs.series_features import feature_cache_stats
+from app.libs.training_service import TrainingQueueFull, get_training_service
+
+router = APIRouter(prefix="/forecasting")
+
+# ============================================================================
+# Pydantic Models
+# ============================================================================
+
+class ForecastJobCreate(BaseModel):
+    lob_id: int = Field(..., description="ID of the LOB to forecast")
+    metric_name: str = Field(..., description="Metric to forecast; each metric of a LOB is a separate series")
+    periods: int = Field(12, ge=1, le=104, description="Weeks to forecast")
+
+class ForecastJobResponse(BaseModel):
+    id: Optional[str] = None
+    label: Optional[str] = None
+    status: str
+    submitted_at: Optional[float] = None
+    queued_seconds: Optional[float] = None
+    run_seconds: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+
+class BatchForecastRequest(BaseModel):
+    periods: int = Field(12, ge=1, le=104, description="Weeks to forecast")
+    lob_ids: Optional[List[int]] = Field(None, description="Only these LOBs; every LOB when omitted")
+    metric_names: Optional[List[str]] = Field(None, description="Only these metrics; every metric when omitted")
+    include_predictions: bool = Field(True, description="Include predictions in each streamed series record")
+
+# ============================================================================
+# Job Endpoints
+# ============================================================================
+
+@router.post("/jobs", response_model=ForecastJobResponse, status_code=202)
+async def create_forecast_job(request: ForecastJobCreate):
+    """Queue a forecast. Poll GET /jobs/{job_id} until it finishes.
+
+    A series whose stored model is still current is answered immediately
+    with status "succeeded".
+    """
+    try:
+        outcome = await forecast_series(request.lob_id, request.metric_name, request.periods, wait=False)
+    except TrainingQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+    if "error" in outcome:
+        raise HTTPException(status_code=400, detail=outcome["error"])
+    if "job" in outcome:
+        return outcome["job"].as_dict()
+    return {"status": "succeeded", "result": outcome}
+
+
+@router.get("/jobs", response_model=List[ForecastJobResponse])
+async def list_forecast_jobs():
+    """Recent training jobs, newest first, without their results."""
+    jobs = get_training_service().jobs.values()
+    return [job.as_dict(include_result=False) for job in reversed(list(jobs))]
+
+
+@router.get("/jobs/{job_id}", response_model=ForecastJobResponse)
+async def get_forecast_job(job_id: str):
+    """Status of a training job, with its result once it has succeeded."""
+    job = get_training_service().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.as_dict()
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_forecast_job(job_id: str):
+    """Cancel a queued or running training job."""
+    service = get_training_service()
+    job = service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not service.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return {"message": "Job cancelled successfully"}
+
+
+# ============================================================================
+# Batch Endpoints
+# ============================================================================
+
+@router.post("/batch", tags=["stream"])
+async def batch_forecast(request: BatchForecastRequest):
+    """Forecast every (lob_id, metric_name) series, streaming NDJSON.
+
+    Emits a "start" record, one "series" record per series as it finishes
+    (status, cache, per-phase seconds, predictions), and a final "summary".
+    Forecasts are persisted to the forecasts table under the run_id.
+    """
+    async def generate():
+        async for record in run_batch(
+            request.periods, request.lob_ids, request.metric_names, request.include_predictions
+        ):
+            yield json.dumps(record, default=str) + "\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/forecasts/{lob_id}/{metric_name}")
+async def get_latest_forecast(lob_id: int, metric_name: str):
+    """The most recent persisted batch forecast of one series."""
+    rows = await latest_forecast(lob_id, metric_name)
+    if not rows:
+        raise HTTPException(status_code=404, detail="No forecast found for this series")
+    return {
+        "lob_id": lob_id,
+        "metric_name": metric_name,
+        "run_id": rows[0]["run_id"],
+        "created_at": rows[0]["created_at"],
+        "predictions": [
+            {key: row[key] for key in ("week_date", "yhat", "yhat_lower", "yhat_upper")}
+            for row in rows
+        ],
+    }
+
+
+@router.get("/stats")
+async def forecasting_stats():
+    """Training queue, model store, backtest and feature cache counters."""
+    return {
+        "training": get_training_service().stats(),
+        "model_store": get_model_store().stats(),
+        "backtests": backtest_cache_stats(),
+        "features": feature_cache_stats(),
+    }
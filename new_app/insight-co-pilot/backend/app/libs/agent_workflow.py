@@ -4,26 +4,102 @@ This module uses LangGraph's StateGraph to orchestrate agent selection and execu
 with conditional routing, state persistence, and error recovery.
 """
 
-from typing import TypedDict, Annotated, Sequence, Literal
+from typing import TypedDict, Annotated, Sequence, Literal, AsyncIterator, Optional, Tuple
+from collections import OrderedDict
+from contextvars import ContextVar
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
-import operator
-from openai import OpenAI
-import databutton as db
-import json
+import asyncio
+import hashlib
+import os
 import re
+import time
 
 from app.libs.agents import (
     get_agent,
     list_all_agents,
     AGENT_REGISTRY
 )
+from app.libs.llm_provider import get_llm_provider
+from app.libs.checkpointer import get_checkpointer
+from app.libs.context_builder import ContextBuilder
+from app.libs.entity_resolver import resolve_entities
+from app.libs.intent_classifier import classify_intent
+from app.libs.planner import build_plan, execute_plan
+from app.libs.response_templates import render_response
+
+
+# ============================================================================
+# TOKEN STREAMING
+# ============================================================================
+
+# Queue receiving response deltas for the current run. Held in a context
+# variable rather than the graph config so it never reaches the checkpointer.
+_token_queue: ContextVar[Optional[asyncio.Queue]] = ContextVar("token_queue", default=None)
+
+_STREAM_END = object()
+
+STREAM_MIN_CHUNK_CHARS = int(os.environ.get("STREAM_MIN_CHUNK_CHARS", 24))
+STREAM_MAX_CHUNK_DELAY_MS = float(os.environ.get("STREAM_MAX_CHUNK_DELAY_MS", 40))
+
+
+async def coalesce_tokens(
+    queue: asyncio.Queue,
+    min_chars: int = STREAM_MIN_CHUNK_CHARS,
+    max_delay_ms: float = STREAM_MAX_CHUNK_DELAY_MS,
+) -> AsyncIterator[str]:
+    """Merge token deltas into larger chunks.
+    
+    A chunk is flushed once it holds min_chars characters or its first delta
+    has waited max_delay_ms, whichever comes first.
+    
+    Args:
+        queue: Queue of text deltas, terminated by _STREAM_END
+        min_chars: Flush threshold in characters
+        max_delay_ms: Maximum time a delta is held back
+    """
+    buffer = []
+    size = 0
+    deadline = None
+    
+    while True:
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        try:
+            item = await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            item = None
+        
+        if item is not None and item is not _STREAM_END:
+            if not buffer:
+                deadline = time.monotonic() + max_delay_ms / 1000
+            buffer.append(item)
+            size += len(item)
+            if size < min_chars:
+                continue
+        
+        if buffer:
+            yield "".join(buffer)
+            buffer, size, deadline = [], 0, None
+        
+        if item is _STREAM_END:
+            return
 
 
 # ============================================================================
 # STATE DEFINITION
 # ============================================================================
 
+MAX_STATE_MESSAGES = int(os.environ.get("MAX_STATE_MESSAGES", 20))
+
+
+def append_bounded(existing: Sequence[dict], new: Sequence[dict]) -> list:
+    """Reducer appending messages while keeping only the newest MAX_STATE_MESSAGES.
+    
+    Checkpoints persist state across turns, so an unbounded reducer would grow
+    every session's stored state forever.
+    """
+    return (list(existing or []) + list(new or []))[-MAX_STATE_MESSAGES:]
+
+
 class AgentState(TypedDict):
     """State that flows through the agent workflow."""
     # User input
@@ -31,11 +107,14 @@ class AgentState(TypedDict):
     session_id: str
     
     # Conversation context
-    messages: Annotated[Sequence[dict], operator.add]
+    messages: Annotated[Sequence[dict], append_bounded]
+    history: list  # Prior chat turns as {"role", "content"}, oldest first
+    polish: bool  # Rewrite template responses with the LLM
     
     # Agent routing
     selected_agent: str
     agent_params: dict
+    plan: list  # Agent steps from the planner; more than one runs as a DAG
     
     # Agent results
     agent_response: dict
@@ -56,10 +135,9 @@ class AgentWorkflow:
     
     def __init__(self, api_key: str = None, model: str = None):
         # Use provided API key or fall back to default
-        openai_key = api_key or db.secrets.get("OPENAI_API_KEY")
-        self.openai_client = OpenAI(api_key=openai_key)
+        self.llm = get_llm_provider(api_key=api_key)
         self.model = model or "gpt-4o-mini"
-        self.memory = MemorySaver()
+        self.memory = get_checkpointer()
         self.graph = self._build_graph()
     
     def _build_graph(self) -> StateGraph:
@@ -107,149 +185,167 @@ class AgentWorkflow:
     # NODE FUNCTIONS
     # ========================================================================
     
-    async def classify_intent(self, state: AgentState) -> AgentState:
+    # Nodes return only the keys they change. The messages reducer appends,
+    # so returning the whole state would append the history to itself.
+    
+    async def classify_intent(self, state: AgentState) -> dict:
         """Classify user intent to determine which agent to use."""
-        user_query = state["user_query"].lower()
-        
-        # Simple rule-based classification for common patterns
-        # This is more reliable than pure LLM classification and prevents hallucinations
-        selected_agent = "none"
-        params = {}
-        reasoning = ""
-        
-        # Data fetching patterns
-        if any(word in user_query for word in ["show", "list", "get", "fetch", "what data", "available", "datasets"]):
-            selected_agent = "data_fetcher"
-            params = {"query_type": "datasets"}
-            reasoning = "User wants to view available data"
-            
-            if "business unit" in user_query:
-                params["query_type"] = "business_units"
-            elif "metric" in user_query:
-                params["query_type"] = "metrics"
-        
-        # Comparison and analysis patterns
-        elif any(word in user_query for word in ["compare", "comparison", "versus", "vs", "difference between"]):
-            selected_agent = "comparison_analyzer"
-            params = {"comparison_type": "lob_comparison"}
-            reasoning = "User wants to compare metrics"
-        
-        # Forecasting patterns
-        elif any(word in user_query for word in ["forecast", "predict", "projection", "future", "next quarter", "next year"]):
-            selected_agent = "model_trainer"
-            params = {"model_type": "prophet"}
-            reasoning = "User wants forecasting"
-        
-        # Trend analysis patterns
-        elif any(word in user_query for word in ["trend", "pattern", "insight", "analyze"]):
-            selected_agent = "insights_analyzer"
-            params = {"analysis_type": "trend_analysis"}
-            reasoning = "User wants trend analysis"
-        
-        # Scenario modeling patterns
-        elif any(word in user_query for word in ["what if", "scenario", "simulate", "impact", "growth rate"]):
-            selected_agent = "scenario_modeler"
-            params = {"scenario_type": "growth_projection"}
-            reasoning = "User wants scenario modeling"
-        
-        # Data exploration patterns
-        elif any(word in user_query for word in ["explore", "statistics", "summary", "describe", "profile"]):
-            selected_agent = "data_explorer"
+        # Rule-based classification is more reliable than pure LLM
+        # classification and prevents hallucinations
+        intent = classify_intent(state["user_query"])
+        selected_agent = intent["agent"]
+        params = intent["params"]
+        reasoning = intent["reasoning"]
+        
+        # Map BU/LOB/dataset/metric names to IDs for the agent parameters
+        try:
+            entities = await resolve_entities(state["user_query"])
+        except Exception as e:
+            print(f"[Entity Resolution] Skipped: {str(e)}")
+            entities = None
+        
+        # Queries asking for several things get one step per agent (and LOB)
+        plan = build_plan(state["user_query"], intent, entities)
+        if len(plan) > 1:
+            selected_agent = "+".join(dict.fromkeys(step["agent"] for step in plan))
             params = {}
-            reasoning = "User wants data exploration"
-        
-        # Visualization patterns - add explicit detection
-        elif any(word in user_query for word in ["visualize", "plot", "chart", "graph", "show me a"]):
-            selected_agent = "visualizer"
-            # Determine chart type based on keywords
-            if "line" in user_query or "time" in user_query:
-                params = {"viz_type": "line_chart", "data": [], "title": "Time Series"}
-            elif "bar" in user_query or "compare" in user_query:
-                params = {"viz_type": "bar_chart", "data": [], "title": "Comparison"}
-            else:
-                params = {"viz_type": "line_chart", "data": [], "title": "Data Visualization"}
-            reasoning = "User wants data visualization"
-        
-        # Create/manage patterns
-        elif any(word in user_query for word in ["create", "add", "new", "delete", "remove", "update"]):
-            selected_agent = "crud_manager"
-            params = {"operation": "list"}  # Default to list, more specific parsing could be added
-            reasoning = "User wants to manage entities"
-        
-        print(f"[Intent Classification] {reasoning} -> Agent: {selected_agent}")
-        
-        state["selected_agent"] = selected_agent
-        state["agent_params"] = params
-        state["messages"] = [{"role": "system", "content": f"Intent classified: {reasoning}"}]
-        
-        return state
+            reasoning = f"User request needs {len(plan)} agent calls"
+        elif plan:
+            params = plan[0]["params"]
+        
+        print(f"[Intent Classification] {reasoning} -> Agent: {selected_agent} ({intent['method']}, score {intent['score']})")
+        
+        return {
+            "selected_agent": selected_agent,
+            "agent_params": params,
+            "plan": plan,
+            "messages": [{"role": "system", "content": f"Intent classified: {reasoning}"}],
+        }
     
     def should_route_to_agent(self, state: AgentState) -> Literal["route", "direct", "error"]:
         """Decide if query should be routed to an agent."""
         if state.get("error"):
             return "error"
         
-        selected_agent = state.get("selected_agent", "none")
+        plan = state.get("plan") or []
         
-        if selected_agent == "none" or selected_agent not in AGENT_REGISTRY:
+        if not plan or any(step["agent"] not in AGENT_REGISTRY for step in plan):
             return "direct"
         
         return "route"
     
-    async def route_to_agent(self, state: AgentState) -> AgentState:
+    async def route_to_agent(self, state: AgentState) -> dict:
         """Prepare parameters for agent execution."""
         # Additional routing logic or parameter preparation can go here
-        state["messages"] = state.get("messages", []) + [
-            {"role": "system", "content": f"Routing to {state['selected_agent']} agent"}
-        ]
-        return state
+        return {
+            "messages": [{"role": "system", "content": f"Routing to {state['selected_agent']} agent"}]
+        }
     
-    async def execute_agent(self, state: AgentState) -> AgentState:
-        """Execute the selected agent."""
+    async def execute_agent(self, state: AgentState) -> dict:
+        """Execute the selected agent, or every step of a multi-agent plan."""
+        if len(state.get("plan") or []) > 1:
+            return await self.execute_plan(state)
+        
         agent_name = state["selected_agent"]
         params = state["agent_params"]
         
         try:
             agent = get_agent(agent_name)
             if not agent:
-                state["error"] = f"Agent {agent_name} not found"
-                return state
+                return {"error": f"Agent {agent_name} not found"}
             
             # Execute agent
             result = await agent.execute(params)
-            state["agent_response"] = result
-            
-            state["messages"] = state.get("messages", []) + [
-                {"role": "system", "content": f"Agent {agent_name} executed successfully"}
-            ]
-            
         except Exception as e:
-            state["error"] = f"Agent execution failed: {str(e)}"
+            return {"error": f"Agent execution failed: {str(e)}"}
+        
+        return {
+            "agent_response": result,
+            "messages": [{"role": "system", "content": f"Agent {agent_name} executed successfully"}],
+        }
+    
+    async def execute_plan(self, state: AgentState) -> dict:
+        """Run plan steps concurrently and merge their results."""
+        plan = state["plan"]
+        
+        async def run_step(agent_name: str, params: dict) -> dict:
+            agent = get_agent(agent_name)
+            if not agent:
+                return {"error": f"Agent {agent_name} not found"}
+            return await agent.execute(params)
+        
+        results = await execute_plan(plan, run_step)
         
-        return state
+        steps = [
+            {"agent": step["agent"], "result": results.get(step["id"], {})}
+            for step in plan
+        ]
+        succeeded = [step for step in steps if not step["result"].get("error")]
+        if not succeeded:
+            return {"error": "; ".join(f"{step['agent']}: {step['result']['error']}" for step in steps)}
+        
+        merged = {"success": True, "steps": steps}
+        # Surface the first chart so the UI renders it as for a single agent
+        for step in succeeded:
+            if "chart_config" in step["result"]:
+                merged["viz_type"] = step["result"].get("viz_type", "chart")
+                merged["chart_config"] = step["result"]["chart_config"]
+                break
+        
+        return {
+            "agent_response": merged,
+            "messages": [
+                {"role": "system", "content": f"Plan executed: {len(succeeded)} of {len(steps)} agents succeeded"}
+            ],
+        }
     
     def check_execution_result(self, state: AgentState) -> Literal["success", "error"]:
         """Check if agent execution was successful."""
         if state.get("error"):
             return "error"
         
-        agent_response = state.get("agent_response", {})
+        agent_response = state.get("agent_response") or {}
         if agent_response.get("error"):
-            state["error"] = agent_response["error"]
+            # handle_error records it; edge functions cannot update state
             return "error"
         
         return "success"
     
-    async def generate_response(self, state: AgentState) -> AgentState:
-        """Generate final response using LLM based on agent results."""
+    async def generate_response(self, state: AgentState) -> dict:
+        """Generate the final response from agent results, via template or LLM."""
         user_query = state["user_query"]
         agent_response = state.get("agent_response")
         selected_agent = state.get("selected_agent", "none")
+        use_agent = selected_agent != "none" and bool(agent_response)
+        
+        # Validate agent response structure to prevent hallucinations
+        if use_agent and not isinstance(agent_response, dict):
+            return await self.handle_error({**state, "error": "Invalid agent response format"})
+        
+        # Deterministic results render from a template without an LLM call
+        draft = render_response(selected_agent, agent_response) if use_agent else None
+        if draft is not None and not state.get("polish"):
+            token_queue = _token_queue.get()
+            if token_queue is not None:
+                token_queue.put_nowait(draft)
+            return {"final_response": draft}
+        
+        # Fit history and agent results into the prompt token budget
+        context = ContextBuilder(model=self.model).build(
+            history=state.get("history"),
+            agent_response=agent_response if use_agent and draft is None else None
+        )
+        history_section = ""
+        if context["history"]:
+            history_section = f"""
+Conversation so far:
+{context["history"]}
+"""
         
         # If no agent was used, generate direct response
-        if selected_agent == "none" or not agent_response:
+        if not use_agent:
             prompt = f"""You are Insight Co-Pilot, a business analytics assistant.
-
+{history_section}
 User question: {user_query}
 
 Provide a helpful, conversational response. Explain what capabilities you have:
@@ -260,21 +356,32 @@ Provide a helpful, conversational response. Explain what capabilities you have:
 - Run scenario simulations
 
 If you need data, suggest what the user should provide or upload.
+"""
+        elif draft is not None:
+            # Polish pass: the rendered template is the draft to rewrite
+            prompt = f"""You are Insight Co-Pilot, a business analytics assistant.
+{history_section}
+User question: {user_query}
+
+The {selected_agent} agent's results, already formatted:
+{draft}
+
+Rewrite this as a clear, conversational response that answers the user's question.
+Keep every name, ID and number exactly as given and keep tables where they help.
+Do not add data that is not in the draft.
 """
         else:
             # Generate response based on agent results
-            # Validate agent response structure to prevent hallucinations
-            if not isinstance(agent_response, dict):
-                state["error"] = "Invalid agent response format"
-                return await self.handle_error(state)
-            
-            agent_data = json.dumps(agent_response, indent=2, default=str)
+            agent_label = f"{selected_agent} agent"
+            if len(state.get("plan") or []) > 1:
+                agent_label = f"{selected_agent.replace('+', ', ')} agents (one entry per step)"
             prompt = f"""You are Insight Co-Pilot, a business analytics assistant.
-
+{history_section}
 User question: {user_query}
 
-The {selected_agent} agent has analyzed the request and provided these results:
-{agent_data}
+The {agent_label} analyzed the request and provided these results
+(JSON; long row arrays are sampled, with "_truncated" giving the full row count and column stats):
+{context["agent_data"]}
 
 Generate a clear, conversational response that:
 1. Directly answers the user's question based ONLY on the provided data
@@ -288,26 +395,50 @@ IMPORTANT: Only use information from the agent results. Do not invent or halluci
 Keep the response concise and focused.
 """
         
+        messages = [{"role": "user", "content": prompt}]
+        token_queue = _token_queue.get()
+        
+        if token_queue is None:
+            try:
+                final_response = await self.llm.complete(
+                    messages=messages,
+                    model=self.model,
+                    temperature=0.7,
+                    max_tokens=500
+                )
+            except Exception as e:
+                final_response = f"I encountered an error generating the response: {str(e)}"
+            return {"final_response": final_response}
+        
+        # Streaming run: forward every delta, so final_response is exactly what was sent
+        parts = []
         try:
-            response = self.openai_client.chat.completions.create(
+            async for delta in self.llm.stream(
+                messages=messages,
                 model=self.model,
-                messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
                 max_tokens=500
-            )
-            
-            state["final_response"] = response.choices[0].message.content
-            
+            ):
+                parts.append(delta)
+                token_queue.put_nowait(delta)
         except Exception as e:
-            state["final_response"] = f"I encountered an error generating the response: {str(e)}"
+            error_text = f"I encountered an error generating the response: {str(e)}"
+            if parts:
+                error_text = "\n\n" + error_text
+            parts.append(error_text)
+            token_queue.put_nowait(error_text)
         
-        return state
+        return {"final_response": "".join(parts)}
     
-    async def handle_error(self, state: AgentState) -> AgentState:
+    async def handle_error(self, state: AgentState) -> dict:
         """Handle errors gracefully."""
-        error_msg = state.get("error", "Unknown error occurred")
+        error_msg = (
+            state.get("error")
+            or (state.get("agent_response") or {}).get("error")
+            or "Unknown error occurred"
+        )
         
-        state["final_response"] = f"""I apologize, but I encountered an issue: {error_msg}
+        final_response = f"""I apologize, but I encountered an issue: {error_msg}
 
 Please try:
 - Rephrasing your question
@@ -316,39 +447,49 @@ Please try:
 
 I'm here to help with data analysis, forecasting, and business insights!"""
         
-        return state
+        return {"error": error_msg, "final_response": final_response}
     
     # ========================================================================
     # PUBLIC API
     # ========================================================================
     
-    async def process_query(self, user_query: str, session_id: str, context: dict = None) -> dict:
+    async def process_query(
+        self,
+        user_query: str,
+        session_id: str,
+        context: dict = None,
+        token_queue: asyncio.Queue = None
+    ) -> dict:
         """Process a user query through the agent workflow.
         
         Args:
             user_query: The user's question or request
             session_id: Unique session identifier for state persistence
-            context: Optional additional context (database info, etc.)
+            context: Optional additional context (database info, etc.). A
+                "history" entry holds prior turns for the response prompt, and
+                "polish" asks for template responses to be rewritten by the LLM.
+            token_queue: Optional queue receiving response deltas as they are generated
         
         Returns:
             dict with response, agent_used, visualization data, and any additional data
         """
+        _token_queue.set(token_queue)
+        
         # Initial state
         initial_state = AgentState(
             user_query=user_query,
             session_id=session_id,
             messages=[],
+            history=(context or {}).get("history", []),
+            polish=bool((context or {}).get("polish", False)),
             selected_agent="",
             agent_params={},
+            plan=[],
             agent_response={},
             final_response="",
             error=None
         )
         
-        # Add context to agent params if provided
-        if context:
-            initial_state["agent_params"] = context
-        
         # Run the workflow
         config = {"configurable": {"thread_id": session_id}}
         
@@ -387,12 +528,118 @@ I'm here to help with data analysis, forecasting, and business insights!"""
             }
 
 
+    async def stream_query(
+        self,
+        user_query: str,
+        session_id: str,
+        context: dict = None
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """Process a user query, yielding response text as it is generated.
+        
+        Yields ("token", text) for coalesced response chunks, then a single
+        ("result", dict) with the same shape process_query returns. Only text
+        produced by the final LLM call is streamed; responses built without it
+        (errors, for example) arrive in the result alone.
+        """
+        token_queue: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(
+            self.process_query(user_query, session_id, context, token_queue=token_queue)
+        )
+        task.add_done_callback(lambda _: token_queue.put_nowait(_STREAM_END))
+        
+        try:
+            async for chunk in coalesce_tokens(token_queue):
+                yield "token", chunk
+            yield "result", await task
+        finally:
+            # Client went away mid-stream; stop the run instead of finishing it unseen
+            if not task.done():
+                task.cancel()
+
+
 # ============================================================================
-# SINGLETON INSTANCE
+# WORKFLOW CACHE
 # ============================================================================
 
+class WorkflowCache:
+    """Bounded LRU cache of compiled workflows keyed by API key and model.
+    
+    Workflows hold no per-request state, so one instance serves every
+    message for the same configuration. Entries idle for longer than
+    idle_ttl_seconds are dropped on the next lookup; the least recently used
+    entry is evicted once max_size is exceeded. Keys are hashed so raw API
+    keys are never held as dict keys or exposed in stats.
+    """
+    
+    def __init__(self, max_size: int = 32, idle_ttl_seconds: float = 1800):
+        self.max_size = max_size
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[AgentWorkflow, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    @staticmethod
+    def cache_key(api_key: Optional[str], model: Optional[str]) -> str:
+        return hashlib.sha256(f"{api_key or ''}\0{model or ''}".encode()).hexdigest()
+    
+    def _expire_idle(self, now: float):
+        # Entries are in recency order, so stop at the first live one
+        while self._entries:
+            key, (_, last_used) = next(iter(self._entries.items()))
+            if now - last_used < self.idle_ttl_seconds:
+                break
+            del self._entries[key]
+            self.expirations += 1
+    
+    def get(self, api_key: Optional[str], model: Optional[str]) -> AgentWorkflow:
+        """Return the cached workflow for this configuration, building it on a miss."""
+        now = time.monotonic()
+        self._expire_idle(now)
+        key = self.cache_key(api_key, model)
+        
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            workflow = entry[0]
+            self._entries[key] = (workflow, now)
+            self._entries.move_to_end(key)
+            return workflow
+        
+        self.misses += 1
+        workflow = AgentWorkflow(api_key=api_key, model=model)
+        self._entries[key] = (workflow, now)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return workflow
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "idle_ttl_seconds": self.idle_ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+_workflow_cache = WorkflowCache(
+    max_size=int(os.environ.get("WORKFLOW_CACHE_SIZE", 32)),
+    idle_ttl_seconds=float(os.environ.get("WORKFLOW_CACHE_IDLE_TTL_SECONDS", 1800)),
+)
+
+
 def get_workflow(api_key: str = None, model: str = None) -> AgentWorkflow:
-    """Get or create a workflow instance with custom API configuration.
+    """Get a cached workflow instance for the given API configuration.
     
     Args:
         api_key: OpenAI API key (if None, uses default from secrets)
@@ -401,6 +648,9 @@ def get_workflow(api_key: str = None, model: str = None) -> AgentWorkflow:
     Returns:
         AgentWorkflow instance
     """
-    # Create new instance with custom configuration
-    # Note: In production, you might want to cache instances per user
-    return AgentWorkflow(api_key=api_key, model=model)
+    return _workflow_cache.get(api_key, model)
+
+
+def workflow_cache_stats() -> dict:
+    """Hit, miss and eviction counters for the workflow cache."""
+    return _workflow_cache.stats()
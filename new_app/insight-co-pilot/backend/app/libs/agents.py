@@ -10,19 +10,30 @@ This module contains all specialized agents organized into three categories:
 """
 
 from typing import Dict, Any, List, Optional
-import asyncpg
-import databutton as db
 import json
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 import plotly.express as px
-from prophet import Prophet
-from sklearn.metrics import mean_absolute_error, mean_squared_error
 import io
 import base64
 
+from app.libs.database import acquire
+from app.libs.backtesting import backtest_series, rounded, score_forecasts
+from app.libs.forecasters import FORECASTERS, MIN_SERIES_LENGTH, forecast, resolve_model_type
+from app.libs.model_store import fetch_series, forecast_series, resolve_metric
+from app.libs.scenario_engine import (
+    SCENARIO_MC_PATHS,
+    as_array,
+    historical_dynamics,
+    project_grid,
+    sensitivity,
+    simulate_paths,
+    summarize_paths,
+)
+from app.libs.series_features import select_model
+
 
 class BaseAgent:
     """Base class for all agents."""
@@ -31,11 +42,6 @@ class BaseAgent:
         self.name = name
         self.description = description
     
-    async def get_db_connection(self):
-        """Get database connection."""
-        database_url = db.secrets.get("DATABASE_URL_DEV")
-        return await asyncpg.connect(database_url)
-    
     async def execute(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Execute agent task. To be overridden by subclasses."""
         raise NotImplementedError("Subclasses must implement execute()")
@@ -59,8 +65,7 @@ class DataFetcherAgent(BaseAgent):
         query_type = params.get("query_type", "datasets")
         filters = params.get("filters", {})
         
-        conn = await self.get_db_connection()
-        try:
+        async with acquire() as conn:
             if query_type == "datasets":
                 return await self._fetch_datasets(conn, filters)
             elif query_type == "metrics":
@@ -69,8 +74,6 @@ class DataFetcherAgent(BaseAgent):
                 return await self._fetch_business_units(conn, filters)
             else:
                 return {"error": f"Unknown query_type: {query_type}"}
-        finally:
-            await conn.close()
     
     async def _fetch_datasets(self, conn, filters):
         """Fetch datasets with optional filters."""
@@ -84,14 +87,16 @@ class DataFetcherAgent(BaseAgent):
         }
     
     async def _fetch_metrics(self, conn, filters):
-        """Fetch weekly metrics."""
-        lob_id = filters.get("lob_id")
-        if lob_id:
-            query = "SELECT * FROM weekly_metrics WHERE lob_id = $1 ORDER BY week_date DESC LIMIT 100"
-            metrics = await conn.fetch(query, lob_id)
-        else:
-            query = "SELECT * FROM weekly_metrics ORDER BY week_date DESC LIMIT 100"
-            metrics = await conn.fetch(query)
+        """Fetch weekly metrics, optionally for one LOB and/or metric name."""
+        conditions, args = [], []
+        for column in ("lob_id", "metric_name"):
+            if filters.get(column):
+                args.append(filters[column])
+                conditions.append(f"{column} = ${len(args)}")
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT * FROM weekly_metrics {where} ORDER BY week_date DESC LIMIT 100"
+        metrics = await conn.fetch(query, *args)
         
         return {
             "success": True,
@@ -127,8 +132,7 @@ class CRUDManagerAgent(BaseAgent):
         operation = params.get("operation", "read")
         entity_type = params.get("entity_type", "business_unit")
         
-        conn = await self.get_db_connection()
-        try:
+        async with acquire() as conn:
             if operation == "create":
                 return await self._create_entity(conn, entity_type, params.get("data", {}))
             elif operation == "read":
@@ -137,8 +141,6 @@ class CRUDManagerAgent(BaseAgent):
                 return await self._list_entities(conn, entity_type)
             else:
                 return {"error": f"Operation {operation} not supported"}
-        finally:
-            await conn.close()
     
     async def _create_entity(self, conn, entity_type, data):
         """Create a new entity."""
@@ -194,29 +196,29 @@ class ComparisonAnalyzerAgent(BaseAgent):
         """Compare metrics and generate insights."""
         comparison_type = params.get("comparison_type", "lob_comparison")
         
-        conn = await self.get_db_connection()
-        try:
+        async with acquire() as conn:
             if comparison_type == "lob_comparison":
                 return await self._compare_lobs(conn, params)
             elif comparison_type == "time_series":
                 return await self._analyze_time_series(conn, params)
             else:
                 return {"error": "Unknown comparison_type"}
-        finally:
-            await conn.close()
     
     async def _compare_lobs(self, conn, params):
-        """Compare metrics across different LOBs."""
+        """Compare metrics across different LOBs, or only the given lob_ids."""
+        lob_ids = params.get("lob_ids")
         metrics = await conn.fetch(
-            """
+            f"""
             SELECT l.name as lob_name, 
                    AVG(m.metric_value) as avg_value,
                    COUNT(m.id) as data_points
             FROM weekly_metrics m
             JOIN lobs l ON m.lob_id = l.id
+            {"WHERE l.id = ANY($1)" if lob_ids else ""}
             GROUP BY l.name
             ORDER BY avg_value DESC
-            """
+            """,
+            *([lob_ids] if lob_ids else [])
         )
         
         comparison_data = [dict(row) for row in metrics]
@@ -287,66 +289,135 @@ class ScenarioModelerAgent(BaseAgent):
     def __init__(self):
         super().__init__(
             name="ScenarioModeler",
-            description="Simulates what-if scenarios like revenue impact, growth projections, and sensitivity analysis"
+            description="Simulates what-if scenarios like revenue impact, growth projection grids, sensitivity analysis and Monte Carlo outcome ranges"
         )
     
     async def execute(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Run scenario simulations."""
         scenario_type = params.get("scenario_type", "growth_projection")
         
-        if scenario_type == "growth_projection":
-            return await self._project_growth(params)
-        elif scenario_type == "sensitivity_analysis":
-            return await self._sensitivity_analysis(params)
-        else:
-            return {"error": "Unknown scenario_type"}
+        try:
+            if scenario_type == "growth_projection":
+                return await self._project_growth(params)
+            elif scenario_type == "sensitivity_analysis":
+                return await self._sensitivity_analysis(params)
+            elif scenario_type == "monte_carlo":
+                return await self._monte_carlo(params)
+            else:
+                return {"error": "Unknown scenario_type"}
+        except ValueError as e:
+            return {"error": f"Scenario failed: {str(e)}"}
     
     async def _project_growth(self, params):
-        """Project growth scenarios."""
-        baseline_value = params.get("baseline_value", 100)
-        growth_rate = params.get("growth_rate", 0.05)  # 5% default
+        """Project growth scenarios over every baseline, rate and horizon."""
+        baselines = params.get("baselines", params.get("baseline_value", 100))
+        growth_rates = params.get("growth_rates", params.get("growth_rate", 0.05))  # 5% default
         periods = params.get("periods", 12)
+        horizons = params.get("horizons") or [periods]
+        
+        baselines, growth_rates = as_array(baselines), as_array(growth_rates)
+        # The path of the first scenario, period by period
+        path = project_grid(baselines[:1], growth_rates[:1], range(1, periods + 1))[0, 0]
+        projections = [
+            {"period": i + 1, "projected_value": round(float(value), 2)}
+            for i, value in enumerate(path)
+        ]
         
-        projections = []
-        current_value = baseline_value
-        
-        for i in range(periods):
-            current_value *= (1 + growth_rate)
-            projections.append({
-                "period": i + 1,
-                "projected_value": round(current_value, 2)
-            })
-        
-        return {
+        result = {
             "success": True,
             "scenario_type": "growth_projection",
-            "baseline": baseline_value,
-            "growth_rate": growth_rate,
+            "baseline": float(baselines[0]),
+            "growth_rate": float(growth_rates[0]),
             "projections": projections,
-            "insights": [f"With {growth_rate*100}% growth rate, value would reach {projections[-1]['projected_value']:.2f} in {periods} periods"]
+            "insights": [f"With {growth_rates[0]*100:g}% growth rate, value would reach {projections[-1]['projected_value']:.2f} in {periods} periods"]
         }
+        
+        if baselines.size > 1 or growth_rates.size > 1 or len(horizons) > 1:
+            values = project_grid(baselines, growth_rates, horizons)
+            b, r, h = np.meshgrid(baselines, growth_rates, horizons, indexing="ij")
+            result["grid"] = [
+                {"baseline": float(bv), "growth_rate": float(rv), "horizon": int(hv), "projected_value": round(float(v), 2)}
+                for bv, rv, hv, v in zip(b.ravel(), r.ravel(), h.ravel(), values.ravel())
+            ]
+            result["insights"].append(
+                f"Evaluated {values.size} scenarios; outcomes range from {values.min():,.2f} to {values.max():,.2f}"
+            )
+        return result
     
     async def _sensitivity_analysis(self, params):
         """Analyze sensitivity to parameter changes."""
-        baseline = params.get("baseline", 100)
-        parameter_ranges = params.get("ranges", [-0.1, -0.05, 0, 0.05, 0.1])
-        
-        results = []
-        for change in parameter_ranges:
-            new_value = baseline * (1 + change)
-            results.append({
-                "change_percent": change * 100,
-                "resulting_value": round(new_value, 2),
-                "impact": round(new_value - baseline, 2)
-            })
+        baselines = as_array(params.get("baselines", params.get("baseline", 100)))
+        parameter_ranges = as_array(params.get("ranges", [-0.1, -0.05, 0, 0.05, 0.1]))
+        
+        values = sensitivity(baselines, parameter_ranges)
+        results = [
+            {
+                "baseline": float(baseline),
+                "change_percent": round(float(change) * 100, 4),
+                "resulting_value": round(float(value), 2),
+                "impact": round(float(value - baseline), 2)
+            }
+            for baseline, row in zip(baselines, values)
+            for change, value in zip(parameter_ranges, row)
+        ]
         
         return {
             "success": True,
             "scenario_type": "sensitivity_analysis",
-            "baseline": baseline,
+            "baseline": float(baselines[0]),
             "results": results,
             "insights": ["Sensitivity analysis shows linear relationship with baseline value"]
         }
+    
+    async def _monte_carlo(self, params):
+        """Simulate outcome ranges from the series' historical weekly volatility."""
+        history = None
+        metric_name = params.get("metric_name")
+        if params.get("lob_id"):
+            metric = await resolve_metric(params["lob_id"], metric_name)
+            if "error" in metric:
+                return metric
+            metric_name = metric["metric_name"]
+            history = await historical_dynamics(params["lob_id"], metric_name)
+            if "error" in history:
+                return history
+        
+        volatility = params.get("volatility", history["volatility"] if history else None)
+        if volatility is None:
+            return {"error": "A lob_id or an explicit volatility is required for Monte Carlo simulation"}
+        baseline = params.get("baseline_value", history["last_value"] if history else 100)
+        growth_rate = params.get("growth_rate", history["growth_rate"] if history else 0.0)
+        periods = params.get("periods", 12)
+        paths = params.get("paths", SCENARIO_MC_PATHS)
+        
+        values = simulate_paths(baseline, growth_rate, volatility, periods, paths, params.get("seed"))
+        summary = summarize_paths(values, baseline, params.get("target"))
+        final = summary["projections"][-1]
+        
+        insights = [
+            f"Simulated {values.shape[0]:,} paths over {periods} periods at {growth_rate*100:.2f}% expected growth per period "
+            f"and {volatility*100:.2f}% weekly volatility",
+            f"90% of outcomes end between {final['p5']:,.2f} and {final['p95']:,.2f} (median {final['p50']:,.2f})",
+            f"{summary['probability_below_baseline']:.0%} chance of ending below the baseline of {baseline:,.2f}"
+        ]
+        if "probability_reaching_target" in summary:
+            insights.append(f"{summary['probability_reaching_target']:.0%} chance of reaching {summary['target']:,.2f}")
+        if history:
+            insights.append(f"Volatility and growth estimated from {history['weeks']} week-over-week changes")
+        
+        return {
+            "success": True,
+            "scenario_type": "monte_carlo",
+            "lob_id": params.get("lob_id"),
+            "lob_name": params.get("lob_name"),
+            "metric_name": metric_name,
+            "baseline": baseline,
+            "growth_rate": growth_rate,
+            "volatility": volatility,
+            "paths": int(values.shape[0]),
+            **summary,
+            "insights": insights
+        }
 
 
 # ============================================================================
@@ -369,8 +440,7 @@ class DataExplorerAgent(BaseAgent):
         if not dataset_id:
             return {"error": "dataset_id is required"}
         
-        conn = await self.get_db_connection()
-        try:
+        async with acquire() as conn:
             # Get dataset metadata
             dataset = await conn.fetchrow(
                 "SELECT * FROM datasets WHERE id = $1",
@@ -401,8 +471,6 @@ class DataExplorerAgent(BaseAgent):
                 "statistics": stats,
                 "insights": insights
             }
-        finally:
-            await conn.close()
 
 
 class DataCleanerAgent(BaseAgent):
@@ -447,11 +515,22 @@ class ModelSelectorAgent(BaseAgent):
     def __init__(self):
         super().__init__(
             name="ModelSelector",
-            description="Analyzes data characteristics and recommends the best forecasting model (Prophet, ARIMA, etc.)"
+            description="Measures series characteristics and backtests candidates to recommend the best forecasting model"
         )
     
     async def execute(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Select best forecasting model."""
+        lob_id = params.get("lob_id")
+        if lob_id:
+            selection = await resolve_metric(lob_id, params.get("metric_name"))
+            if "error" not in selection:
+                # Features and backtests are cached per data fingerprint
+                params = {**params, "metric_name": selection["metric_name"]}
+                selection = await select_model(lob_id, params["metric_name"])
+            if "error" not in selection:
+                return self._from_selection(selection, params)
+            print(f"[ModelSelector] Series unavailable, using supplied characteristics: {selection['error']}")
+        
         data_characteristics = params.get("characteristics", {})
         has_seasonality = data_characteristics.get("seasonality", False)
         has_trend = data_characteristics.get("trend", True)
@@ -494,79 +573,150 @@ class ModelSelectorAgent(BaseAgent):
             "all_recommendations": recommendations,
             "insights": [best_model['reason']]
         }
+    
+    def _from_selection(self, selection: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+        """Recommend the model chosen from the series' own features and backtests."""
+        features = selection["features"]
+        backtest = selection["backtest"]
+        recommendations = []
+        if backtest:
+            metric = backtest["metric"]
+            for model in backtest["models"]:
+                error = model[metric]
+                recommendations.append({
+                    "model": model["model_type"],
+                    # sMAPE and MAPE are percentages; other metrics are in series units
+                    "score": round(max(0.0, 1 - error / 100), 3) if error is not None and metric in ("mape", "smape") else None,
+                    "reason": f"{metric.upper()} {error} over {backtest['folds']} backtest folds of {backtest['horizon']} weeks"
+                })
+        else:
+            recommendations = [{"model": model, "score": None, "reason": "Suited to the series features"} for model in selection["candidates"]]
+        
+        seasonality = features["seasonal_autocorrelation"]
+        insights = [
+            selection["reason"],
+            f"{features['length']} weeks of history, trend strength {features['trend_strength']}, "
+            f"seasonal autocorrelation {seasonality if seasonality is not None else 'n/a (under two years)'}, "
+            f"{features['intermittency']:.0%} zero weeks, volatility {features['volatility']}"
+        ]
+        return {
+            "success": True,
+            "lob_id": params.get("lob_id"),
+            "lob_name": params.get("lob_name"),
+            "metric_name": params.get("metric_name"),
+            "recommended_model": selection["model_type"],
+            "all_recommendations": recommendations,
+            "features": features,
+            "backtest": backtest,
+            "insights": insights
+        }
 
 
 class ModelTrainerAgent(BaseAgent):
-    """Trains models with hyperparameter tuning using Prophet."""
+    """Trains forecasting models: Prophet, or millisecond NumPy forecasters for quick answers."""
     
     def __init__(self):
         super().__init__(
             name="ModelTrainer",
-            description="Trains forecasting models (primarily Prophet) with automatic hyperparameter optimization"
+            description="Trains forecasting models (Prophet, Holt-Winters, seasonal naive, moving average) with automatic parameter selection"
         )
     
     async def execute(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Train a forecasting model."""
         lob_id = params.get("lob_id")
-        model_type = params.get("model_type", "prophet")
+        metric_name = params.get("metric_name")
+        model_type = params.get("model_type", "auto")
         forecast_periods = params.get("periods", 12)  # Default 12 weeks ahead
         
         if not lob_id:
             return {"error": "lob_id is required for training"}
+        if not isinstance(forecast_periods, int) or forecast_periods < 1:
+            return {"error": f"periods must be a whole number of weeks of at least 1, got {forecast_periods}"}
         
-        conn = await self.get_db_connection()
         try:
-            # Fetch training data
-            metrics = await conn.fetch(
-                """
-                SELECT week_date as ds, metric_value as y
-                FROM weekly_metrics
-                WHERE lob_id = $1
-                ORDER BY week_date
-                """,
-                lob_id
-            )
+            metric = await resolve_metric(lob_id, metric_name)
+            if "error" in metric:
+                return metric
+            metric_name = metric["metric_name"]
             
-            if len(metrics) < 10:
-                return {"error": "Insufficient data for training (need at least 10 data points)"}
+            selection = None
+            if model_type == "auto":
+                # Prophet only where the series' features and backtests call for it
+                selection = await select_model(lob_id, metric_name)
+                model_type = selection.get("model_type", "prophet")
             
-            # Convert to DataFrame
-            df = pd.DataFrame([dict(row) for row in metrics])
-            
-            if model_type == "prophet":
-                # Train Prophet model
-                model = Prophet(
-                    yearly_seasonality=True,
-                    weekly_seasonality=False,
-                    daily_seasonality=False
-                )
-                model.fit(df)
-                
-                # Make future predictions
-                future = model.make_future_dataframe(periods=forecast_periods, freq='W')
-                forecast = model.predict(future)
-                
-                # Get predictions for next 12 weeks
-                predictions = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(forecast_periods).to_dict('records')
-                
-                return {
-                    "success": True,
-                    "model_type": "prophet",
-                    "training_samples": len(df),
-                    "predictions": predictions,
-                    "insights": [
-                        f"Model trained on {len(df)} data points",
-                        f"Generated {forecast_periods}-week forecast",
-                        "Prophet model with yearly seasonality"
-                    ]
-                }
-            else:
-                return {"error": f"Model type {model_type} not yet implemented"}
+            result = await self._train(model_type, lob_id, metric_name, forecast_periods, params)
+            if selection and "error" not in selection and result.get("success"):
+                result["model_selection"] = selection["reason"]
+                result["insights"].append(f"Model chosen automatically: {selection['reason']}")
+            return result
         
         except Exception as e:
             return {"error": f"Training failed: {str(e)}"}
-        finally:
-            await conn.close()
+    
+    async def _train(
+        self,
+        model_type: str,
+        lob_id: Any,
+        metric_name: str,
+        forecast_periods: int,
+        params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Fit one model type and forecast."""
+        if model_type == "prophet":
+            # Reuses the stored model while the series is unchanged
+            prophet_result = await forecast_series(lob_id, metric_name, forecast_periods)
+            if "error" in prophet_result:
+                return prophet_result
+            
+            cache_notes = {
+                "hit": "Reused the stored model; the data has not changed since it was trained",
+                "predicted": "Forecast from the stored model without retraining",
+                "warm_start": "Model retrained on new data, starting from the previous fit",
+                "trained": "Prophet model with yearly seasonality",
+            }
+            
+            return {
+                "success": True,
+                "model_type": "prophet",
+                "lob_id": lob_id,
+                "lob_name": params.get("lob_name"),
+                "metric_name": metric_name,
+                "training_samples": prophet_result["training_samples"],
+                "predictions": prophet_result["predictions"],
+                "model_cache": prophet_result["cache"],
+                "insights": [
+                    f"Model trained on {prophet_result['training_samples']} data points",
+                    f"Generated {forecast_periods}-week forecast",
+                    cache_notes[prophet_result["cache"]]
+                ]
+            }
+        elif resolve_model_type(model_type) in FORECASTERS:
+            # Fits in milliseconds, so it runs inline without the model store
+            async with acquire() as conn:
+                series = await fetch_series(conn, lob_id, metric_name)
+            if len(series) < MIN_SERIES_LENGTH:
+                return {"error": f"Insufficient data for forecasting (need at least {MIN_SERIES_LENGTH} data points)"}
+            
+            result = forecast(model_type, series, forecast_periods)
+            label = result["model_type"].replace("_", " ")
+            return {
+                "success": True,
+                "model_type": result["model_type"],
+                "lob_id": lob_id,
+                "lob_name": params.get("lob_name"),
+                "metric_name": metric_name,
+                "training_samples": len(series),
+                "predictions": result["predictions"],
+                "model_params": result["params"],
+                "insights": [
+                    f"Fitted {label} on {len(series)} data points in {result['fit_ms']} ms",
+                    f"Generated {forecast_periods}-week forecast",
+                ]
+            }
+        else:
+            available = ", ".join(["prophet", *FORECASTERS])
+            return {"error": f"Model type {model_type} not yet implemented (available: {available})"}
 
 
 class ModelEvaluatorAgent(BaseAgent):
@@ -575,7 +725,7 @@ class ModelEvaluatorAgent(BaseAgent):
     def __init__(self):
         super().__init__(
             name="ModelEvaluator",
-            description="Evaluates forecast accuracy using metrics like MAE, RMSE, and generates diagnostic plots"
+            description="Evaluates forecast accuracy using metrics like MAE, RMSE, MAPE and sMAPE, including rolling-origin backtests of candidate models"
         )
     
     async def execute(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -583,27 +733,25 @@ class ModelEvaluatorAgent(BaseAgent):
         predictions = params.get("predictions", [])
         actuals = params.get("actuals", [])
         
+        if not predictions and not actuals and params.get("lob_id"):
+            return await self._backtest(params)
+        
         if not predictions or not actuals:
-            return {"error": "Both predictions and actuals are required"}
+            return {"error": "Both predictions and actuals are required, or a lob_id to backtest"}
         
         if len(predictions) != len(actuals):
             return {"error": "Predictions and actuals must have same length"}
         
         # Calculate metrics
-        mae = mean_absolute_error(actuals, predictions)
-        rmse = np.sqrt(mean_squared_error(actuals, predictions))
-        mape = np.mean(np.abs((np.array(actuals) - np.array(predictions)) / np.array(actuals))) * 100
-        
-        metrics = {
-            "mae": round(mae, 2),
-            "rmse": round(rmse, 2),
-            "mape": round(mape, 2)
-        }
+        scores = score_forecasts(actuals, predictions)
+        metrics = {name: rounded(value) for name, value in scores.items()}
+        mape = metrics["mape"] if metrics["mape"] is not None else float("inf")
         
         insights = [
             f"Mean Absolute Error: {metrics['mae']}",
             f"Root Mean Squared Error: {metrics['rmse']}",
-            f"Mean Absolute Percentage Error: {metrics['mape']}%"
+            f"Mean Absolute Percentage Error: {metrics['mape']}%",
+            f"Symmetric Mean Absolute Percentage Error: {metrics['smape']}%"
         ]
         
         if mape < 10:
@@ -618,6 +766,41 @@ class ModelEvaluatorAgent(BaseAgent):
             "metrics": metrics,
             "insights": insights
         }
+    
+    async def _backtest(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Score candidate models on a LOB's own history with rolling-origin backtests."""
+        try:
+            metric = await resolve_metric(params["lob_id"], params.get("metric_name"))
+            if "error" in metric:
+                return metric
+            backtest = await backtest_series(params["lob_id"], metric["metric_name"], params.get("candidates"))
+        except Exception as e:
+            return {"error": f"Backtest failed: {str(e)}"}
+        if "error" in backtest:
+            return backtest
+        
+        best = backtest["models"][0]
+        metric = backtest["metric"]
+        insights = [
+            f"{best['model_type']} was most accurate over {backtest['folds']} folds of {backtest['horizon']} weeks "
+            f"({metric.upper()} {best[metric]})"
+        ]
+        for model in backtest["models"][1:]:
+            insights.append(f"{model['model_type']}: {metric.upper()} {model[metric]}")
+        for model, error in backtest["failed"].items():
+            insights.append(f"{model} could not be backtested: {error}")
+        
+        return {
+            "success": True,
+            "evaluation_type": "backtest",
+            "lob_id": params["lob_id"],
+            "lob_name": params.get("lob_name"),
+            "metric_name": backtest["metric_name"],
+            "best_model": best["model_type"],
+            "metrics": {name: best[name] for name in ("mae", "rmse", "mape", "smape")},
+            "backtest": backtest,
+            "insights": insights
+        }
 
 
 # ============================================================================
@@ -640,8 +823,7 @@ class VisualizerAgent(BaseAgent):
         
         # If no data provided, try to fetch from database
         if not data:
-            conn = await self.get_db_connection()
-            try:
+            async with acquire() as conn:
                 # Fetch sample data based on viz type
                 if viz_type in ["line_chart", "time_series"]:
                     # Get time series data
@@ -668,8 +850,6 @@ class VisualizerAgent(BaseAgent):
                         """
                     )
                     data = [{"name": row["lob_name"], "value": float(row["avg_value"])} for row in rows]
-            finally:
-                await conn.close()
         
         if not data:
             return {
@@ -0,0 +1,275 @@
+"""Rolling-origin backtesting of forecasting models on weekly_metrics series.
+
+Each candidate model is refit at several forecast origins near the end of
+the series. Every refit forecasts the next BACKTEST_HORIZON weeks, which are
+then compared with what actually happened:
+
+    origin 1: train on weeks [0, n - 4h)  forecast [n - 4h, n - 3h)
+    ...
+    origin 4: train on weeks [0, n - h)   forecast [n - h, n)
+
+Candidates run concurrently on the training service's worker processes.
+Their fold forecasts are stacked into one (models, folds, horizon) array and
+scored in a single vectorized pass with MAE, RMSE, MAPE and sMAPE.
+
+Fold forecasts are cached per model and series fingerprint (see
+model_store.series_fingerprint), so adding a candidate only fits that
+candidate. Scored results are cached too, so backtesting an unchanged
+series again costs one fingerprint query. That lets ModelSelector consult
+backtests on every query without refitting.
+
+Configuration (environment variables):
+    BACKTEST_FOLDS: forecast origins per backtest (default 4)
+    BACKTEST_HORIZON: weeks forecast from each origin (default 8)
+    BACKTEST_MIN_TRAIN: fewest weeks a fold is trained on (default 26)
+    BACKTEST_METRIC: metric that picks the winner (default smape)
+    BACKTEST_CACHE_SIZE: cached (series, model) fold results (default 256)
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from app.libs.database import acquire
+from app.libs.forecasters import FORECASTERS, resolve_model_type
+from app.libs.model_store import read_series, series_fingerprint, train_prophet
+from app.libs.training_service import get_training_service
+
+BACKTEST_FOLDS = int(os.environ.get("BACKTEST_FOLDS", 4))
+BACKTEST_HORIZON = int(os.environ.get("BACKTEST_HORIZON", 8))
+BACKTEST_MIN_TRAIN = int(os.environ.get("BACKTEST_MIN_TRAIN", 26))
+BACKTEST_METRIC = os.environ.get("BACKTEST_METRIC", "smape")
+BACKTEST_CACHE_SIZE = int(os.environ.get("BACKTEST_CACHE_SIZE", 256))
+
+# Prophet costs seconds per fold, so it is only backtested on request
+DEFAULT_CANDIDATES = tuple(FORECASTERS)
+
+METRICS = ("mae", "rmse", "mape", "smape")
+
+
+# ============================================================================
+# SCORING
+# ============================================================================
+
+def score_forecasts(actuals: Any, forecasts: Any, axis: Any = -1) -> Dict[str, np.ndarray]:
+    """MAE, RMSE, MAPE and sMAPE over the given axes of broadcastable arrays.
+
+    MAPE skips zero actuals and sMAPE skips points where both the actual and
+    the forecast are zero; a metric with nothing to average is NaN.
+    """
+    actuals = np.asarray(actuals, dtype=float)
+    forecasts = np.asarray(forecasts, dtype=float)
+    actuals, forecasts = np.broadcast_arrays(actuals, forecasts)
+    errors = np.abs(actuals - forecasts)
+
+    def masked_mean(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        total = np.where(mask, values, 0.0).sum(axis=axis)
+        count = mask.sum(axis=axis)
+        return np.divide(total, count, out=np.full(np.shape(total), np.nan), where=count > 0)
+
+    nonzero = actuals != 0
+    scale = np.abs(actuals) + np.abs(forecasts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentage = errors / np.abs(actuals)
+        symmetric = 2 * errors / scale
+
+    return {
+        "mae": errors.mean(axis=axis),
+        "rmse": np.sqrt((errors ** 2).mean(axis=axis)),
+        "mape": masked_mean(percentage, nonzero) * 100,
+        "smape": masked_mean(symmetric, scale > 0) * 100,
+    }
+
+
+def rounded(value: Any) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else round(value, 4)
+
+
+# ============================================================================
+# FOLDS
+# ============================================================================
+
+def fold_origins(length: int, folds: int = BACKTEST_FOLDS, horizon: int = BACKTEST_HORIZON) -> List[int]:
+    """Training lengths of the folds, oldest first; empty when the series is too short."""
+    origins = [length - horizon * k for k in range(folds, 0, -1)]
+    return [origin for origin in origins if origin >= BACKTEST_MIN_TRAIN]
+
+
+def fit_predict(model_type: str, series: Sequence[Tuple[Any, float]], horizon: int) -> np.ndarray:
+    """Point forecast of one model trained on series."""
+    if model_type == "prophet":
+        return np.array([p["yhat"] for p in train_prophet(series, horizon)["predictions"]])
+    y = np.fromiter((value for _, value in series), dtype=float, count=len(series))
+    return FORECASTERS[model_type](y, horizon)[0]
+
+
+def backtest_model(
+    model_type: str,
+    series: Sequence[Tuple[Any, float]],
+    origins: Sequence[int],
+    horizon: int
+) -> Dict[str, Any]:
+    """Fit one model at every origin. Runs on a training service worker.
+
+    Returns:
+        dict with forecasts (folds x horizon) and seconds
+    """
+    started = time.perf_counter()
+    forecasts = [fit_predict(model_type, series[:origin], horizon).tolist() for origin in origins]
+    return {"forecasts": forecasts, "seconds": round(time.perf_counter() - started, 4)}
+
+
+# ============================================================================
+# ENGINE
+# ============================================================================
+
+class BacktestCache:
+    """LRU of fold forecasts keyed by series fingerprint, fold layout and model."""
+
+    def __init__(self, max_size: int = BACKTEST_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, entry: Dict[str, Any]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+_cache = BacktestCache()
+
+
+async def backtest_series(
+    lob_id: Any,
+    metric_name: str,
+    candidates: Optional[Sequence[str]] = None,
+    folds: int = BACKTEST_FOLDS,
+    horizon: int = BACKTEST_HORIZON,
+    metric: str = BACKTEST_METRIC
+) -> Dict[str, Any]:
+    """Backtest candidate models on one series and pick the most accurate.
+
+    Args:
+        lob_id: LOB of the series
+        metric_name: Metric of the series
+        candidates: Model types to compare (default: the NumPy forecasters)
+        folds: Forecast origins
+        horizon: Weeks forecast from each origin
+        metric: Metric the winner minimises (mae, rmse, mape or smape)
+
+    Returns:
+        dict with models (per-model overall and per-fold metrics, best
+        first), winner and fold layout, or {"error": ...}
+    """
+    if metric not in METRICS:
+        return {"error": f"Unknown backtest metric {metric} (use one of {', '.join(METRICS)})"}
+    candidates = list(dict.fromkeys(resolve_model_type(model) for model in (candidates or DEFAULT_CANDIDATES)))
+    unknown = [model for model in candidates if model != "prophet" and model not in FORECASTERS]
+    if unknown:
+        return {"error": f"Cannot backtest model type {', '.join(unknown)}"}
+
+    too_short = {"error": f"Insufficient data for backtesting (need at least {BACKTEST_MIN_TRAIN + horizon} data points)"}
+
+    def layout(fingerprint: Optional[str], length: int) -> Tuple[List[int], tuple, tuple]:
+        origins = fold_origins(length, folds, horizon)
+        base_key = (str(lob_id), metric_name, fingerprint, tuple(origins), horizon)
+        return origins, base_key, base_key + ("summary", tuple(candidates), metric)
+
+    async with acquire() as conn:
+        row_count, fingerprint = await series_fingerprint(conn, lob_id, metric_name)
+    origins, base_key, summary_key = layout(fingerprint, row_count)
+    if not origins:
+        return too_short
+
+    summary = _cache.get(summary_key)
+    if summary is not None:
+        return {**summary, "cached": True}
+
+    async with acquire() as conn:
+        snapshot, series = await read_series(conn, lob_id, metric_name)
+    if snapshot != fingerprint:
+        # Written to since the check; key everything by the data actually read
+        fingerprint = snapshot
+        origins, base_key, summary_key = layout(fingerprint, len(series))
+        if not origins:
+            return too_short
+
+    results = {model: _cache.get(base_key + (model,)) for model in candidates}
+    missing = [model for model, result in results.items() if result is None]
+
+    if missing:
+        service = get_training_service()
+        outcomes = await asyncio.gather(
+            *(
+                service.run(backtest_model, model, series, origins, horizon, label=f"backtest {model} lob {lob_id}")
+                for model in missing
+            ),
+            return_exceptions=True
+        )
+        for model, outcome in zip(missing, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"[Backtest] {model} failed on lob {lob_id}: {outcome}")
+                results[model] = {"error": str(outcome)}
+            else:
+                results[model] = outcome
+                _cache.put(base_key + (model,), outcome)
+
+    scored = [model for model in candidates if "forecasts" in results[model]]
+    if not scored:
+        return {"error": "Every backtest candidate failed"}
+
+    values = np.array([value for _, value in series], dtype=float)
+    actuals = np.stack([values[origin:origin + horizon] for origin in origins])
+    forecasts = np.array([results[model]["forecasts"] for model in scored])
+    per_fold = score_forecasts(actuals, forecasts, axis=-1)
+    overall = score_forecasts(actuals, forecasts, axis=(-2, -1))
+
+    models = []
+    for index, model in enumerate(scored):
+        entry = {"model_type": model, "seconds": results[model]["seconds"]}
+        entry.update({name: rounded(overall[name][index]) for name in METRICS})
+        entry["folds"] = [
+            {"origin": str(series[origin][0]), **{name: rounded(per_fold[name][index, fold]) for name in METRICS}}
+            for fold, origin in enumerate(origins)
+        ]
+        models.append(entry)
+    models.sort(key=lambda entry: float("inf") if entry[metric] is None else entry[metric])
+
+    summary = {
+        "lob_id": lob_id,
+        "metric_name": metric_name,
+        "fingerprint": fingerprint,
+        "folds": len(origins),
+        "horizon": horizon,
+        "metric": metric,
+        "winner": models[0]["model_type"],
+        "models": models,
+        "failed": {model: results[model]["error"] for model in candidates if model not in scored},
+    }
+    if not summary["failed"]:
+        _cache.put(summary_key, summary)
+    return {**summary, "cached": False}
+
+
+def backtest_cache_stats() -> dict:
+    return _cache.stats()
@@ -0,0 +1,181 @@
+"""Batch forecasting across every (lob_id, metric_name) series.
+
+Weekly planning needs a forecast for every series, and running them one
+chat turn at a time does not scale to hundreds. run_batch forecasts every
+series matching the filters through forecast_series:
+
+- Unchanged series reuse their stored model.
+- The rest train in parallel on the training service's worker processes.
+
+Results are yielded as each series finishes, with per-series timing, and
+persisted to the forecasts table (migrations/005_forecasts.sql) under a
+run_id so a run interrupted part-way keeps what it finished.
+
+Configuration (environment variables):
+    BATCH_MAX_IN_FLIGHT: series submitted to the training service at once
+        (default: twice the training workers, capped below the queue depth)
+"""
+
+from datetime import date
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import os
+import time
+import uuid
+
+from app.libs.database import acquire
+from app.libs.model_store import forecast_series
+from app.libs.training_service import TrainingJobError, TrainingQueueFull, get_training_service
+
+SERIES_QUERY = """
+    SELECT wm.lob_id, l.name AS lob_name, wm.metric_name, COUNT(*) AS row_count
+    FROM weekly_metrics wm
+    LEFT JOIN lobs l ON l.id = wm.lob_id
+    WHERE ($1::int[] IS NULL OR wm.lob_id = ANY($1))
+      AND ($2::text[] IS NULL OR wm.metric_name = ANY($2))
+    GROUP BY wm.lob_id, l.name, wm.metric_name
+    ORDER BY wm.lob_id, wm.metric_name
+"""
+
+FORECAST_COLUMNS = ["run_id", "lob_id", "metric_name", "week_date", "yhat", "yhat_lower", "yhat_upper"]
+
+def max_in_flight() -> int:
+    service = get_training_service()
+    default = min(service.workers * 2, max(1, service.queue_depth - 1))
+    return int(os.environ.get("BATCH_MAX_IN_FLIGHT", default))
+
+
+async def list_series(lob_ids: Optional[List[int]] = None, metric_names: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    async with acquire() as conn:
+        rows = await conn.fetch(SERIES_QUERY, lob_ids or None, metric_names or None)
+    return [dict(row) for row in rows]
+
+
+async def save_forecast(run_id: str, lob_id: int, metric_name: str, predictions: List[Dict[str, Any]]):
+    """Persist one series' predictions under a run."""
+    records = [
+        (run_id, lob_id, metric_name, date.fromisoformat(p["ds"]), p["yhat"], p.get("yhat_lower"), p.get("yhat_upper"))
+        for p in predictions
+    ]
+    async with acquire() as conn:
+        await conn.copy_records_to_table("forecasts", records=records, columns=FORECAST_COLUMNS)
+
+
+async def forecast_one(
+    run_id: str,
+    series: Dict[str, Any],
+    periods: int,
+    jobs: Dict[str, Any],
+    semaphore: asyncio.Semaphore
+) -> Dict[str, Any]:
+    """Forecast and persist one series, timing each phase."""
+    key = f"{series['lob_id']}:{series['metric_name']}"
+    line = {
+        "type": "series",
+        "lob_id": series["lob_id"],
+        "lob_name": series["lob_name"],
+        "metric_name": series["metric_name"],
+        "row_count": series["row_count"],
+    }
+    started = time.perf_counter()
+    try:
+        async with semaphore:
+            outcome = await forecast_series(series["lob_id"], series["metric_name"], periods, wait=False)
+            if "job" in outcome:
+                job = outcome["job"]
+                jobs[key] = job
+                outcome = await job.wait()
+                line["queued_seconds"] = round(job.started_at - job.submitted_at, 3) if job.started_at else None
+                line["train_seconds"] = round(job.finished_at - job.started_at, 3) if job.started_at else None
+
+        if "error" in outcome:
+            line.update(status="skipped", error=outcome["error"])
+        else:
+            saved = time.perf_counter()
+            await save_forecast(run_id, series["lob_id"], series["metric_name"], outcome["predictions"])
+            line.update(
+                status="succeeded",
+                cache=outcome["cache"],
+                training_samples=outcome["training_samples"],
+                predictions=outcome["predictions"],
+                save_seconds=round(time.perf_counter() - saved, 3),
+            )
+    except (TrainingJobError, TrainingQueueFull) as e:
+        line.update(status="failed", error=str(e))
+    except Exception as e:
+        line.update(status="failed", error=f"{type(e).__name__}: {e}")
+    finally:
+        jobs.pop(key, None)
+
+    line["seconds"] = round(time.perf_counter() - started, 3)
+    return line
+
+
+async def run_batch(
+    periods: int = 12,
+    lob_ids: Optional[List[int]] = None,
+    metric_names: Optional[List[str]] = None,
+    include_predictions: bool = True
+) -> AsyncIterator[Dict[str, Any]]:
+    """Forecast every matching series, yielding results as they complete.
+
+    Yields:
+        A "start" record with the run_id and series count, one "series"
+        record per series in completion order, then a "summary" record
+    """
+    run_id = uuid.uuid4().hex
+    started = time.perf_counter()
+    series = await list_series(lob_ids, metric_names)
+    yield {"type": "start", "run_id": run_id, "series": len(series), "periods": periods}
+
+    semaphore = asyncio.Semaphore(max_in_flight())
+    jobs: Dict[str, Any] = {}
+    tasks = [asyncio.create_task(forecast_one(run_id, item, periods, jobs, semaphore)) for item in series]
+    counts: Dict[str, int] = {}
+    cache: Dict[str, int] = {}
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            counts[line["status"]] = counts.get(line["status"], 0) + 1
+            if line.get("cache"):
+                cache[line["cache"]] = cache.get(line["cache"], 0) + 1
+            if not include_predictions:
+                line.pop("predictions", None)
+            yield line
+    finally:
+        # A disconnected client must not leave hundreds of fits running
+        for task in tasks:
+            task.cancel()
+        service = get_training_service()
+        for job in list(jobs.values()):
+            service.cancel(job.id)
+
+    yield {
+        "type": "summary",
+        "run_id": run_id,
+        "series": len(series),
+        "succeeded": counts.get("succeeded", 0),
+        "skipped": counts.get("skipped", 0),
+        "failed": counts.get("failed", 0),
+        "cache": cache,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+async def latest_forecast(lob_id: int, metric_name: str) -> List[Dict[str, Any]]:
+    """Predictions of the newest persisted run for one series."""
+    async with acquire() as conn:
+        rows = await conn.fetch(
+            """
+            SELECT run_id, week_date, yhat, yhat_lower, yhat_upper, model_type, created_at
+            FROM forecasts
+            WHERE lob_id = $1 AND metric_name = $2 AND run_id = (
+                SELECT run_id FROM forecasts
+                WHERE lob_id = $1 AND metric_name = $2
+                ORDER BY created_at DESC LIMIT 1
+            )
+            ORDER BY week_date
+            """,
+            lob_id, metric_name
+        )
+    return [dict(row) for row in rows]
@@ -0,0 +1,366 @@
+"""Durable, bounded LangGraph checkpointer backed by Postgres.
+
+Checkpoints are stored through the shared asyncpg pool, so multi-turn state
+survives restarts and is visible to every worker. Storage stays bounded:
+
+- Only the newest CHECKPOINT_KEEP_PER_THREAD checkpoints of a thread are kept;
+  older ones are pruned in the same statement that stores a new checkpoint.
+- Threads untouched for CHECKPOINT_TTL_SECONDS are treated as expired and are
+  swept at most once every CHECKPOINT_SWEEP_SECONDS.
+- Serialized payloads larger than CHECKPOINT_COMPRESS_MIN_BYTES are zlib
+  compressed.
+
+Select the backend with CHECKPOINTER (postgres | memory). The tables are
+created by migrations/003_workflow_checkpoints.sql.
+"""
+
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+import os
+import time
+import zlib
+
+from app.libs.database import acquire
+
+COMPRESSED_SUFFIX = "+zlib"
+
+# Stores a checkpoint and prunes the thread down to the newest $9 entries in one
+# round trip. The DELETE sees the pre-insert snapshot, so the new row is never a
+# candidate and the thread holds at most $9 + 1 checkpoints afterwards.
+PUT_CHECKPOINT_QUERY = """
+WITH stored AS (
+    INSERT INTO workflow_checkpoints (
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+        checkpoint_type, checkpoint, metadata_type, metadata
+    )
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id) DO UPDATE
+    SET checkpoint_type = EXCLUDED.checkpoint_type,
+        checkpoint = EXCLUDED.checkpoint,
+        metadata_type = EXCLUDED.metadata_type,
+        metadata = EXCLUDED.metadata
+)
+DELETE FROM workflow_checkpoints
+WHERE thread_id = $1
+  AND checkpoint_ns = $2
+  AND checkpoint_id < (
+      SELECT MIN(checkpoint_id) FROM (
+          SELECT checkpoint_id FROM workflow_checkpoints
+          WHERE thread_id = $1 AND checkpoint_ns = $2
+          ORDER BY checkpoint_id DESC
+          LIMIT $9
+      ) AS newest
+  )
+"""
+
+CHECKPOINT_COLUMNS = """
+    checkpoint_id, parent_checkpoint_id,
+    checkpoint_type, checkpoint, metadata_type, metadata
+"""
+
+
+class PostgresCheckpointSaver(BaseCheckpointSaver):
+    """LangGraph checkpoint saver storing compact checkpoints in Postgres."""
+
+    def __init__(
+        self,
+        keep_per_thread: int = 10,
+        ttl_seconds: float = 7 * 24 * 3600,
+        sweep_interval_seconds: float = 600,
+        compress_min_bytes: int = 1024,
+    ):
+        super().__init__()
+        if keep_per_thread < 1:
+            raise ValueError("keep_per_thread must be at least 1")
+        self.keep_per_thread = keep_per_thread
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.compress_min_bytes = compress_min_bytes
+        self._last_sweep = 0.0
+
+    @classmethod
+    def from_env(cls) -> "PostgresCheckpointSaver":
+        """Build a saver from CHECKPOINT_* environment variables."""
+        return cls(
+            keep_per_thread=int(os.environ.get("CHECKPOINT_KEEP_PER_THREAD", 10)),
+            ttl_seconds=float(os.environ.get("CHECKPOINT_TTL_SECONDS", 7 * 24 * 3600)),
+            sweep_interval_seconds=float(os.environ.get("CHECKPOINT_SWEEP_SECONDS", 600)),
+            compress_min_bytes=int(os.environ.get("CHECKPOINT_COMPRESS_MIN_BYTES", 1024)),
+        )
+
+    # ========================================================================
+    # SERIALIZATION
+    # ========================================================================
+
+    def _dump(self, value: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        if len(data) >= self.compress_min_bytes:
+            return type_ + COMPRESSED_SUFFIX, zlib.compress(data)
+        return type_, data
+
+    def _load(self, type_: str, data: bytes) -> Any:
+        if type_.endswith(COMPRESSED_SUFFIX):
+            type_ = type_[:-len(COMPRESSED_SUFFIX)]
+            data = zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    def _row_to_tuple(self, thread_id: str, checkpoint_ns: str, row, writes) -> CheckpointTuple:
+        parent_id = row["parent_checkpoint_id"]
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": row["checkpoint_id"],
+                }
+            },
+            checkpoint=self._load(row["checkpoint_type"], row["checkpoint"]),
+            metadata=self._load(row["metadata_type"], row["metadata"]),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (w["task_id"], w["channel"], self._load(w["value_type"], w["value"]))
+                for w in writes
+            ],
+        )
+
+    # ========================================================================
+    # SAVER INTERFACE
+    # ========================================================================
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Fetch a checkpoint by ID, or the thread's latest unexpired checkpoint."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        async with acquire() as conn:
+            if checkpoint_id:
+                row = await conn.fetchrow(
+                    f"""
+                    SELECT {CHECKPOINT_COLUMNS} FROM workflow_checkpoints
+                    WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id = $3
+                    """,
+                    thread_id, checkpoint_ns, checkpoint_id
+                )
+            else:
+                row = await conn.fetchrow(
+                    f"""
+                    SELECT {CHECKPOINT_COLUMNS} FROM workflow_checkpoints
+                    WHERE thread_id = $1 AND checkpoint_ns = $2
+                      AND created_at > NOW() - make_interval(secs => $3)
+                    ORDER BY checkpoint_id DESC
+                    LIMIT 1
+                    """,
+                    thread_id, checkpoint_ns, self.ttl_seconds
+                )
+            if row is None:
+                return None
+
+            writes = await conn.fetch(
+                """
+                SELECT task_id, channel, value_type, value FROM workflow_checkpoint_writes
+                WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id = $3
+                ORDER BY task_path, task_id, idx
+                """,
+                thread_id, checkpoint_ns, row["checkpoint_id"]
+            )
+
+        return self._row_to_tuple(thread_id, checkpoint_ns, row, writes)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """List a thread's checkpoints, newest first."""
+        if config is None:
+            # Listing across threads is not used by the workflow
+            return
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        before_id = get_checkpoint_id(before) if before else None
+
+        async with acquire() as conn:
+            rows = await conn.fetch(
+                f"""
+                SELECT {CHECKPOINT_COLUMNS} FROM workflow_checkpoints
+                WHERE thread_id = $1 AND checkpoint_ns = $2
+                  AND ($3::text IS NULL OR checkpoint_id < $3)
+                ORDER BY checkpoint_id DESC
+                """,
+                thread_id, checkpoint_ns, before_id
+            )
+
+        yielded = 0
+        for row in rows:
+            if limit is not None and yielded >= limit:
+                return
+            checkpoint_tuple = self._row_to_tuple(thread_id, checkpoint_ns, row, [])
+            # Metadata is stored serialized, so filtering happens here
+            if filter and any(checkpoint_tuple.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            yielded += 1
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint and prune the thread's older checkpoints."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_type, checkpoint_data = self._dump(checkpoint)
+        metadata_type, metadata_data = self._dump(get_checkpoint_metadata(config, metadata))
+
+        async with acquire() as conn:
+            await conn.execute(
+                PUT_CHECKPOINT_QUERY,
+                thread_id, checkpoint_ns, checkpoint["id"], get_checkpoint_id(config),
+                checkpoint_type, checkpoint_data, metadata_type, metadata_data,
+                self.keep_per_thread
+            )
+
+        await self._maybe_sweep()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store intermediate writes linked to a checkpoint."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        # Special channels (errors, interrupts) replace earlier values; regular
+        # writes are idempotent on retry
+        if all(channel in WRITES_IDX_MAP for channel, _ in writes):
+            conflict = "DO UPDATE SET channel = EXCLUDED.channel, value_type = EXCLUDED.value_type, value = EXCLUDED.value"
+        else:
+            conflict = "DO NOTHING"
+
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, value_data = self._dump(value)
+            rows.append((
+                thread_id, checkpoint_ns, checkpoint_id, task_id,
+                WRITES_IDX_MAP.get(channel, idx), channel, value_type, value_data, task_path
+            ))
+
+        async with acquire() as conn:
+            await conn.executemany(
+                f"""
+                INSERT INTO workflow_checkpoint_writes (
+                    thread_id, checkpoint_ns, checkpoint_id, task_id,
+                    idx, channel, value_type, value, task_path
+                )
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) {conflict}
+                """,
+                rows
+            )
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints and writes of a thread."""
+        async with acquire() as conn:
+            await conn.execute("DELETE FROM workflow_checkpoints WHERE thread_id = $1", thread_id)
+
+    # ========================================================================
+    # EXPIRY
+    # ========================================================================
+
+    async def sweep_expired(self) -> int:
+        """Delete threads whose newest checkpoint is older than the TTL.
+
+        Returns:
+            Number of checkpoints removed
+        """
+        async with acquire() as conn:
+            result = await conn.execute(
+                """
+                DELETE FROM workflow_checkpoints c
+                WHERE c.created_at < NOW() - make_interval(secs => $1)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM workflow_checkpoints recent
+                      WHERE recent.thread_id = c.thread_id
+                        AND recent.created_at >= NOW() - make_interval(secs => $1)
+                  )
+                """,
+                self.ttl_seconds
+            )
+        return int(result.split()[-1])
+
+    async def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep < self.sweep_interval_seconds:
+            return
+        self._last_sweep = now
+        try:
+            removed = await self.sweep_expired()
+            if removed:
+                print(f"[Checkpointer] Swept {removed} expired checkpoints")
+        except Exception as e:
+            print(f"[Checkpointer] Expiry sweep failed: {e}")
+
+
+# ============================================================================
+# FACTORY
+# ============================================================================
+
+_shared_saver: Optional[PostgresCheckpointSaver] = None
+
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """Return the checkpointer selected by CHECKPOINTER.
+
+    The Postgres saver is shared by every workflow in the process. The memory
+    saver is per workflow and unbounded, for local development only.
+    """
+    global _shared_saver
+    backend = os.environ.get("CHECKPOINTER", "postgres").lower()
+
+    if backend == "memory":
+        return MemorySaver()
+    if backend != "postgres":
+        raise ValueError(f"Unknown CHECKPOINTER: {backend}")
+
+    if _shared_saver is None:
+        _shared_saver = PostgresCheckpointSaver.from_env()
+    return _shared_saver
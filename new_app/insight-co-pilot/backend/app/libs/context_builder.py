@@ -0,0 +1,244 @@
+"""Token-budgeted prompt context for the agent workflow.
+
+ContextBuilder fits conversation history and agent results into a fixed token
+budget so prompt size, cost and LLM latency stay bounded as sessions grow:
+
+- Agent results are serialized compactly: no indentation, chart configs
+  dropped, long strings clipped, and row arrays cut to a few sample rows plus
+  per-column stats. Rows are halved until the results fit their share.
+- History keeps the most recent turns verbatim and folds older turns into a
+  one-line-per-turn summary.
+
+Tokens are counted with tiktoken when it is installed and its encoding can be
+loaded, otherwise estimated at four characters per token.
+
+Configuration (environment variables):
+    CONTEXT_TOKEN_BUDGET: tokens available for history plus agent results (default 3000)
+    CONTEXT_AGENT_SHARE: fraction of the budget reserved for agent results (default 0.6)
+    CONTEXT_MAX_ROWS: sample rows kept per row array (default 10)
+    CONTEXT_MAX_STRING_CHARS: longest string kept in agent results (default 500)
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import json
+import math
+import os
+import re
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", 3000))
+CONTEXT_AGENT_SHARE = float(os.environ.get("CONTEXT_AGENT_SHARE", 0.6))
+CONTEXT_MAX_ROWS = int(os.environ.get("CONTEXT_MAX_ROWS", 10))
+CONTEXT_MAX_STRING_CHARS = int(os.environ.get("CONTEXT_MAX_STRING_CHARS", 500))
+
+# Keys that are rendered for the UI and carry nothing the LLM should read
+OMITTED_KEYS = {"chart_config"}
+
+SUMMARY_LINE_CHARS = 160
+
+# Section headings and line breaks added around the history lines
+HISTORY_OVERHEAD_TOKENS = 16
+
+_CHART_MARKER = re.compile(r"\[PLOTLY_CHART\].*?\[/PLOTLY_CHART\]", re.DOTALL)
+
+
+# ============================================================================
+# TOKEN COUNTING
+# ============================================================================
+
+@lru_cache(maxsize=16)
+def _get_encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use, which fails offline
+        print(f"tiktoken encoding unavailable ({e}); estimating token counts")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Count the tokens in text for the given model."""
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+# ============================================================================
+# AGENT RESULTS
+# ============================================================================
+
+def _column_stats(rows: List[dict]) -> Dict[str, dict]:
+    """Min, max and mean for every numeric column of a row array."""
+    stats = {}
+    for column in rows[0].keys():
+        values = [
+            row.get(column) for row in rows
+            if isinstance(row.get(column), (int, float)) and not isinstance(row.get(column), bool)
+        ]
+        if values:
+            stats[column] = {
+                "min": min(values),
+                "max": max(values),
+                "mean": round(sum(values) / len(values), 4)
+            }
+    return stats
+
+
+def compact_value(value: Any, max_rows: int = CONTEXT_MAX_ROWS) -> Any:
+    """Shrink an agent result for the prompt.
+
+    Lists longer than max_rows keep their first rows; for lists of records
+    the dropped rows are described by per-column stats over the full list.
+    """
+    if isinstance(value, dict):
+        return {
+            key: compact_value(item, max_rows)
+            for key, item in value.items()
+            if key not in OMITTED_KEYS
+        }
+
+    if isinstance(value, (list, tuple)):
+        if len(value) <= max_rows:
+            return [compact_value(item, max_rows) for item in value]
+
+        shown = [compact_value(item, max_rows) for item in value[:max_rows]]
+        summary = {"total_rows": len(value), "rows_shown": max_rows}
+        if all(isinstance(item, dict) for item in value) and value:
+            summary["stats"] = _column_stats(value)
+        return shown + [{"_truncated": summary}] if shown else [{"_truncated": summary}]
+
+    if isinstance(value, str) and len(value) > CONTEXT_MAX_STRING_CHARS:
+        return value[:CONTEXT_MAX_STRING_CHARS] + f"... [{len(value) - CONTEXT_MAX_STRING_CHARS} chars omitted]"
+
+    return value
+
+
+def dumps_compact(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+# ============================================================================
+# HISTORY
+# ============================================================================
+
+def clean_history_content(content: str) -> str:
+    """Strip inline chart payloads stored with assistant messages."""
+    return _CHART_MARKER.sub("[chart]", content or "").strip()
+
+
+def summarize_turn(message: Dict[str, str]) -> str:
+    """One-line summary of a message for the older-turns digest."""
+    text = " ".join(clean_history_content(message["content"]).split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS - 3] + "..."
+    return f"- {message['role']}: {text}"
+
+
+# ============================================================================
+# BUILDER
+# ============================================================================
+
+class ContextBuilder:
+    """Fits history and agent results into a token budget."""
+
+    def __init__(self, model: str = "gpt-4o-mini", budget: int = CONTEXT_TOKEN_BUDGET):
+        self.model = model
+        self.budget = budget
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def build_agent_data(self, agent_response: Any, budget: int) -> str:
+        """Serialize agent results compactly within budget tokens."""
+        max_rows = CONTEXT_MAX_ROWS
+        while True:
+            text = dumps_compact(compact_value(agent_response, max_rows))
+            if self.count(text) <= budget or max_rows == 0:
+                break
+            max_rows //= 2
+
+        # Last resort for results that are large even without rows
+        if self.count(text) > budget:
+            keep_chars = max(budget * 4 - 40, 0)
+            text = text[:keep_chars] + f"... [truncated to fit {budget} tokens]"
+        return text
+
+    def build_history(self, history: List[Dict[str, str]], budget: int) -> str:
+        """Render history newest-first until the budget runs out.
+
+        Recent messages are kept verbatim. Once they no longer fit, the
+        remaining older messages are condensed to one line each, oldest lines
+        dropped first if even the digest would overflow.
+        """
+        if not history or budget <= 0:
+            return ""
+
+        recent = []
+        used = HISTORY_OVERHEAD_TOKENS
+        cutoff = len(history)
+        for index in range(len(history) - 1, -1, -1):
+            message = history[index]
+            line = f"{message['role']}: {clean_history_content(message['content'])}"
+            tokens = self.count(line) + 1
+            if used + tokens > budget:
+                break
+            recent.append(line)
+            used += tokens
+            cutoff = index
+        recent.reverse()
+
+        summary = []
+        for message in reversed(history[:cutoff]):
+            line = summarize_turn(message)
+            tokens = self.count(line) + 1
+            if used + tokens > budget:
+                break
+            summary.append(line)
+            used += tokens
+        summary.reverse()
+
+        parts = []
+        if summary:
+            parts.append("Earlier in the conversation (summarized):\n" + "\n".join(summary))
+        if recent:
+            parts.append("Recent messages:\n" + "\n".join(recent))
+        return "\n\n".join(parts)
+
+    def build(
+        self,
+        history: Optional[List[Dict[str, str]]] = None,
+        agent_response: Any = None
+    ) -> Dict[str, Any]:
+        """Assemble prompt context within the builder's budget.
+
+        Agent results get CONTEXT_AGENT_SHARE of the budget; history gets
+        everything the results leave unused.
+
+        Returns:
+            dict with history and agent_data strings and the tokens they use
+        """
+        agent_data = ""
+        if agent_response:
+            agent_data = self.build_agent_data(agent_response, int(self.budget * CONTEXT_AGENT_SHARE))
+
+        agent_tokens = self.count(agent_data)
+        history_text = self.build_history(history or [], self.budget - agent_tokens)
+
+        return {
+            "history": history_text,
+            "agent_data": agent_data,
+            "tokens": agent_tokens + self.count(history_text)
+        }
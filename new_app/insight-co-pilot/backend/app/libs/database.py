@@ -1,12 +1,155 @@
+"""Application-wide asyncpg connection pool.
+
+The pool is created once in the app lifespan and shared by every request.
+
+Usage in endpoints:
+
+    from app.libs.database import DbConnection
+
+    @router.get("/example")
+    async def example(conn: DbConnection):
+        return await conn.fetch("SELECT 1")
+
+Outside of request dependencies (agents, streaming generators):
+
+    from app.libs.database import acquire
+
+    async with acquire() as conn:
+        await conn.fetch("SELECT 1")
+
+Configuration (environment variables):
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE: pool bounds (default 2 / 10)
+    DB_POOL_ACQUIRE_TIMEOUT: seconds to wait for a free connection (default 10)
+    DB_POOL_MAX_INACTIVE_LIFETIME: seconds before idle connections close (default 300)
+    DB_STATEMENT_CACHE_SIZE: prepared statements cached per connection (default 100)
+    DB_COMMAND_TIMEOUT: default per-statement timeout in seconds (default 60)
+    DB_PGBOUNCER: "true" when behind pgbouncer in transaction mode; disables
+        the statement cache, which transaction pooling cannot support
+"""
+
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncIterator
+from fastapi import Depends
 import databutton as db
 import asyncpg
-from app.env import mode, Mode
-
-async def get_db_connection():
-    if mode == Mode.PROD:
-        db_url = db.secrets.get("DATABASE_URL_ADMIN_PROD")
-    else:
-        db_url = db.secrets.get("DATABASE_URL_ADMIN_DEV")
-    
-    conn = await asyncpg.connect(db_url)
-    return conn
+import asyncio
+import os
+import time
+
+
+class PoolMetrics:
+    """Counters for connection acquisition."""
+
+    def __init__(self):
+        self.acquires = 0
+        self.acquire_timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record_wait(self, wait_seconds: float):
+        self.acquires += 1
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def as_dict(self) -> dict:
+        avg_wait = self.total_wait_seconds / self.acquires if self.acquires else 0.0
+        return {
+            "acquires": self.acquires,
+            "acquire_timeouts": self.acquire_timeouts,
+            "avg_wait_ms": round(avg_wait * 1000, 3),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+        }
+
+
+metrics = PoolMetrics()
+
+_pool: asyncpg.Pool | None = None
+_pool_lock = asyncio.Lock()
+
+
+def get_database_url() -> str:
+    """Database URL shared by all APIs and agents."""
+    return db.secrets.get("DATABASE_URL_DEV")
+
+
+def _pool_settings() -> dict:
+    pgbouncer = os.environ.get("DB_PGBOUNCER", "false").lower() == "true"
+    statement_cache_size = 0 if pgbouncer else int(os.environ.get("DB_STATEMENT_CACHE_SIZE", 100))
+    return {
+        "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+        "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+        "max_inactive_connection_lifetime": float(os.environ.get("DB_POOL_MAX_INACTIVE_LIFETIME", 300)),
+        "command_timeout": float(os.environ.get("DB_COMMAND_TIMEOUT", 60)),
+        "statement_cache_size": statement_cache_size,
+    }
+
+
+def acquire_timeout() -> float:
+    return float(os.environ.get("DB_POOL_ACQUIRE_TIMEOUT", 10))
+
+
+async def create_pool() -> asyncpg.Pool:
+    """Create the shared pool. Called from the app lifespan."""
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            settings = _pool_settings()
+            _pool = await asyncpg.create_pool(get_database_url(), **settings)
+            print(f"Database pool created (min={settings['min_size']}, max={settings['max_size']})")
+    return _pool
+
+
+async def close_pool():
+    """Close the shared pool. Called on app shutdown."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+        print("Database pool closed")
+
+
+async def get_pool() -> asyncpg.Pool:
+    """Return the shared pool, creating it on first use outside the lifespan."""
+    if _pool is None:
+        return await create_pool()
+    return _pool
+
+
+@asynccontextmanager
+async def acquire() -> AsyncIterator[asyncpg.Connection]:
+    """Check out a pooled connection, recording wait time and timeouts."""
+    pool = await get_pool()
+    start = time.perf_counter()
+    try:
+        conn = await pool.acquire(timeout=acquire_timeout())
+    except asyncio.TimeoutError:
+        metrics.acquire_timeouts += 1
+        raise
+    metrics.record_wait(time.perf_counter() - start)
+
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+async def get_db() -> AsyncIterator[asyncpg.Connection]:
+    """FastAPI dependency yielding a pooled connection for the request."""
+    async with acquire() as conn:
+        yield conn
+
+
+DbConnection = Annotated[asyncpg.Connection, Depends(get_db)]
+
+
+def pool_stats() -> dict:
+    """Current pool size and acquisition metrics."""
+    stats = {"initialized": _pool is not None, **metrics.as_dict()}
+    if _pool is not None:
+        stats.update({
+            "size": _pool.get_size(),
+            "idle": _pool.get_idle_size(),
+            "min_size": _pool.get_min_size(),
+            "max_size": _pool.get_max_size(),
+        })
+    return stats
@@ -0,0 +1,229 @@
+"""Resolve business unit, LOB, dataset and metric names in a query to IDs.
+
+Agents such as ModelTrainer and DataExplorer need a lob_id or dataset_id,
+but classification only yields fixed defaults, so those requests failed
+after a wasted round trip. EntityIndex keeps every entity name in memory,
+compiled into one word-boundary regex. resolve_entities can then map
+"forecast Technical Support" to lob_id 5 without touching the database.
+
+The index is rebuilt lazily when the system context is invalidated, which
+happens on business_data/data_upload writes and on Postgres
+`system_context_changed` notifications. It is also rebuilt after
+ENTITY_INDEX_TTL_SECONDS (default 300).
+"""
+
+from difflib import get_close_matches
+from typing import Any, Dict, List, Optional
+import asyncio
+import os
+import re
+import time
+
+from app.libs.database import acquire
+from app.libs.system_context import context_generation
+
+ENTITY_INDEX_TTL_SECONDS = float(os.environ.get("ENTITY_INDEX_TTL_SECONDS", 300))
+
+# Similarity a run of query words needs to match a name it misspells
+FUZZY_CUTOFF = 0.85
+
+ENTITY_KINDS = ("business_units", "lobs", "datasets", "metrics")
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+
+class EntityIndex:
+    """In-memory name index over business units, LOBs, datasets and metrics."""
+
+    def __init__(self, ttl_seconds: float = ENTITY_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.entities: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in ENTITY_KINDS}
+        self.by_name: Dict[str, List[tuple]] = {}
+        self.names_by_length: Dict[int, List[str]] = {}
+        self.pattern: Optional[re.Pattern] = None
+        self.built_at = 0.0
+        self.built_generation = -1
+        self.lock = asyncio.Lock()
+
+    def is_fresh(self) -> bool:
+        return (
+            self.built_generation == context_generation()
+            and time.monotonic() - self.built_at < self.ttl_seconds
+        )
+
+    async def refresh(self):
+        """Reload entity names from the database and recompile the matcher."""
+        generation = context_generation()
+        async with acquire() as conn:
+            business_units = await conn.fetch("SELECT id, name FROM business_units")
+            lobs = await conn.fetch("SELECT id, name, business_unit_id FROM lobs")
+            datasets = await conn.fetch(
+                "SELECT id, name, lob_id, business_unit_id FROM datasets ORDER BY uploaded_at DESC"
+            )
+            metrics = await conn.fetch(
+                "SELECT DISTINCT metric_name AS name FROM weekly_metrics WHERE metric_name IS NOT NULL LIMIT 500"
+            )
+
+        self.entities = {
+            "business_units": [dict(row) for row in business_units],
+            "lobs": [dict(row) for row in lobs],
+            "datasets": [dict(row) for row in datasets],
+            "metrics": [dict(row) for row in metrics],
+        }
+
+        by_name: Dict[str, List[tuple]] = {}
+        for kind, rows in self.entities.items():
+            for row in rows:
+                name = normalize(row["name"])
+                if name:
+                    by_name.setdefault(name, []).append((kind, row))
+        self.by_name = by_name
+        names_by_length: Dict[int, List[str]] = {}
+        for name in by_name:
+            if len(name) >= 4:
+                names_by_length.setdefault(len(name.split()), []).append(name)
+        self.names_by_length = names_by_length
+
+        # Longest names first so "technical support team" beats "technical support"
+        names = sorted(by_name, key=len, reverse=True)
+        alternation = "|".join(name.replace(" ", r"\s+") for name in names)
+        self.pattern = re.compile(rf"\b(?:{alternation})\b") if names else None
+
+        self.built_at = time.monotonic()
+        self.built_generation = generation
+
+    async def ensure_fresh(self):
+        if self.is_fresh():
+            return
+        async with self.lock:
+            if not self.is_fresh():
+                await self.refresh()
+
+    def resolve(self, query: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Entities named in a query, per kind, in order of first mention."""
+        text = normalize(query)
+        found: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in ENTITY_KINDS}
+        seen = set()
+
+        def add(name: str):
+            for kind, row in self.by_name.get(name, []):
+                key = (kind, row.get("id", row["name"]))
+                if key not in seen:
+                    seen.add(key)
+                    found[kind].append(row)
+
+        matched_spans = []
+        if self.pattern is not None:
+            for match in self.pattern.finditer(text):
+                add(" ".join(match.group(0).split()))
+                matched_spans.append(match.span())
+
+        # Typos ("tecnical support"): compare runs of unmatched words against
+        # names with the same word count
+        words = [
+            word for word in re.finditer(r"[a-z0-9]+", text)
+            if not any(start <= word.start() < end for start, end in matched_spans)
+        ]
+        for length, names in self.names_by_length.items():
+            for index in range(len(words) - length + 1):
+                window = " ".join(word.group(0) for word in words[index:index + length])
+                if len(window) < 4:
+                    continue
+                close = get_close_matches(window, names, n=1, cutoff=FUZZY_CUTOFF)
+                if close:
+                    add(close[0])
+
+        return found
+
+    def stats(self) -> dict:
+        return {kind: len(rows) for kind, rows in self.entities.items()}
+
+
+_index = EntityIndex()
+
+
+async def resolve_entities(query: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Resolve entity names in a query against the shared, lazily refreshed index."""
+    await _index.ensure_fresh()
+    return _index.resolve(query)
+
+
+def only_dataset() -> Optional[Dict[str, Any]]:
+    """The single dataset when exactly one exists, as an unambiguous default."""
+    datasets = _index.entities["datasets"]
+    return datasets[0] if len(datasets) == 1 else None
+
+
+def lobs_under(business_unit_id: Any) -> List[Dict[str, Any]]:
+    return [lob for lob in _index.entities["lobs"] if lob.get("business_unit_id") == business_unit_id]
+
+
+def target_lobs(entities: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """LOBs a query is about: named LOBs, else the LOB of a named dataset,
+    else a named business unit's only LOB."""
+    if entities["lobs"]:
+        return entities["lobs"]
+    by_id = {lob["id"]: lob for lob in _index.entities["lobs"]}
+    lobs = [by_id[dataset["lob_id"]] for dataset in entities["datasets"] if dataset.get("lob_id") in by_id]
+    if lobs:
+        return lobs
+    for business_unit in entities["business_units"]:
+        children = lobs_under(business_unit["id"])
+        if len(children) == 1:
+            return children
+    return []
+
+
+def apply_entities(agent: str, params: Dict[str, Any], entities: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Fill agent parameters from resolved entities.
+
+    Returns:
+        One params dict per agent invocation. Forecasting fans out to one
+        invocation per LOB when a query names several.
+    """
+    params = dict(params)
+    lobs = target_lobs(entities)
+
+    if agent == "model_trainer":
+        if entities["metrics"]:
+            params["metric_name"] = entities["metrics"][0]["name"]
+        if len(lobs) > 1:
+            return [{**params, "lob_id": lob["id"], "lob_name": lob["name"]} for lob in lobs]
+        if lobs:
+            params.update(lob_id=lobs[0]["id"], lob_name=lobs[0]["name"])
+
+    elif agent in ("model_selector", "model_evaluator", "scenario_modeler"):
+        if entities["metrics"]:
+            params["metric_name"] = entities["metrics"][0]["name"]
+        if lobs:
+            params.update(lob_id=lobs[0]["id"], lob_name=lobs[0]["name"])
+
+    elif agent == "data_explorer":
+        dataset = entities["datasets"][0] if entities["datasets"] else only_dataset()
+        if dataset:
+            params["dataset_id"] = dataset["id"]
+
+    elif agent == "comparison_analyzer":
+        if len(lobs) > 1:
+            params["lob_ids"] = [lob["id"] for lob in lobs]
+        elif lobs:
+            # One LOB has nothing to compare against but itself over time
+            params.update(comparison_type="time_series", lob_id=lobs[0]["id"])
+
+    elif agent == "data_fetcher" and params.get("query_type") == "metrics":
+        filters = {}
+        if len(lobs) == 1:
+            filters["lob_id"] = lobs[0]["id"]
+        if entities["metrics"]:
+            filters["metric_name"] = entities["metrics"][0]["name"]
+        params["filters"] = filters
+
+    return [params]
+
+
+def entity_index_stats() -> dict:
+    return _index.stats()
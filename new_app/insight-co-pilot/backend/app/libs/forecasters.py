@@ -0,0 +1,193 @@
+"""Lightweight NumPy forecasters for weekly series.
+
+Prophet takes seconds per fit. Short weekly series rarely need it, so these
+models fit in milliseconds and answer interactive queries directly:
+
+- seasonal_naive: repeats the value from one season (52 weeks) earlier, or
+  the last value when the series is shorter than a season.
+- moving_average: flat forecast at the mean of the last MOVING_AVERAGE_WINDOW
+  weeks.
+- holt_winters: additive Holt-Winters with a damped trend. Its smoothing
+  parameters are picked by one grid search, vectorized across every
+  parameter combination so the whole grid is fitted in a single pass over
+  the series. Seasonality is used once two full seasons are available;
+  shorter series get Holt's linear trend.
+
+Every forecaster returns Prophet-shaped predictions ({ds, yhat, yhat_lower,
+yhat_upper}) with 80% intervals, Prophet's default interval width.
+"""
+
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+import itertools
+import time
+
+import numpy as np
+
+SEASON_LENGTH = 52
+MOVING_AVERAGE_WINDOW = 4
+
+# Shortest series any of these models is fitted on
+MIN_SERIES_LENGTH = 4
+
+# Two-sided 80% normal quantile
+Z_80 = 1.2816
+
+ALPHAS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.01, 0.05, 0.1, 0.2)
+GAMMAS = (0.05, 0.1, 0.2, 0.4)
+PHIS = (0.9, 0.98, 1.0)
+
+# Alternative names, including ModelSelector's recommendations
+MODEL_ALIASES = {
+    "naive": "seasonal_naive",
+    "snaive": "seasonal_naive",
+    "ets": "holt_winters",
+    "exponential_smoothing": "holt_winters",
+    "holt": "holt_winters",
+    "sma": "moving_average",
+    "simple_moving_average": "moving_average",
+}
+
+
+# ============================================================================
+# MODELS
+# ============================================================================
+
+def seasonal_naive(y: np.ndarray, periods: int, season_length: int = SEASON_LENGTH) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """Forecast each week as the same week one season earlier.
+
+    Returns:
+        (point forecast, interval half-width, fitted parameters)
+    """
+    horizon = np.arange(periods)
+    if len(y) > season_length:
+        yhat = y[len(y) - season_length + horizon % season_length]
+        residuals = y[season_length:] - y[:-season_length]
+        steps = horizon // season_length + 1
+    else:
+        yhat = np.full(periods, y[-1])
+        residuals = np.diff(y)
+        steps = horizon + 1
+        season_length = 1
+    sigma = residuals.std() if len(residuals) > 1 else 0.0
+    return yhat, Z_80 * sigma * np.sqrt(steps), {"season_length": season_length}
+
+
+def moving_average(y: np.ndarray, periods: int, window: int = MOVING_AVERAGE_WINDOW) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """Flat forecast at the mean of the last window values."""
+    # Leave enough points to estimate the one-step error
+    window = max(1, min(window, len(y) // 2))
+    cumulative = np.concatenate(([0.0], np.cumsum(y)))
+    # One-step-ahead errors of the trailing mean at every point
+    fitted = (cumulative[window:-1] - cumulative[:-window - 1]) / window
+    residuals = y[window:] - fitted
+    sigma = residuals.std() if len(residuals) > 1 else 0.0
+    yhat = np.full(periods, y[-window:].mean())
+    return yhat, Z_80 * sigma * np.sqrt(np.arange(1, periods + 1)), {"window": window}
+
+
+def holt_winters(y: np.ndarray, periods: int, season_length: int = SEASON_LENGTH) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """Additive damped Holt-Winters, grid-searched on one-step squared error."""
+    n = len(y)
+    seasonal = n >= 2 * season_length
+    m = season_length if seasonal else 1
+
+    grid = np.array(list(itertools.product(ALPHAS, BETAS, GAMMAS if seasonal else (0.0,), PHIS)))
+    alpha, beta, gamma, phi = grid.T
+    size = len(grid)
+
+    # Initial states are those of the week before y[0], so the first
+    # one-step forecast is of y[0] itself
+    if seasonal:
+        first, second = y[:m].mean(), y[m:2 * m].mean()
+        slope = (second - first) / m
+        # The first season's mean is the level at its midpoint, (m - 1) / 2
+        level = np.full(size, first - slope * (m + 1) / 2)
+        trend = np.full(size, slope)
+        season = np.tile(y[:m] - (first + slope * (np.arange(m) - (m - 1) / 2)), (size, 1))
+    else:
+        level = np.full(size, 2 * y[0] - y[1])
+        trend = np.full(size, y[1] - y[0])
+        season = np.zeros((size, 1))
+
+    sse = np.zeros(size)
+    for t in range(n):
+        s = season[:, t % m]
+        error = y[t] - (level + phi * trend + s)
+        sse += error ** 2
+        new_level = alpha * (y[t] - s) + (1 - alpha) * (level + phi * trend)
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        season[:, t % m] = gamma * (y[t] - new_level) + (1 - gamma) * s
+        level = new_level
+
+    best = int(np.argmin(sse))
+    a, b, g, p = grid[best]
+    horizon = np.arange(1, periods + 1)
+    # Damped trend multiplier: phi + phi^2 + ... + phi^h
+    damping = np.cumsum(p ** horizon)
+    yhat = level[best] + damping * trend[best] + season[best, (n + horizon - 1) % m]
+
+    # Approximate h-step variance of the additive state space form:
+    # sigma^2 * (1 + c_1^2 + ... + c_{h-1}^2), c_j = alpha * (1 + beta * (phi + ... + phi^j))
+    sigma = np.sqrt(sse[best] / n)
+    coefficients = a * (1 + b * damping)
+    coefficients += g * (horizon % m == 0)
+    variance = 1 + np.concatenate(([0.0], np.cumsum(coefficients[:-1] ** 2)))
+    params = {
+        "alpha": float(a), "beta": float(b), "gamma": float(g), "phi": float(p),
+        "seasonal": seasonal, "candidates": size,
+    }
+    return yhat, Z_80 * sigma * np.sqrt(variance), params
+
+
+FORECASTERS: Dict[str, Callable[[np.ndarray, int], Tuple[np.ndarray, np.ndarray, Dict[str, Any]]]] = {
+    "seasonal_naive": seasonal_naive,
+    "moving_average": moving_average,
+    "holt_winters": holt_winters,
+}
+
+
+# ============================================================================
+# ENTRY POINT
+# ============================================================================
+
+def resolve_model_type(model_type: str) -> str:
+    """Canonical forecaster name for a model_type or ModelSelector model name."""
+    name = (model_type or "").strip().lower().replace("-", "_").replace(" ", "_")
+    return MODEL_ALIASES.get(name, name)
+
+
+def forecast(model_type: str, series: Sequence[Tuple[Any, float]], periods: int) -> Dict[str, Any]:
+    """Fit a fast forecaster on (week_date, value) pairs and forecast periods weeks.
+
+    Returns:
+        dict with model_type, predictions, params and fit_ms
+
+    Raises:
+        KeyError: if model_type is not a fast forecaster
+        ValueError: if periods is below 1 or the series is shorter than
+            MIN_SERIES_LENGTH
+    """
+    name = resolve_model_type(model_type)
+    model = FORECASTERS[name]
+    if periods < 1:
+        raise ValueError(f"periods must be at least 1, got {periods}")
+    if len(series) < MIN_SERIES_LENGTH:
+        raise ValueError(f"Insufficient data for forecasting (need at least {MIN_SERIES_LENGTH} data points)")
+
+    started = time.perf_counter()
+    y = np.fromiter((value for _, value in series), dtype=float, count=len(series))
+    yhat, half_width, params = model(y, periods)
+
+    last_week = np.datetime64(str(series[-1][0])[:10], "D")
+    weeks = np.datetime_as_string(last_week + 7 * np.arange(1, periods + 1))
+    predictions: List[Dict[str, Any]] = [
+        {"ds": str(ds), "yhat": float(point), "yhat_lower": float(point - width), "yhat_upper": float(point + width)}
+        for ds, point, width in zip(weeks, yhat, half_width)
+    ]
+    return {
+        "model_type": name,
+        "predictions": predictions,
+        "params": params,
+        "fit_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
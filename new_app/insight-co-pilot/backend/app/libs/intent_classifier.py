@@ -0,0 +1,385 @@
+"""Rule-based intent classification for the agent workflow.
+
+Every intent rule is compiled into one alternation regex with word boundaries,
+so a query is scanned once no matter how many rules there are. Matches add
+weighted votes for their intent and the highest total wins. Ties go to the
+intent declared first in INTENT_RULES. Because the vote is weighted, "show me
+the forecast" routes to forecasting even though "show" also suggests a data
+listing. Because matches need word boundaries, "vs" no longer fires inside
+"canvas".
+
+Queries no rule scores are matched against labelled example phrases by
+TF-IDF cosine similarity, which catches paraphrases without any keyword
+("how many calls will we get in march").
+
+Both stages are pure Python and run in well under a millisecond. See
+benchmarks/intent_benchmark.py for accuracy and latency against a labelled set.
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+import math
+import re
+
+
+# ============================================================================
+# RULES
+# ============================================================================
+
+# agent -> [(regex fragment, weight)]. Fragments are matched case-insensitively
+# between word boundaries, with any whitespace between words.
+INTENT_RULES: Dict[str, List[Tuple[str, float]]] = {
+    "comparison_analyzer": [
+        (r"compar(?:e|es|ed|ing|ison|isons)", 3.0),
+        (r"versus", 3.0),
+        (r"vs\.?", 3.0),
+        (r"difference between", 3.0),
+        (r"side by side", 2.0),
+        (r"(?:better|worse) than", 2.0),
+        (r"rank(?:s|ed|ing)?", 2.5),
+        (r"best|worst|top", 1.5),
+    ],
+    "model_trainer": [
+        (r"forecast(?:s|ed|ing)?", 3.0),
+        (r"predict(?:s|ed|ing|ion|ions)?", 3.0),
+        (r"projections?", 2.5),
+        (r"next (?:week|month|quarter|year)", 2.0),
+        (r"future", 1.5),
+        (r"will (?:be|we|it)", 1.0),
+    ],
+    "model_selector": [
+        (r"which (?:forecasting )?models?", 4.0),
+        (r"best (?:forecasting )?models?", 4.0),
+        (r"(?:recommend|choose|pick|select)(?:s|ed|ing)? (?:a |the )?(?:forecasting )?models?", 4.0),
+        (r"model selection", 4.0),
+    ],
+    "model_evaluator": [
+        (r"backtest(?:s|ed|ing)?", 4.0),
+        (r"cross validat(?:e|ed|ion)", 4.0),
+        (r"accura(?:te|cy)", 3.5),
+        (r"evaluat(?:e|es|ed|ing|ion)", 3.5),
+        (r"mae|rmse|s?mape", 3.5),
+    ],
+    "scenario_modeler": [
+        (r"what if", 3.5),
+        (r"scenarios?", 3.0),
+        (r"simulat(?:e|es|ed|ing|ion|ions)", 3.0),
+        (r"growth rate", 2.0),
+        (r"impact", 1.5),
+        (r"what happens", 2.0),
+        (r"assum(?:e|ing)|suppose", 3.0),
+        (r"sensitiv(?:e|ity)", 3.0),
+        (r"monte carlo", 3.5),
+    ],
+    "insights_analyzer": [
+        (r"trend(?:s|ing)?", 3.0),
+        (r"insights?", 2.5),
+        (r"patterns?", 2.0),
+        (r"seasonality", 2.5),
+        (r"anomal(?:y|ies)", 2.5),
+        (r"analy[sz](?:e|es|ed|ing|is)", 1.5),
+    ],
+    "visualizer": [
+        (r"visuali[sz](?:e|es|ation|ations)", 3.0),
+        (r"plot(?:s|ted|ting)?", 3.0),
+        (r"(?:bar|line|pie) charts?", 4.0),
+        (r"charts?", 3.0),
+        (r"graphs?", 3.0),
+        (r"show me a", 1.5),
+    ],
+    "data_explorer": [
+        (r"explor(?:e|es|ing|ation)", 3.0),
+        (r"statistics|stats", 2.5),
+        (r"summar(?:y|ies|ize|ise)", 2.0),
+        (r"describe", 2.5),
+        (r"tell me about", 2.5),
+        (r"profil(?:e|es|ing)", 2.5),
+        (r"distribution", 2.0),
+        (r"columns?", 1.0),
+    ],
+    "crud_manager": [
+        (r"create", 2.0),
+        (r"delete", 2.5),
+        (r"remove", 2.5),
+        (r"update", 2.0),
+        (r"rename", 2.0),
+        (r"get rid of", 3.0),
+        (r"set up", 2.0),
+        (r"change the name", 2.5),
+        (r"make a", 1.5),
+        (r"add", 1.5),
+        (r"new", 0.5),
+    ],
+    "data_fetcher": [
+        (r"what data", 2.5),
+        (r"do we have", 2.0),
+        (r"metrics?", 1.0),
+        (r"datasets?", 2.0),
+        (r"list", 1.5),
+        (r"fetch", 1.5),
+        (r"available", 1.5),
+        (r"show", 1.0),
+        (r"get", 0.5),
+    ],
+}
+
+# A rule total below this is treated as no match and goes to the fallback
+MIN_RULE_SCORE = 1.0
+
+INTENT_DEFAULTS: Dict[str, Tuple[Dict[str, Any], str]] = {
+    "data_fetcher": ({"query_type": "datasets"}, "User wants to view available data"),
+    "comparison_analyzer": ({"comparison_type": "lob_comparison"}, "User wants to compare metrics"),
+    "model_trainer": ({"model_type": "auto"}, "User wants forecasting"),
+    "model_selector": ({}, "User wants a forecasting model recommendation"),
+    "model_evaluator": ({}, "User wants forecast accuracy evaluated"),
+    "insights_analyzer": ({"analysis_type": "trend_analysis"}, "User wants trend analysis"),
+    "scenario_modeler": ({"scenario_type": "growth_projection"}, "User wants scenario modeling"),
+    "data_explorer": ({}, "User wants data exploration"),
+    "visualizer": ({"viz_type": "line_chart", "data": [], "title": "Data Visualization"}, "User wants data visualization"),
+    "crud_manager": ({"operation": "list"}, "User wants to manage entities"),
+}
+
+_BUSINESS_UNIT = re.compile(r"\bbusiness\s+units?\b")
+_METRIC = re.compile(r"\bmetrics?\b")
+_LINE_CHART = re.compile(r"\b(?:line|time|over\s+time|trend|weekly|monthly)\b")
+_BAR_CHART = re.compile(r"\b(?:bar|compare|comparison|versus|vs)\b")
+_MODEL_TYPES = (
+    (re.compile(r"\b(?:holt|winters|exponential\s+smoothing|ets)\b"), "holt_winters"),
+    (re.compile(r"\bmoving\s+average\b"), "moving_average"),
+    (re.compile(r"\bnaive\b"), "seasonal_naive"),
+    (re.compile(r"\bprophet\b"), "prophet"),
+)
+_SCENARIO_TYPES = (
+    (re.compile(r"\b(?:monte\s+carlo|simulat\w*|range\s+of\s+outcomes|probabilit\w*|likel(?:y|ihood)|uncertain\w*|chance)\b"), "monte_carlo"),
+    (re.compile(r"\bsensitiv\w*\b"), "sensitivity_analysis"),
+)
+
+
+# ============================================================================
+# TF-IDF FALLBACK
+# ============================================================================
+
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "data_fetcher": [
+        "which files have been uploaded",
+        "what information do we have",
+        "give me the weekly volume numbers",
+        "pull the latest records for customer service",
+    ],
+    "comparison_analyzer": [
+        "which lob performed best",
+        "how does technical support stack up against billing",
+        "rank the business units by volume",
+        "is sales bigger than support",
+    ],
+    "model_trainer": [
+        "how many calls will we get in march",
+        "estimate volume for the coming weeks",
+        "what will demand look like after the holidays",
+        "expected tickets over the next six months",
+    ],
+    "model_selector": [
+        "what method should we use for volume",
+        "which approach fits this series",
+    ],
+    "model_evaluator": [
+        "how close did our estimates get last quarter",
+        "how reliable have our estimates been",
+    ],
+    "insights_analyzer": [
+        "how has volume changed over time",
+        "why did calls spike last month",
+        "is demand going up or down",
+        "what stands out in the recent numbers",
+    ],
+    "scenario_modeler": [
+        "suppose volume grows by ten percent",
+        "assume we hire five more agents",
+        "how would a price increase affect demand",
+        "if demand doubles how many staff do we need",
+    ],
+    "data_explorer": [
+        "tell me about this dataset",
+        "what does the uploaded data look like",
+        "break down the fields in the file",
+        "are there missing values",
+    ],
+    "visualizer": [
+        "draw the weekly volume",
+        "give me a picture of call volume",
+        "display volume as bars",
+        "can i see this visually",
+    ],
+    "crud_manager": [
+        "set up a business unit for retail",
+        "get rid of the old dataset",
+        "change the name of the lob",
+        "make a lob under customer service",
+    ],
+}
+
+# Cosine similarity the nearest example must reach for the fallback to route
+FALLBACK_MIN_SIMILARITY = 0.3
+
+STOP_WORDS = frozenset(
+    "a about after all an and any are as at be by can do does for from have how i in "
+    "is it look me my of on or our over show that the their them there these this to "
+    "up us was we what when which who why with you".split()
+)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stop words removed and plurals folded."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOP_WORDS:
+            continue
+        if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class TfidfIndex:
+    """Nearest-example lookup over unit-length TF-IDF vectors."""
+
+    def __init__(self, examples: Dict[str, List[str]]):
+        documents = [(intent, tokenize(text)) for intent, texts in examples.items() for text in texts]
+        document_frequency = Counter(token for _, tokens in documents for token in set(tokens))
+        total = len(documents)
+        self.idf = {token: math.log((1 + total) / (1 + df)) + 1.0 for token, df in document_frequency.items()}
+        self.vectors = [(intent, self._vectorize(tokens)) for intent, tokens in documents]
+
+    def _vectorize(self, tokens: List[str]) -> Dict[str, float]:
+        counts = Counter(token for token in tokens if token in self.idf)
+        vector = {token: count * self.idf[token] for token, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {token: weight / norm for token, weight in vector.items()} if norm else {}
+
+    def nearest(self, text: str) -> Tuple[str, float]:
+        """Return the intent of the most similar example and its similarity."""
+        query = self._vectorize(tokenize(text))
+        best_intent, best_score = "none", 0.0
+        if not query:
+            return best_intent, best_score
+        for intent, vector in self.vectors:
+            score = sum(weight * vector.get(token, 0.0) for token, weight in query.items())
+            if score > best_score:
+                best_intent, best_score = intent, score
+        return best_intent, best_score
+
+
+# ============================================================================
+# CLASSIFIER
+# ============================================================================
+
+class IntentClassifier:
+    """Compiled multi-pattern intent classifier."""
+
+    def __init__(
+        self,
+        rules: Dict[str, List[Tuple[str, float]]] = INTENT_RULES,
+        examples: Dict[str, List[str]] = INTENT_EXAMPLES
+    ):
+        self.priority = {intent: rank for rank, intent in enumerate(rules)}
+
+        # Longer fragments first so a phrase wins over a word it starts with
+        entries = sorted(
+            ((intent, fragment, weight) for intent, items in rules.items() for fragment, weight in items),
+            key=lambda entry: -len(entry[1])
+        )
+        self.groups = {f"r{index}": (intent, weight) for index, (intent, _, weight) in enumerate(entries)}
+        alternation = "|".join(
+            "(?P<r%d>%s)" % (index, fragment.replace(" ", r"\s+"))
+            for index, (_, fragment, _) in enumerate(entries)
+        )
+        self.pattern = re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE)
+        self.fallback = TfidfIndex(examples)
+
+    def score(self, query: str) -> Dict[str, float]:
+        """Weighted rule votes per intent. Each rule counts once per query."""
+        matched = {match.lastgroup for match in self.pattern.finditer(query)}
+        scores: Dict[str, float] = {}
+        for group in matched:
+            intent, weight = self.groups[group]
+            scores[intent] = scores.get(intent, 0.0) + weight
+        return scores
+
+    def classify(self, query: str) -> Dict[str, Any]:
+        """Pick the agent for a query.
+
+        Returns:
+            dict with agent ("none" when nothing matched), params, reasoning,
+            score, method ("rules", "similarity" or "none") and per-intent scores
+        """
+        text = query.lower()
+        scores = self.score(text)
+
+        agent, score, method = "none", 0.0, "none"
+        if scores:
+            agent = max(scores, key=lambda intent: (scores[intent], -self.priority[intent]))
+            score = scores[agent]
+            method = "rules"
+
+        if score < MIN_RULE_SCORE:
+            agent, score = self.fallback.nearest(text)
+            method = "similarity"
+            if score < FALLBACK_MIN_SIMILARITY:
+                agent, method = "none", "none"
+
+        params, reasoning = self.params_for(agent, text)
+        return {
+            "agent": agent,
+            "params": params,
+            "reasoning": reasoning,
+            "score": round(score, 3),
+            "method": method,
+            "scores": scores
+        }
+
+    @staticmethod
+    def params_for(agent: str, text: str) -> Tuple[Dict[str, Any], str]:
+        """Default agent parameters, refined by keywords in the query."""
+        if agent not in INTENT_DEFAULTS:
+            return {}, ""
+
+        defaults, reasoning = INTENT_DEFAULTS[agent]
+        params = dict(defaults)
+
+        if agent == "data_fetcher":
+            if _BUSINESS_UNIT.search(text):
+                params["query_type"] = "business_units"
+            elif _METRIC.search(text):
+                params["query_type"] = "metrics"
+        elif agent == "visualizer":
+            # Determine chart type based on keywords
+            if _LINE_CHART.search(text):
+                params.update(viz_type="line_chart", title="Time Series")
+            elif _BAR_CHART.search(text):
+                params.update(viz_type="bar_chart", title="Comparison")
+            params["data"] = []
+        elif agent == "scenario_modeler":
+            for pattern, scenario_type in _SCENARIO_TYPES:
+                if pattern.search(text):
+                    params["scenario_type"] = scenario_type
+                    break
+        elif agent == "model_trainer":
+            for pattern, model_type in _MODEL_TYPES:
+                if pattern.search(text):
+                    params["model_type"] = model_type
+                    break
+
+        return params, reasoning
+
+
+_classifier = None
+
+
+def classify_intent(query: str) -> Dict[str, Any]:
+    """Classify a query with the shared, lazily compiled classifier."""
+    global _classifier
+    if _classifier is None:
+        _classifier = IntentClassifier()
+    return _classifier.classify(query)
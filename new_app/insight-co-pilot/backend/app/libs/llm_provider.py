@@ -0,0 +1,288 @@
+"""Pluggable LLM providers for the agent workflow.
+
+OpenAIProvider talks to the OpenAI API. MockLLMProvider and ReplayLLMProvider run
+fully offline with configurable latency, token streaming and error injection, so
+the workflow can be exercised and benchmarked without API keys or network access.
+
+Select a provider with the LLM_PROVIDER environment variable (openai | mock | replay).
+"""
+
+from typing import AsyncIterator, Dict, List, Optional
+from openai import AsyncOpenAI
+import databutton as db
+import asyncio
+import hashlib
+import json
+import os
+import random
+
+
+class MockLLMError(RuntimeError):
+    """Error raised by the mock provider when error injection triggers."""
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+# ============================================================================
+# PROVIDER INTERFACE
+# ============================================================================
+
+class LLMProvider:
+    """Base interface for chat completion providers."""
+
+    name = "base"
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+    ) -> str:
+        """Return the full completion text for a list of chat messages."""
+        raise NotImplementedError("Subclasses must implement complete()")
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+    ) -> AsyncIterator[str]:
+        """Yield completion text deltas. Defaults to a single full chunk."""
+        yield await self.complete(messages, model, temperature, max_tokens)
+
+
+# ============================================================================
+# OPENAI
+# ============================================================================
+
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", 16))
+OPENAI_TIMEOUT_SECONDS = float(os.environ.get("OPENAI_TIMEOUT_SECONDS", 60))
+OPENAI_MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", 2))
+
+# Shared by every provider instance so the process as a whole stays under the cap
+_openai_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+
+
+def create_async_openai_client(api_key: str) -> AsyncOpenAI:
+    """Create an AsyncOpenAI client with the configured timeout and retries."""
+    return AsyncOpenAI(
+        api_key=api_key,
+        timeout=OPENAI_TIMEOUT_SECONDS,
+        max_retries=OPENAI_MAX_RETRIES
+    )
+
+
+class OpenAIProvider(LLMProvider):
+    """Chat completions through the OpenAI API.
+    
+    Calls never block the event loop, and at most OPENAI_MAX_CONCURRENCY
+    requests are in flight per process; further calls wait their turn.
+    """
+
+    name = "openai"
+
+    def __init__(self, api_key: str):
+        self.client = create_async_openai_client(api_key)
+
+    async def complete(self, messages, model, temperature=0.7, max_tokens=500) -> str:
+        async with _openai_semaphore:
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        return response.choices[0].message.content
+
+    async def stream(self, messages, model, temperature=0.7, max_tokens=500) -> AsyncIterator[str]:
+        # The slot is held until the stream finishes, since the connection stays busy
+        async with _openai_semaphore:
+            chunks = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            async for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+
+# ============================================================================
+# OFFLINE PROVIDERS
+# ============================================================================
+
+class MockLLMProvider(LLMProvider):
+    """Deterministic offline provider for load testing.
+
+    Latency is drawn per call from the configured distribution, tokens are emitted
+    at a fixed rate, and a fraction of calls fail with an injected error. All
+    randomness comes from a seeded generator so runs are reproducible.
+    """
+
+    name = "mock"
+
+    LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+    ERROR_KINDS = ("timeout", "rate_limit", "server_error")
+
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        latency_jitter_ms: float = 50.0,
+        latency_distribution: str = "normal",
+        tokens_per_second: float = 0.0,
+        response_tokens: int = 120,
+        error_rate: float = 0.0,
+        seed: Optional[int] = 42,
+    ):
+        if latency_distribution not in self.LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency_distribution}")
+
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.latency_distribution = latency_distribution
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def from_env(cls, **overrides) -> "MockLLMProvider":
+        """Build a provider from MOCK_LLM_* environment variables."""
+        seed = os.environ.get("MOCK_LLM_SEED", "42")
+        config = {
+            "latency_ms": float(os.environ.get("MOCK_LLM_LATENCY_MS", 200)),
+            "latency_jitter_ms": float(os.environ.get("MOCK_LLM_LATENCY_JITTER_MS", 50)),
+            "latency_distribution": os.environ.get("MOCK_LLM_LATENCY_DISTRIBUTION", "normal"),
+            "tokens_per_second": float(os.environ.get("MOCK_LLM_TOKENS_PER_SECOND", 0)),
+            "response_tokens": int(os.environ.get("MOCK_LLM_RESPONSE_TOKENS", 120)),
+            "error_rate": float(os.environ.get("MOCK_LLM_ERROR_RATE", 0)),
+            "seed": int(seed) if seed else None,
+        }
+        config.update(overrides)
+        return cls(**config)
+
+    def _sample_latency(self) -> float:
+        """Draw time-to-first-token latency in seconds."""
+        mean = self.latency_ms
+        jitter = self.latency_jitter_ms
+
+        if self.latency_distribution == "fixed":
+            value = mean
+        elif self.latency_distribution == "uniform":
+            value = self._rng.uniform(mean - jitter, mean + jitter)
+        elif self.latency_distribution == "normal":
+            value = self._rng.gauss(mean, jitter)
+        elif self.latency_distribution == "lognormal":
+            # Parameterised so the distribution mean matches latency_ms
+            sigma = jitter / mean if mean > 0 else 0.0
+            value = mean * self._rng.lognormvariate(-(sigma ** 2) / 2, sigma)
+        else:
+            value = self._rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+
+        return max(value, 0.0) / 1000.0
+
+    def _maybe_fail(self):
+        """Raise an injected error with probability error_rate."""
+        if self.error_rate <= 0:
+            return
+        triggered = self._rng.random() < self.error_rate
+        kind = self._rng.choice(self.ERROR_KINDS)
+        if triggered:
+            raise MockLLMError(kind, f"Injected mock LLM error: {kind}")
+
+    def _render_response(self, messages: List[Dict[str, str]], model: str) -> str:
+        """Build a deterministic response for the given prompt."""
+        prompt = messages[-1]["content"] if messages else ""
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+        words = [f"token{i}" for i in range(max(self.response_tokens - 4, 0))]
+        return f"[mock:{model}:{digest}] " + " ".join(words)
+
+    async def complete(self, messages, model, temperature=0.7, max_tokens=500) -> str:
+        return "".join([delta async for delta in self.stream(messages, model, temperature, max_tokens)])
+
+    async def stream(self, messages, model, temperature=0.7, max_tokens=500) -> AsyncIterator[str]:
+        await asyncio.sleep(self._sample_latency())
+        self._maybe_fail()
+
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for i, word in enumerate(self._render_response(messages, model).split(" ")):
+            if delay:
+                await asyncio.sleep(delay)
+            yield word if i == 0 else f" {word}"
+
+
+class ReplayLLMProvider(MockLLMProvider):
+    """Replays recorded responses from a JSONL file.
+
+    Each line holds {"prompt": ..., "response": ...}. Prompts are matched by hash;
+    unmatched prompts cycle through the recorded responses in order. Latency and
+    error injection behave exactly like MockLLMProvider.
+    """
+
+    name = "replay"
+
+    def __init__(self, replay_file: str, **kwargs):
+        super().__init__(**kwargs)
+        self.replay_file = replay_file
+        self._by_prompt: Dict[str, str] = {}
+        self._responses: List[str] = []
+        self._cursor = 0
+
+        with open(replay_file, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self._responses.append(record["response"])
+                if record.get("prompt"):
+                    self._by_prompt[self._prompt_key(record["prompt"])] = record["response"]
+
+        if not self._responses:
+            raise ValueError(f"Replay file has no recorded responses: {replay_file}")
+
+    @staticmethod
+    def _prompt_key(prompt: str) -> str:
+        return hashlib.sha256(prompt.strip().encode()).hexdigest()
+
+    def _render_response(self, messages: List[Dict[str, str]], model: str) -> str:
+        prompt = messages[-1]["content"] if messages else ""
+        recorded = self._by_prompt.get(self._prompt_key(prompt))
+        if recorded is not None:
+            return recorded
+        response = self._responses[self._cursor % len(self._responses)]
+        self._cursor += 1
+        return response
+
+
+# ============================================================================
+# FACTORY
+# ============================================================================
+
+def get_llm_provider(api_key: str = None) -> LLMProvider:
+    """Create the provider selected by LLM_PROVIDER.
+
+    Args:
+        api_key: OpenAI API key (if None, uses default from secrets)
+
+    Returns:
+        LLMProvider instance
+    """
+    provider_name = os.environ.get("LLM_PROVIDER", "openai").lower()
+
+    if provider_name == "mock":
+        return MockLLMProvider.from_env()
+    if provider_name == "replay":
+        replay_file = os.environ.get("MOCK_LLM_REPLAY_FILE")
+        if not replay_file:
+            raise ValueError("MOCK_LLM_REPLAY_FILE must be set when LLM_PROVIDER=replay")
+        return ReplayLLMProvider.from_env(replay_file=replay_file)
+    if provider_name != "openai":
+        raise ValueError(f"Unknown LLM_PROVIDER: {provider_name}")
+
+    return OpenAIProvider(api_key=api_key or db.secrets.get("OPENAI_API_KEY"))
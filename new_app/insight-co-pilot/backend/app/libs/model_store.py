@@ -0,0 +1,370 @@
+"""Trained forecast model store for ModelTrainerAgent.
+
+Fitting Prophet costs seconds of CPU, so fitted models are kept and reused
+while the series they were trained on is unchanged. A series is one
+(lob_id, metric_name) pair. Its fingerprint is the row count, the latest
+week_date and an md5 checksum over every (week_date, metric_value). All three
+are computed in SQL, so checking for a cache hit does not transfer the series.
+
+- Fingerprint unchanged: the stored forecast is returned. If a new horizon
+  is requested, the stored model predicts without refitting.
+- Fingerprint changed (new weeks, corrected values): the model is refit,
+  warm-started from the previous model's parameters so Stan converges in
+  fewer iterations.
+
+Models are serialized with Prophet's JSON serializer. The newest model of
+each series is kept in an in-memory LRU of MODEL_CACHE_SIZE entries (default
+32), backed by the forecast_models table (MODEL_STORE=postgres, the default,
+created by migrations/004_forecast_models.sql) or by memory alone
+(MODEL_STORE=memory). Fits run on the training service's worker processes;
+train_prophet and predict_from_json are plain functions so they can be sent
+there.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+from prophet.serialize import model_from_json, model_to_json
+
+from app.libs.database import acquire
+from app.libs.training_service import get_training_service
+
+MODEL_CACHE_SIZE = int(os.environ.get("MODEL_CACHE_SIZE", 32))
+
+# Shortest series Prophet is fitted on
+MIN_TRAINING_SAMPLES = 10
+
+FINGERPRINT_QUERY = """
+    SELECT COUNT(*) AS row_count,
+           MAX(week_date) AS last_week,
+           md5(string_agg(week_date::text || '=' || metric_value::text, ',' ORDER BY week_date, metric_name, id)) AS checksum
+    FROM weekly_metrics
+    WHERE lob_id = $1 AND metric_name = $2
+"""
+
+SERIES_QUERY = """
+    SELECT week_date as ds, metric_value as y
+    FROM weekly_metrics
+    WHERE lob_id = $1 AND metric_name = $2
+    ORDER BY week_date, metric_name, id
+"""
+
+METRICS_QUERY = """
+    SELECT DISTINCT metric_name
+    FROM weekly_metrics
+    WHERE lob_id = $1
+    ORDER BY metric_name
+"""
+
+
+# ============================================================================
+# FITTING
+# ============================================================================
+
+def warm_start_params(model: Prophet) -> Dict[str, Any]:
+    """Initial Stan parameters taken from a fitted model (per the Prophet docs)."""
+    params = {}
+    for name in ("k", "m", "sigma_obs"):
+        params[name] = model.params[name][0][0] if model.mcmc_samples == 0 else np.mean(model.params[name])
+    for name in ("delta", "beta"):
+        params[name] = model.params[name][0] if model.mcmc_samples == 0 else np.mean(model.params[name], axis=0)
+    return params
+
+
+def new_prophet() -> Prophet:
+    return Prophet(
+        yearly_seasonality=True,
+        weekly_seasonality=False,
+        daily_seasonality=False
+    )
+
+
+def predict(model: Prophet, periods: int) -> List[Dict[str, Any]]:
+    """Forecast the next periods weeks as JSON-ready records."""
+    future = model.make_future_dataframe(periods=periods, freq='W')
+    forecast = model.predict(future)
+    records = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(periods)
+    return [
+        {
+            "ds": row.ds.strftime("%Y-%m-%d"),
+            "yhat": float(row.yhat),
+            "yhat_lower": float(row.yhat_lower),
+            "yhat_upper": float(row.yhat_upper),
+        }
+        for row in records.itertuples(index=False)
+    ]
+
+
+def train_prophet(
+    series: Sequence[Tuple[Any, float]],
+    periods: int,
+    warm_model_json: Optional[str] = None
+) -> Dict[str, Any]:
+    """Fit Prophet on (ds, y) pairs and forecast periods weeks ahead.
+
+    Args:
+        series: (week_date, value) pairs in date order
+        periods: Weeks to forecast
+        warm_model_json: Serialized previous model of the same series to warm-start from
+
+    Returns:
+        dict with model_json, predictions and warm_started
+    """
+    df = pd.DataFrame(series, columns=["ds", "y"])
+    df["ds"] = pd.to_datetime(df["ds"])
+    df["y"] = df["y"].astype(float)
+
+    model = None
+    warm_started = False
+    if warm_model_json:
+        try:
+            model = new_prophet().fit(df, init=warm_start_params(model_from_json(warm_model_json)))
+            warm_started = True
+        except Exception as e:
+            # Parameter shapes change when the changepoint count does; refit cold
+            print(f"[Model Store] Warm start failed, fitting from scratch: {e}")
+            model = None
+
+    if model is None:
+        model = new_prophet().fit(df)
+
+    return {
+        "model_json": model_to_json(model),
+        "predictions": predict(model, periods),
+        "warm_started": warm_started,
+    }
+
+
+def predict_from_json(model_json: str, periods: int) -> List[Dict[str, Any]]:
+    """Forecast from a serialized model without refitting."""
+    return predict(model_from_json(model_json), periods)
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+async def series_fingerprint(conn, lob_id: Any, metric_name: str) -> Tuple[int, Optional[str]]:
+    """Row count and fingerprint of a series; the fingerprint is None when empty."""
+    row = await conn.fetchrow(FINGERPRINT_QUERY, lob_id, metric_name)
+    if not row or not row['row_count']:
+        return 0, None
+    return row['row_count'], f"{row['last_week']}:{row['row_count']}:{row['checksum']}"
+
+
+async def fetch_series(conn, lob_id: Any, metric_name: str) -> List[Tuple[Any, float]]:
+    rows = await conn.fetch(SERIES_QUERY, lob_id, metric_name)
+    return [(row['ds'], float(row['y'])) for row in rows]
+
+
+async def read_series(conn, lob_id: Any, metric_name: str) -> Tuple[Optional[str], List[Tuple[Any, float]]]:
+    """Fingerprint and data of a series, read from one snapshot.
+
+    Anything cached under the fingerprint is derived from exactly this data,
+    even while weekly_metrics is being written.
+    """
+    async with conn.transaction(isolation="repeatable_read", readonly=True):
+        _, fingerprint = await series_fingerprint(conn, lob_id, metric_name)
+        series = await fetch_series(conn, lob_id, metric_name)
+    return fingerprint, series
+
+
+async def resolve_metric(lob_id: Any, metric_name: Optional[str]) -> Dict[str, Any]:
+    """The metric_name of a series request that may have omitted it.
+
+    Metrics of a LOB are separate series, so an omitted metric resolves only
+    when the LOB has exactly one.
+
+    Returns:
+        {"metric_name": ...} or {"error": ...}
+    """
+    if metric_name:
+        return {"metric_name": metric_name}
+    async with acquire() as conn:
+        rows = await conn.fetch(METRICS_QUERY, lob_id)
+    metrics = [row['metric_name'] for row in rows]
+    if len(metrics) == 1:
+        return {"metric_name": metrics[0]}
+    if not metrics:
+        return {"error": f"No weekly metrics found for LOB {lob_id}"}
+    return {"error": f"metric_name is required; LOB {lob_id} has metrics {', '.join(metrics)}"}
+
+
+class ModelStore:
+    """Newest fitted model per series: in-memory LRU over an optional Postgres table."""
+
+    def __init__(self, max_size: int = MODEL_CACHE_SIZE, persist: bool = True):
+        self.max_size = max_size
+        self.persist = persist
+        self._models: "OrderedDict[Tuple[int, str], Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def series_key(lob_id: Any, metric_name: str) -> Tuple[int, str]:
+        return int(lob_id), metric_name
+
+    def _remember(self, key: Tuple[int, str], entry: Dict[str, Any]):
+        self._models[key] = entry
+        self._models.move_to_end(key)
+        while len(self._models) > self.max_size:
+            self._models.popitem(last=False)
+
+    async def get(self, lob_id: Any, metric_name: str) -> Optional[Dict[str, Any]]:
+        """Newest stored model of a series, whatever data it was trained on."""
+        key = self.series_key(lob_id, metric_name)
+        entry = self._models.get(key)
+        if entry is not None:
+            self._models.move_to_end(key)
+            return entry
+        if not self.persist:
+            return None
+
+        async with acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT fingerprint, row_count, model_json, predictions
+                FROM forecast_models WHERE lob_id = $1 AND metric_name = $2
+                """,
+                *key
+            )
+        if not row:
+            return None
+
+        entry = {
+            "fingerprint": row['fingerprint'],
+            "row_count": row['row_count'],
+            "model_json": row['model_json'],
+            "predictions": json.loads(row['predictions']),
+        }
+        self._remember(key, entry)
+        return entry
+
+    async def put(self, lob_id: Any, metric_name: str, entry: Dict[str, Any]):
+        """Store a series' model, replacing the previous one."""
+        key = self.series_key(lob_id, metric_name)
+        self._remember(key, entry)
+        if not self.persist:
+            return
+
+        async with acquire() as conn:
+            await conn.execute(
+                """
+                INSERT INTO forecast_models (lob_id, metric_name, fingerprint, row_count, model_json, predictions)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                ON CONFLICT (lob_id, metric_name) DO UPDATE
+                SET fingerprint = EXCLUDED.fingerprint,
+                    row_count = EXCLUDED.row_count,
+                    model_json = EXCLUDED.model_json,
+                    predictions = EXCLUDED.predictions,
+                    trained_at = NOW()
+                """,
+                *key, entry["fingerprint"], entry["row_count"], entry["model_json"],
+                json.dumps(entry["predictions"])
+            )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._models),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_store: Optional[ModelStore] = None
+
+
+def get_model_store() -> ModelStore:
+    """Shared store configured by MODEL_STORE (postgres | memory)."""
+    global _store
+    if _store is None:
+        backend = os.environ.get("MODEL_STORE", "postgres").lower()
+        if backend not in ("postgres", "memory"):
+            raise ValueError(f"Unknown MODEL_STORE: {backend}")
+        _store = ModelStore(persist=backend == "postgres")
+    return _store
+
+
+async def forecast_series(
+    lob_id: Any,
+    metric_name: str,
+    periods: int,
+    wait: bool = True
+) -> Dict[str, Any]:
+    """Forecast a series, reusing or warm-starting its stored model.
+
+    Fitting and prediction run on the training service's worker processes.
+
+    Args:
+        lob_id: LOB of the series
+        metric_name: Metric of the series
+        periods: Weeks to forecast
+        wait: When False and the model must be trained, return the queued
+            training job instead of waiting for it
+
+    Returns:
+        dict with training_samples, predictions and cache (hit, predicted,
+        warm_start or trained); {"job": TrainingJob} when not waiting; or
+        {"error": ...} when the series is too short
+
+    Raises:
+        TrainingQueueFull: if the training queue is at capacity
+        TrainingJobError: if the training job fails or times out
+    """
+    store = get_model_store()
+    service = get_training_service()
+    async with acquire() as conn:
+        row_count, fingerprint = await series_fingerprint(conn, lob_id, metric_name)
+    if row_count < MIN_TRAINING_SAMPLES:
+        return {"error": f"Insufficient data for training (need at least {MIN_TRAINING_SAMPLES} data points)"}
+
+    stored = await store.get(lob_id, metric_name)
+    if stored is not None and stored["fingerprint"] == fingerprint:
+        store.hits += 1
+        predictions = stored["predictions"].get(str(periods))
+        status = "hit"
+        if predictions is None:
+            predictions = await service.run(
+                predict_from_json, stored["model_json"], periods,
+                label=f"predict lob {lob_id} {metric_name}"
+            )
+            stored["predictions"][str(periods)] = predictions
+            await store.put(lob_id, metric_name, stored)
+            status = "predicted"
+        return {"training_samples": row_count, "predictions": predictions, "cache": status}
+
+    store.misses += 1
+    async with acquire() as conn:
+        fingerprint, series = await read_series(conn, lob_id, metric_name)
+    if len(series) < MIN_TRAINING_SAMPLES:
+        return {"error": f"Insufficient data for training (need at least {MIN_TRAINING_SAMPLES} data points)"}
+
+    async def store_trained(trained: Dict[str, Any]) -> Dict[str, Any]:
+        await store.put(lob_id, metric_name, {
+            "fingerprint": fingerprint,
+            "row_count": len(series),
+            "model_json": trained["model_json"],
+            "predictions": {str(periods): trained["predictions"]},
+        })
+        return {
+            "training_samples": len(series),
+            "predictions": trained["predictions"],
+            "cache": "warm_start" if trained["warm_started"] else "trained",
+        }
+
+    job = service.submit(
+        train_prophet, series, periods, stored["model_json"] if stored else None,
+        label=f"train lob {lob_id} {metric_name}",
+        after=store_trained
+    )
+    if not wait:
+        return {"job": job}
+    return await job.wait()
@@ -0,0 +1,193 @@
+"""Multi-agent query planning and concurrent plan execution.
+
+A query such as "compare Phone vs Chat and forecast next quarter" asks for
+several agents. build_plan splits the query into clauses, classifies each one
+and emits a small DAG of steps:
+
+    [{"id": "s1", "agent": "comparison_analyzer", "params": {...}, "depends_on": []},
+     {"id": "s2", "agent": "model_trainer", "params": {...}, "depends_on": []}]
+
+Entities resolved from the query fill in step parameters (lob_id,
+dataset_id), and a forecast over several named LOBs fans out to one step per
+LOB. A visualizer step depends on the data-producing steps before it and
+charts their rows. execute_plan runs the DAG in waves: every step whose
+dependencies have finished runs concurrently under a semaphore, so
+independent agents overlap their database and model work instead of
+queueing behind each other.
+
+Configuration (environment variables):
+    PLAN_MAX_STEPS: most agent invocations in one plan (default 4)
+    PLAN_MAX_CONCURRENCY: steps executed at once (default 4)
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import os
+import re
+
+from app.libs.entity_resolver import apply_entities
+from app.libs.intent_classifier import classify_intent
+
+PLAN_MAX_STEPS = int(os.environ.get("PLAN_MAX_STEPS", 4))
+PLAN_MAX_CONCURRENCY = int(os.environ.get("PLAN_MAX_CONCURRENCY", 4))
+
+# Conjunctions that usually start a separate request within one query
+_CLAUSE_SPLIT = re.compile(r"\s*(?:[;?!]|\.(?=\s|$)|,?\s*\b(?:and then|then|and also|also|plus)\b)\s*", re.IGNORECASE)
+
+# A bare "and" as often joins two names ("Phone and Chat") as two requests
+_AND_SPLIT = re.compile(r"\s*,?\s*\band\b\s*", re.IGNORECASE)
+
+# "between X" or "compare X" still waiting for the "and Y" that completes it
+_PENDING_PARTNER = re.compile(
+    r"\b(?:between|compare|comparing)\b(?!.*\b(?:vs\.?|versus|with|to|against|and)\b)",
+    re.IGNORECASE
+)
+
+# Result keys holding row arrays a chart can be drawn from
+CHARTABLE_KEYS = ("data", "predictions", "projections", "metrics")
+
+
+# ============================================================================
+# PLANNING
+# ============================================================================
+
+def split_clauses(query: str) -> List[str]:
+    """Split a query into the requests it makes.
+
+    A bare "and" only starts a new clause when the text after it matches an
+    intent rule on its own and does not complete a "between X and Y" or
+    "compare X and Y" phrase.
+    """
+    clauses = []
+    for piece in _CLAUSE_SPLIT.split(query):
+        if not piece.strip():
+            continue
+        parts = _AND_SPLIT.split(piece)
+        clause = parts[0]
+        for part in parts[1:]:
+            if (
+                clause.strip()
+                and part.strip()
+                and not _PENDING_PARTNER.search(clause)
+                and classify_intent(part)["method"] == "rules"
+            ):
+                clauses.append(clause)
+                clause = part
+            else:
+                clause = f"{clause} and {part}" if clause.strip() else part
+        clauses.append(clause)
+    return [clause for clause in clauses if clause.strip()]
+
+
+def build_plan(
+    query: str,
+    primary: Dict[str, Any],
+    entities: Optional[Dict[str, List[Dict[str, Any]]]] = None
+) -> List[Dict[str, Any]]:
+    """Build the step DAG for a query.
+
+    Args:
+        query: The user's query
+        primary: classify_intent result for the whole query
+        entities: resolve_entities result for the query, if available
+
+    Returns:
+        Plan steps in execution order; empty when no agent applies
+    """
+    steps = []
+    seen = set()
+    for clause in split_clauses(query):
+        intent = classify_intent(clause)
+        # Keyword-free clauses are too short to trust the similarity fallback
+        if intent["method"] != "rules" or intent["agent"] in seen:
+            continue
+        seen.add(intent["agent"])
+        steps.append({"agent": intent["agent"], "params": intent["params"]})
+
+    if len(steps) < 2:
+        if primary["agent"] == "none":
+            return []
+        steps = [{"agent": primary["agent"], "params": primary["params"]}]
+
+    if entities:
+        steps = [
+            {"agent": step["agent"], "params": params}
+            for step in steps
+            for params in apply_entities(step["agent"], step["params"], entities)
+        ]
+
+    steps = steps[:PLAN_MAX_STEPS]
+    producers = []
+    for index, step in enumerate(steps):
+        step["id"] = f"s{index + 1}"
+        step["depends_on"] = list(producers) if step["agent"] == "visualizer" else []
+        if step["agent"] != "visualizer":
+            producers.append(step["id"])
+    return steps
+
+
+def chart_rows(result: Dict[str, Any]) -> List[dict]:
+    """Rows from a step result that a visualizer step can plot."""
+    for key in CHARTABLE_KEYS:
+        rows = result.get(key)
+        if isinstance(rows, list) and rows and isinstance(rows[0], dict) and len(rows[0]) >= 2:
+            return rows
+    return []
+
+
+def step_params(step: Dict[str, Any], results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Parameters for a step, including data from the steps it depends on."""
+    params = dict(step["params"])
+    if step["agent"] == "visualizer" and not params.get("data"):
+        for dependency in step["depends_on"]:
+            rows = chart_rows(results.get(dependency) or {})
+            if rows:
+                params["data"] = rows
+                break
+    return params
+
+
+# ============================================================================
+# EXECUTION
+# ============================================================================
+
+async def execute_plan(
+    plan: List[Dict[str, Any]],
+    run_step: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+    max_concurrency: int = PLAN_MAX_CONCURRENCY
+) -> Dict[str, Dict[str, Any]]:
+    """Execute a plan, running independent steps concurrently.
+
+    Args:
+        plan: Steps from build_plan
+        run_step: Coroutine taking (agent_name, params) and returning the agent result
+        max_concurrency: Most steps in flight at once
+
+    Returns:
+        Step id -> agent result. A step that raised maps to {"error": ...}.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = list(plan)
+
+    async def run(step):
+        async with semaphore:
+            try:
+                return await run_step(step["agent"], step_params(step, results))
+            except Exception as e:
+                return {"error": f"Agent execution failed: {str(e)}"}
+
+    while pending:
+        ready = [step for step in pending if all(dep in results for dep in step["depends_on"])]
+        if not ready:
+            # Unsatisfiable dependencies; fail the rest rather than loop
+            for step in pending:
+                results[step["id"]] = {"error": "Plan step dependencies could not be resolved"}
+            break
+
+        outcomes = await asyncio.gather(*(run(step) for step in ready))
+        for step, outcome in zip(ready, outcomes):
+            results[step["id"]] = outcome if isinstance(outcome, dict) else {"result": outcome}
+        pending = [step for step in pending if step["id"] not in results]
+
+    return results
@@ -0,0 +1,258 @@
+"""Template responses for agents with deterministic, tabular results.
+
+Listings from DataFetcher and CRUDManager, ScenarioModeler arithmetic and
+backtest scores from ModelEvaluator and ModelSelector are fully described by
+their JSON output, so paraphrasing them through the LLM adds seconds of
+latency and token spend without adding information. The
+workflow renders these results as markdown directly and only calls the LLM
+when a query asks for a polished answer, in which case the rendered text is
+the draft the model rewrites.
+
+Set RESPONSE_TEMPLATES_ENABLED=false to send every result through the LLM.
+"""
+
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+import os
+
+RESPONSE_TEMPLATES_ENABLED = os.environ.get("RESPONSE_TEMPLATES_ENABLED", "true").lower() == "true"
+
+# Longer listings are cut off with a note pointing at the full count
+MAX_TABLE_ROWS = 25
+
+
+# ============================================================================
+# FORMATTING
+# ============================================================================
+
+def format_cell(value: Any) -> str:
+    """Render one value for a markdown table cell."""
+    if value is None or value == "":
+        return "-"
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    if isinstance(value, int):
+        return f"{value:,}"
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def markdown_table(rows: Sequence[dict], columns: Sequence[Tuple[str, str]]) -> str:
+    """Render rows as a markdown table.
+
+    Args:
+        rows: Result records
+        columns: (key, heading) pairs; keys missing from every row are skipped
+    """
+    columns = [(key, heading) for key, heading in columns if any(key in row for row in rows)]
+    lines = [
+        "| " + " | ".join(heading for _, heading in columns) + " |",
+        "|" + "|".join("---" for _ in columns) + "|",
+    ]
+    for row in rows[:MAX_TABLE_ROWS]:
+        lines.append("| " + " | ".join(format_cell(row.get(key)) for key, _ in columns) + " |")
+    if len(rows) > MAX_TABLE_ROWS:
+        lines.append(f"\n_Showing {MAX_TABLE_ROWS} of {len(rows)}._")
+    return "\n".join(lines)
+
+
+def insights_block(result: Dict[str, Any]) -> str:
+    insights = result.get("insights") or []
+    return "\n".join(f"- {insight}" for insight in insights)
+
+
+def join_sections(*sections: str) -> str:
+    return "\n\n".join(section for section in sections if section)
+
+
+# ============================================================================
+# TEMPLATES
+# ============================================================================
+
+def render_datasets(result: Dict[str, Any]) -> Optional[str]:
+    datasets = result.get("datasets") or []
+    if not datasets:
+        return "No datasets have been uploaded yet. Upload a CSV or Excel file to get started."
+    return join_sections(
+        f"There {'is' if len(datasets) == 1 else 'are'} {len(datasets)} dataset{'' if len(datasets) == 1 else 's'} available:",
+        markdown_table(datasets, [
+            ("name", "Name"), ("id", "ID"), ("row_count", "Rows"),
+            ("column_count", "Columns"), ("uploaded_at", "Uploaded"),
+        ])
+    )
+
+
+def render_metrics(result: Dict[str, Any]) -> Optional[str]:
+    metrics = result.get("metrics") or []
+    if not metrics:
+        return "No weekly metrics have been recorded yet."
+    return join_sections(
+        f"Here are the {len(metrics)} most recent weekly metric records:",
+        markdown_table(metrics, [
+            ("week_date", "Week"), ("lob_id", "LOB ID"),
+            ("metric_name", "Metric"), ("metric_value", "Value"),
+        ])
+    )
+
+
+def render_business_structure(result: Dict[str, Any]) -> Optional[str]:
+    business_units = result.get("business_units") or []
+    lobs = result.get("lobs") or []
+    if not business_units:
+        return "No business units have been created yet."
+
+    lines = []
+    for bu in business_units:
+        lines.append(f"- **{bu['name']}** (ID: {bu['id']})")
+        for lob in lobs:
+            if lob.get("business_unit_id") == bu["id"]:
+                lines.append(f"  - {lob['name']} (ID: {lob['id']})")
+    return join_sections(
+        f"There are {len(business_units)} business units and {len(lobs)} lines of business:",
+        "\n".join(lines)
+    )
+
+
+def render_fetcher(result: Dict[str, Any]) -> Optional[str]:
+    renderer = {
+        "datasets": render_datasets,
+        "metrics": render_metrics,
+        "business_structure": render_business_structure,
+    }.get(result.get("data_type"))
+    return renderer(result) if renderer else None
+
+
+def render_crud(result: Dict[str, Any]) -> Optional[str]:
+    if "entities" in result:
+        entities = result["entities"]
+        if not entities:
+            return "There are no entries of that type yet."
+        return join_sections(
+            f"Found {len(entities)} entr{'y' if len(entities) == 1 else 'ies'}:",
+            markdown_table(entities, [
+                ("name", "Name"), ("id", "ID"), ("description", "Description"),
+                ("business_unit_id", "Business Unit ID"), ("created_at", "Created"),
+            ])
+        )
+    if "created" in result:
+        created = result["created"]
+        return f"Created **{created.get('name')}** (ID: {created.get('id')})."
+    if "entity" in result:
+        entity = result["entity"]
+        lines = [f"- **{key}**: {format_cell(value)}" for key, value in entity.items()]
+        return "\n".join(lines)
+    return None
+
+
+def render_scenario(result: Dict[str, Any]) -> Optional[str]:
+    if result.get("scenario_type") == "growth_projection" and result.get("grid"):
+        return join_sections(
+            "Projected values for each baseline, growth rate and horizon:",
+            markdown_table(result["grid"], [
+                ("baseline", "Baseline"), ("growth_rate", "Growth Rate"),
+                ("horizon", "Periods"), ("projected_value", "Projected Value"),
+            ]),
+            insights_block(result)
+        )
+    if result.get("scenario_type") == "growth_projection":
+        return join_sections(
+            f"Projection from a baseline of {format_cell(result.get('baseline'))} "
+            f"at {result.get('growth_rate', 0) * 100:g}% growth per period:",
+            markdown_table(result.get("projections") or [], [
+                ("period", "Period"), ("projected_value", "Projected Value"),
+            ]),
+            insights_block(result)
+        )
+    if result.get("scenario_type") == "sensitivity_analysis":
+        results = result.get("results") or []
+        several = len({row.get("baseline") for row in results}) > 1
+        return join_sections(
+            "Sensitivity of each baseline:" if several else f"Sensitivity of a baseline of {format_cell(result.get('baseline'))}:",
+            markdown_table(results, [
+                *([("baseline", "Baseline")] if several else []),
+                ("change_percent", "Change %"), ("resulting_value", "Resulting Value"), ("impact", "Impact"),
+            ]),
+            insights_block(result)
+        )
+    if result.get("scenario_type") == "monte_carlo":
+        return join_sections(
+            f"Monte Carlo simulation of {format_cell(result.get('paths'))} paths from a baseline of "
+            f"{format_cell(result.get('baseline'))}, with percentile bands per period:",
+            markdown_table(result.get("projections") or [], [
+                ("period", "Period"), ("p5", "5th"), ("p25", "25th"), ("p50", "Median"),
+                ("p75", "75th"), ("p95", "95th"),
+            ]),
+            insights_block(result)
+        )
+    return None
+
+
+def backtest_table(backtest: Dict[str, Any]) -> str:
+    return join_sections(
+        markdown_table(backtest["models"], [
+            ("model_type", "Model"), ("mae", "MAE"), ("rmse", "RMSE"),
+            ("mape", "MAPE %"), ("smape", "sMAPE %"),
+        ]),
+        "\n".join(f"- {model} could not be backtested: {error}" for model, error in backtest.get("failed", {}).items())
+    )
+
+
+def render_backtest(result: Dict[str, Any]) -> Optional[str]:
+    backtest = result.get("backtest")
+    if not backtest:
+        return None
+    series = result.get("lob_name") or f"LOB {backtest['lob_id']}"
+    if backtest.get("metric_name"):
+        series += f" ({backtest['metric_name']})"
+    return join_sections(
+        f"Backtest of {series} over {backtest['folds']} rolling origins, "
+        f"forecasting {backtest['horizon']} weeks from each. "
+        f"**{backtest['winner']}** had the lowest {backtest['metric'].upper()}:",
+        backtest_table(backtest)
+    )
+
+
+def render_selection(result: Dict[str, Any]) -> Optional[str]:
+    if not result.get("features"):
+        return None
+    backtest = result.get("backtest")
+    return join_sections(
+        f"Recommended model: **{result['recommended_model']}**.",
+        insights_block(result),
+        f"Backtest over {backtest['folds']} rolling origins of {backtest['horizon']} weeks:" if backtest else "",
+        backtest_table(backtest) if backtest else ""
+    )
+
+
+TEMPLATES: Dict[str, Callable[[Dict[str, Any]], Optional[str]]] = {
+    "data_fetcher": render_fetcher,
+    "crud_manager": render_crud,
+    "scenario_modeler": render_scenario,
+    "model_evaluator": render_backtest,
+    "model_selector": render_selection,
+}
+
+
+def render_response(agent_name: str, result: Any) -> Optional[str]:
+    """Render an agent result without the LLM.
+
+    Returns:
+        Markdown response, or None when the agent or result shape has no
+        template and the LLM should answer instead
+    """
+    if not RESPONSE_TEMPLATES_ENABLED or not isinstance(result, dict):
+        return None
+    template = TEMPLATES.get(agent_name)
+    if template is None:
+        return None
+    try:
+        return template(result)
+    except (KeyError, TypeError, ValueError) as e:
+        # An unexpected result shape falls back to the LLM rather than failing the turn
+        print(f"[Response Template] {agent_name} template failed: {e}")
+        return None
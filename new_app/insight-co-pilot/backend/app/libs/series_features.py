@@ -0,0 +1,194 @@
+"""Series characteristics and data-driven forecasting model selection.
+
+ModelSelector used to choose from characteristics supplied by the caller,
+defaulting to 100 data points with a trend. compute_features measures a
+weekly_metrics series directly, with NumPy passes over the values:
+
+- length: weeks of history
+- trend_strength: R^2 of a least-squares linear trend (0 to 1)
+- seasonal_autocorrelation: lag-52 autocorrelation of the detrended series,
+  or None with fewer than two years of history
+- intermittency: share of weeks with a zero value
+- volatility: standard deviation of week-over-week changes relative to the
+  mean level
+
+Features are cached per series fingerprint. select_model uses them to pick
+candidate models, and to decide whether Prophet is worth fitting at all.
+When the series is long enough, it then backtests the NumPy candidates and
+only recommends Prophet when the best of them still misses by more than
+PROPHET_MIN_SMAPE percent. A series a naive model forecasts well never pays
+for a Prophet fit.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+import os
+
+import numpy as np
+
+from app.libs.backtesting import backtest_series
+from app.libs.database import acquire
+from app.libs.forecasters import MIN_SERIES_LENGTH, SEASON_LENGTH
+from app.libs.model_store import read_series, series_fingerprint
+
+FEATURE_CACHE_SIZE = int(os.environ.get("FEATURE_CACHE_SIZE", 512))
+
+# Backtest sMAPE (%) above which Prophet is considered over the NumPy models
+PROPHET_MIN_SMAPE = float(os.environ.get("PROPHET_MIN_SMAPE", 10))
+
+# Feature thresholds for candidate selection
+STRONG_TREND = 0.5
+STRONG_SEASONALITY = 0.3
+INTERMITTENT = 0.3
+VOLATILE = 0.5
+
+
+# ============================================================================
+# FEATURES
+# ============================================================================
+
+def compute_features(y: np.ndarray, season_length: int = SEASON_LENGTH) -> Dict[str, Any]:
+    """Measure length, trend, seasonality, intermittency and volatility of a series."""
+    n = len(y)
+    t = np.arange(n, dtype=float)
+    slope, intercept = np.polyfit(t, y, 1) if n > 1 else (0.0, float(y[0]))
+    residuals = y - (slope * t + intercept)
+
+    total = ((y - y.mean()) ** 2).sum()
+    trend_strength = 1 - (residuals ** 2).sum() / total if total > 0 else 0.0
+
+    seasonal = None
+    if n >= 2 * season_length:
+        energy = (residuals ** 2).sum()
+        if energy > 0:
+            seasonal = (residuals[season_length:] * residuals[:-season_length]).sum() / energy
+
+    level = np.abs(y).mean()
+    volatility = np.diff(y).std() / level if n > 2 and level > 0 else 0.0
+
+    return {
+        "length": n,
+        "trend_strength": round(float(max(0.0, trend_strength)), 4),
+        "trend_slope": round(float(slope), 4),
+        "seasonal_autocorrelation": None if seasonal is None else round(float(seasonal), 4),
+        "intermittency": round(float((y == 0).mean()), 4),
+        "volatility": round(float(volatility), 4),
+    }
+
+
+_features: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+
+
+async def series_features(lob_id: Any, metric_name: str) -> Dict[str, Any]:
+    """Features of one series, cached until its data changes.
+
+    Returns:
+        compute_features output plus fingerprint and cached, or {"error": ...}
+    """
+    async with acquire() as conn:
+        row_count, fingerprint = await series_fingerprint(conn, lob_id, metric_name)
+        if row_count < MIN_SERIES_LENGTH:
+            return {"error": f"Insufficient data for model selection (need at least {MIN_SERIES_LENGTH} data points)"}
+
+        key = (str(lob_id), metric_name, fingerprint)
+        features = _features.get(key)
+        if features is not None:
+            _features.move_to_end(key)
+            return {**features, "cached": True}
+
+        # The fingerprint may have moved on; key by the one read with the data
+        fingerprint, series = await read_series(conn, lob_id, metric_name)
+    if len(series) < MIN_SERIES_LENGTH:
+        return {"error": f"Insufficient data for model selection (need at least {MIN_SERIES_LENGTH} data points)"}
+
+    key = (str(lob_id), metric_name, fingerprint)
+    values = np.fromiter((value for _, value in series), dtype=float, count=len(series))
+    features = {**compute_features(values), "fingerprint": fingerprint}
+    _features[key] = features
+    while len(_features) > FEATURE_CACHE_SIZE:
+        _features.popitem(last=False)
+    return {**features, "cached": False}
+
+
+# ============================================================================
+# SELECTION
+# ============================================================================
+
+def candidate_models(features: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Models worth trying on a series, most suitable first, with reasons."""
+    seasonal = (features["seasonal_autocorrelation"] or 0.0) >= STRONG_SEASONALITY
+    trending = features["trend_strength"] >= STRONG_TREND
+
+    if features["intermittency"] >= INTERMITTENT:
+        return [
+            ("moving_average", f"{features['intermittency']:.0%} of weeks are zero; smoothing suits intermittent demand"),
+            ("seasonal_naive", "Naive baseline"),
+        ]
+
+    candidates = []
+    if seasonal:
+        candidates.append(("holt_winters", "Strong yearly seasonality with enough history to estimate it"))
+        candidates.append(("seasonal_naive", "Strong yearly seasonality; last year's value is a natural baseline"))
+    elif trending:
+        candidates.append(("holt_winters", "Clear trend without yearly seasonality; Holt's damped trend fits"))
+    if features["volatility"] >= VOLATILE:
+        candidates.append(("moving_average", "Volatile week-over-week changes; averaging damps the noise"))
+    if not candidates:
+        candidates.append(("moving_average", "Stable level without clear trend or seasonality"))
+        candidates.append(("holt_winters", "Exponential smoothing adapts if the level drifts"))
+    if not any(model == "seasonal_naive" for model, _ in candidates):
+        candidates.append(("seasonal_naive", "Naive baseline"))
+    if seasonal and trending:
+        candidates.append(("prophet", "Trend and yearly seasonality together may need Prophet's changepoints"))
+    return candidates
+
+
+async def select_model(lob_id: Any, metric_name: str) -> Dict[str, Any]:
+    """Recommend a forecasting model for one series from its own data.
+
+    Returns:
+        dict with model_type, reason, features, candidates and backtest
+        (None when the series is too short to backtest), or {"error": ...}
+    """
+    features = await series_features(lob_id, metric_name)
+    if "error" in features:
+        return features
+
+    candidates = candidate_models(features)
+    fast = [model for model, _ in candidates if model != "prophet"]
+    reasons = dict(candidates)
+
+    backtest = await backtest_series(lob_id, metric_name, fast)
+    if "error" in backtest:
+        # Too short to backtest: trust the features
+        model_type = candidates[0][0]
+        return {
+            "model_type": model_type,
+            "reason": reasons[model_type],
+            "features": features,
+            "candidates": [model for model, _ in candidates],
+            "backtest": None,
+        }
+
+    best = backtest["models"][0]
+    smape = best["smape"]
+    if "prophet" in reasons and (smape is None or smape > PROPHET_MIN_SMAPE):
+        model_type = "prophet"
+        reason = f"{reasons['prophet']}; the best fast model ({best['model_type']}) still had sMAPE {smape}%"
+    else:
+        model_type = best["model_type"]
+        reason = f"Lowest backtest {backtest['metric'].upper()} ({best[backtest['metric']]})"
+        if "prophet" in reasons:
+            reason += f"; accurate enough (sMAPE {smape}%) to skip a Prophet fit"
+
+    return {
+        "model_type": model_type,
+        "reason": reason,
+        "features": features,
+        "candidates": [model for model, _ in candidates],
+        "backtest": backtest,
+    }
+
+
+def feature_cache_stats() -> dict:
+    return {"size": len(_features), "max_size": FEATURE_CACHE_SIZE}
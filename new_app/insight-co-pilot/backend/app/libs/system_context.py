@@ -0,0 +1,197 @@
+"""Cached system context for the chat API.
+
+The context string describes the available business units, LOBs, datasets and
+metrics. It is rendered once and reused across chat messages until one of the
+following invalidates it:
+
+- a business_data or data_upload write endpoint in this process
+- a `system_context_changed` notification from Postgres, raised by the triggers
+  in migrations/001_system_context.sql for writes from any worker or client
+- SYSTEM_CONTEXT_TTL_SECONDS elapsing (default 300), as a safety net when the
+  migration has not been applied or the listener connection drops
+
+The weekly metrics count is read from the trigger-maintained table_row_counts
+table instead of running COUNT(*) over weekly_metrics.
+"""
+
+from typing import Optional
+import asyncio
+import asyncpg
+import json
+import os
+import time
+
+from app.libs.database import acquire, get_database_url
+
+NOTIFY_CHANNEL = "system_context_changed"
+
+EMPTY_CONTEXT = (
+    "No business units, LOBs, or datasets have been created yet. "
+    "The user should start by uploading data or creating business structures."
+)
+
+
+class SystemContextCache:
+    """Single-entry cache for the rendered context string."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.text: Optional[str] = None
+        self.built_at = 0.0
+        self.generation = 0
+        self.built_generation = -1
+        self.lock = asyncio.Lock()
+
+    def is_fresh(self) -> bool:
+        return (
+            self.text is not None
+            and self.built_generation == self.generation
+            and time.monotonic() - self.built_at < self.ttl_seconds
+        )
+
+    def invalidate(self):
+        self.generation += 1
+
+
+_cache = SystemContextCache(float(os.environ.get("SYSTEM_CONTEXT_TTL_SECONDS", 300)))
+_listener_conn: Optional[asyncpg.Connection] = None
+
+
+def invalidate_system_context(*_args):
+    """Mark the cached context stale. Also used as the NOTIFY callback."""
+    _cache.invalidate()
+
+
+def context_generation() -> int:
+    """Counter bumped on every invalidation, for caches derived from the same tables."""
+    return _cache.generation
+
+
+async def get_system_context() -> str:
+    """Return the cached context string, rebuilding it when stale."""
+    if _cache.is_fresh():
+        return _cache.text
+
+    async with _cache.lock:
+        # Another request may have rebuilt it while we waited
+        if _cache.is_fresh():
+            return _cache.text
+
+        generation = _cache.generation
+        text = await build_system_context()
+
+        # Keep the result marked stale if a write landed during the rebuild
+        _cache.text = text
+        _cache.built_at = time.monotonic()
+        _cache.built_generation = generation
+        return text
+
+
+async def count_weekly_metrics(conn: asyncpg.Connection) -> int:
+    """Read the maintained weekly_metrics row count."""
+    try:
+        count = await conn.fetchval(
+            "SELECT row_count FROM table_row_counts WHERE table_name = 'weekly_metrics'"
+        )
+    except asyncpg.UndefinedTableError:
+        print("table_row_counts missing; apply migrations/001_system_context.sql")
+        return await conn.fetchval("SELECT COUNT(*) FROM weekly_metrics")
+    return count or 0
+
+
+async def build_system_context() -> str:
+    """Query the database and render the context string."""
+    context_parts = []
+
+    async with acquire() as conn:
+        business_units = await conn.fetch(
+            "SELECT id, name, description FROM business_units ORDER BY name"
+        )
+        lobs = await conn.fetch(
+            """
+            SELECT l.id, l.name, l.business_unit_id, bu.name as bu_name
+            FROM lobs l
+            JOIN business_units bu ON l.business_unit_id = bu.id
+            ORDER BY l.name
+            """
+        )
+        datasets = await conn.fetch(
+            """
+            SELECT d.id, d.name, d.description, d.row_count, d.column_count,
+                   d.columns_info, d.uploaded_at,
+                   COALESCE(bu.name, l.name) as parent_name
+            FROM datasets d
+            LEFT JOIN business_units bu ON d.business_unit_id = bu.id
+            LEFT JOIN lobs l ON d.lob_id = l.id
+            ORDER BY d.uploaded_at DESC
+            LIMIT 10
+            """
+        )
+        metrics_count = await count_weekly_metrics(conn)
+
+    if business_units:
+        bu_list = [f"- {row['name']} (ID: {row['id']})" for row in business_units]
+        if business_units[0]['description']:
+            bu_list = [f"- {row['name']} (ID: {row['id']}, Description: {row['description']})" for row in business_units]
+        context_parts.append("Available Business Units:\n" + "\n".join(bu_list))
+
+    if lobs:
+        lob_list = [f"- {row['name']} (ID: {row['id']}, under {row['bu_name']})" for row in lobs]
+        context_parts.append("Available Lines of Business (LOBs):\n" + "\n".join(lob_list))
+
+    if datasets:
+        ds_list = []
+        for row in datasets:
+            cols_info = json.loads(row['columns_info']) if row['columns_info'] else {}
+            col_names = ', '.join(list(cols_info.keys())[:5])
+            if len(cols_info) > 5:
+                col_names += f" (and {len(cols_info) - 5} more)"
+            ds_list.append(
+                f"- '{row['name']}' (ID: {row['id']}, {row['row_count']} rows, {row['column_count']} cols)\n" +
+                f"  Columns: {col_names}\n" +
+                f"  Under: {row['parent_name']}"
+            )
+        context_parts.append("Available Datasets:\n" + "\n".join(ds_list))
+
+    if metrics_count > 0:
+        context_parts.append(f"Weekly Metrics: {metrics_count} records available")
+
+    if not context_parts:
+        return EMPTY_CONTEXT
+
+    return "\n\n".join(context_parts)
+
+
+# ============================================================================
+# LISTEN/NOTIFY
+# ============================================================================
+
+async def start_listener():
+    """Listen for change notifications on a dedicated connection.
+
+    The connection sits outside the pool because LISTEN holds it for the
+    lifetime of the process.
+    """
+    global _listener_conn
+    if _listener_conn is not None:
+        return
+
+    _listener_conn = await asyncpg.connect(get_database_url())
+    await _listener_conn.add_listener(NOTIFY_CHANNEL, invalidate_system_context)
+    _listener_conn.add_termination_listener(_on_listener_lost)
+    print(f"Listening for {NOTIFY_CHANNEL} notifications")
+
+
+def _on_listener_lost(conn):
+    global _listener_conn
+    _listener_conn = None
+    invalidate_system_context()
+    print("System context listener connection lost; relying on TTL expiry")
+
+
+async def stop_listener():
+    global _listener_conn
+    if _listener_conn is not None:
+        conn, _listener_conn = _listener_conn, None
+        conn.remove_termination_listener(_on_listener_lost)
+        await conn.close()
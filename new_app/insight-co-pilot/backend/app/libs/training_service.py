@@ -0,0 +1,274 @@
+"""Process-pool training service for CPU-bound model fits.
+
+Prophet's Stan optimisation holds the CPU for seconds. Run inside an
+`async def`, it freezes the event loop and with it every streaming chat on
+the worker. TrainingService runs such functions in separate processes.
+
+- Each worker slot owns a single-process ProcessPoolExecutor. A job that
+  times out or is cancelled while running has its process killed and its
+  slot replaced, so abandoned fits do not keep burning a core.
+- At most TRAINING_QUEUE_DEPTH jobs are queued or running. submit raises
+  TrainingQueueFull beyond that, so callers can shed load instead of piling
+  up work.
+- Every job has an id, and its status can be polled until it finishes:
+  queued, running, succeeded, failed, cancelled or timed_out. Finished jobs
+  are kept for TRAINING_JOB_RETENTION lookups.
+
+Configuration (environment variables):
+    TRAINING_WORKERS: worker processes (default: CPU count - 1, at least 1)
+    TRAINING_QUEUE_DEPTH: most queued plus running jobs (default 64)
+    TRAINING_JOB_TIMEOUT_SECONDS: default per-job run time limit (default 300)
+    TRAINING_JOB_RETENTION: finished jobs kept for status polling (default 500)
+
+Functions and arguments are sent to the workers by pickling, so they must
+be importable module-level functions.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import multiprocessing
+import os
+import time
+import uuid
+
+TRAINING_WORKERS = int(os.environ.get("TRAINING_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+TRAINING_QUEUE_DEPTH = int(os.environ.get("TRAINING_QUEUE_DEPTH", 64))
+TRAINING_JOB_TIMEOUT_SECONDS = float(os.environ.get("TRAINING_JOB_TIMEOUT_SECONDS", 300))
+TRAINING_JOB_RETENTION = int(os.environ.get("TRAINING_JOB_RETENTION", 500))
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled", "timed_out")
+
+
+class TrainingQueueFull(RuntimeError):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class TrainingJobError(RuntimeError):
+    """Raised when awaiting a job that did not succeed."""
+
+
+def new_executor() -> ProcessPoolExecutor:
+    # spawn: forking a process with a running event loop and asyncpg pool is unsafe
+    return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+
+def kill_executor(executor: ProcessPoolExecutor):
+    """Stop an executor without waiting for its running job."""
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.kill()
+
+
+class TrainingJob:
+    """One function call queued for, or running on, a worker process."""
+
+    def __init__(self, label: str, timeout: float):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.timeout = timeout
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def finish(self, status: str, result: Any = None, error: Optional[str] = None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+
+    async def wait(self) -> Any:
+        """Await the job and return its result.
+
+        Raises:
+            TrainingJobError: if the job failed, timed out or was cancelled
+        """
+        if self.task is not None:
+            # Shielded so a caller giving up does not cancel a job others may poll
+            await asyncio.shield(self.task)
+        if self.status != "succeeded":
+            raise TrainingJobError(self.error or f"Training job {self.status}")
+        return self.result
+
+    def as_dict(self, include_result: bool = True) -> dict:
+        now = self.finished_at or time.time()
+        job = {
+            "id": self.id,
+            "label": self.label,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "queued_seconds": round((self.started_at or now) - self.submitted_at, 3),
+            "run_seconds": round(now - self.started_at, 3) if self.started_at else None,
+            "error": self.error,
+        }
+        if include_result and self.status == "succeeded":
+            job["result"] = self.result
+        return job
+
+
+class TrainingService:
+    """Bounded queue of CPU-bound jobs executed on worker processes."""
+
+    def __init__(
+        self,
+        workers: int = TRAINING_WORKERS,
+        queue_depth: int = TRAINING_QUEUE_DEPTH,
+        timeout: float = TRAINING_JOB_TIMEOUT_SECONDS,
+        retention: int = TRAINING_JOB_RETENTION
+    ):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.retention = retention
+        self.jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._slots: Optional[asyncio.Queue] = None
+        self._executors: List[ProcessPoolExecutor] = []
+        self.completed = 0
+        self.rejected = 0
+
+    def _ensure_slots(self):
+        # Created lazily so the queue binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Queue()
+            for index in range(self.workers):
+                self._executors.append(new_executor())
+                self._slots.put_nowait(index)
+
+    def active_jobs(self) -> int:
+        return sum(1 for job in self.jobs.values() if not job.finished)
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        label: Optional[str] = None,
+        timeout: Optional[float] = None,
+        after: Optional[Callable[[Any], Awaitable[Any]]] = None
+    ) -> TrainingJob:
+        """Queue fn(*args) for a worker process.
+
+        Args:
+            fn: Picklable module-level function
+            args: Picklable arguments
+            label: Human-readable job description
+            timeout: Run time limit in seconds, excluding time spent queued
+            after: Coroutine applied to fn's return value in the API process,
+                for work such as persisting the result; its return value
+                becomes the job result
+
+        Raises:
+            TrainingQueueFull: if TRAINING_QUEUE_DEPTH jobs are already queued or running
+        """
+        if self.active_jobs() >= self.queue_depth:
+            self.rejected += 1
+            raise TrainingQueueFull(f"Training queue is full ({self.queue_depth} jobs)")
+
+        self._ensure_slots()
+        job = TrainingJob(label or getattr(fn, "__name__", "job"), timeout or self.timeout)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, fn, args, after))
+        self._prune()
+        return job
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **options: Any) -> Any:
+        """Submit a job and wait for its result."""
+        return await self.submit(fn, *args, **options).wait()
+
+    async def _run(self, job: TrainingJob, fn, args, after):
+        slot = None
+        try:
+            slot = await self._slots.get()
+            job.status = "running"
+            job.started_at = time.time()
+            loop = asyncio.get_running_loop()
+            try:
+                async with asyncio.timeout(job.timeout):
+                    result = await loop.run_in_executor(self._executors[slot], fn, *args)
+            except (TimeoutError, asyncio.CancelledError):
+                self._replace_executor(slot)
+                raise
+            if after is not None:
+                result = await after(result)
+            job.finish("succeeded", result=result)
+        except TimeoutError:
+            job.finish("timed_out", error=f"Training job exceeded {job.timeout:g}s")
+        except asyncio.CancelledError:
+            job.finish("cancelled", error="Training job was cancelled")
+        except Exception as e:
+            job.finish("failed", error=str(e) or type(e).__name__)
+        finally:
+            if slot is not None:
+                self._slots.put_nowait(slot)
+            self.completed += 1
+
+    def _replace_executor(self, slot: int):
+        kill_executor(self._executors[slot])
+        self._executors[slot] = new_executor()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.retention)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False when it has already finished."""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    def stats(self) -> dict:
+        statuses: Dict[str, int] = {}
+        for job in self.jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "active": self.active_jobs(),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "jobs": statuses,
+        }
+
+    async def shutdown(self):
+        """Cancel outstanding jobs and stop the worker processes."""
+        tasks = [job.task for job in self.jobs.values() if job.task and not job.finished]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for executor in self._executors:
+            kill_executor(executor)
+        self._executors = []
+        self._slots = None
+
+
+_service: Optional[TrainingService] = None
+
+
+def get_training_service() -> TrainingService:
+    global _service
+    if _service is None:
+        _service = TrainingService()
+    return _service
+
+
+async def shutdown_training_service():
+    global _service
+    if _service is not None:
+        await _service.shutdown()
+        _service = None
@@ -0,0 +1,125 @@
+"""
+Intent Classifier Benchmark
+Scores app.libs.intent_classifier against the labelled queries in
+intent_labels.jsonl and reports accuracy, misroutes and per-query latency as
+JSON, next to the substring elif chain it replaced.
+
+Run from the backend directory:
+
+    python benchmarks/intent_benchmark.py
+
+Fail when accuracy or latency regress:
+
+    python benchmarks/intent_benchmark.py --min-accuracy 0.9 --max-p99-us 1000
+"""
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.libs.intent_classifier import IntentClassifier
+
+DEFAULT_LABELS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_labels.jsonl")
+
+
+def legacy_classify(query: str) -> str:
+    """The substring elif chain AgentWorkflow.classify_intent used before."""
+    user_query = query.lower()
+    if any(word in user_query for word in ["show", "list", "get", "fetch", "what data", "available", "datasets"]):
+        return "data_fetcher"
+    if any(word in user_query for word in ["compare", "comparison", "versus", "vs", "difference between"]):
+        return "comparison_analyzer"
+    if any(word in user_query for word in ["forecast", "predict", "projection", "future", "next quarter", "next year"]):
+        return "model_trainer"
+    if any(word in user_query for word in ["trend", "pattern", "insight", "analyze"]):
+        return "insights_analyzer"
+    if any(word in user_query for word in ["what if", "scenario", "simulate", "impact", "growth rate"]):
+        return "scenario_modeler"
+    if any(word in user_query for word in ["explore", "statistics", "summary", "describe", "profile"]):
+        return "data_explorer"
+    if any(word in user_query for word in ["visualize", "plot", "chart", "graph", "show me a"]):
+        return "visualizer"
+    if any(word in user_query for word in ["create", "add", "new", "delete", "remove", "update"]):
+        return "crud_manager"
+    return "none"
+
+
+def load_labels(path: str) -> List[Dict[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(classify: Callable[[str], str], labels: List[Dict[str, str]], repeats: int) -> Dict[str, Any]:
+    """Accuracy and latency of one classifier over the labelled set"""
+    misroutes = []
+    latencies_us = []
+
+    for example in labels:
+        predicted = classify(example["query"])
+        if predicted != example["agent"]:
+            misroutes.append({"query": example["query"], "expected": example["agent"], "predicted": predicted})
+
+        for _ in range(repeats):
+            start = time.perf_counter()
+            classify(example["query"])
+            latencies_us.append((time.perf_counter() - start) * 1e6)
+
+    latencies_us.sort()
+    return {
+        "accuracy": round(1 - len(misroutes) / len(labels), 4),
+        "misroutes": misroutes,
+        "latency_us": {
+            "mean": round(statistics.fmean(latencies_us), 2),
+            "p50": round(latencies_us[len(latencies_us) // 2], 2),
+            "p99": round(latencies_us[min(int(len(latencies_us) * 0.99), len(latencies_us) - 1)], 2),
+            "max": round(latencies_us[-1], 2),
+        },
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the chat intent classifier")
+    parser.add_argument("--labels", default=DEFAULT_LABELS, help="JSONL file of {query, agent} records")
+    parser.add_argument("--repeats", type=int, default=200, help="Timed runs per query")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--min-accuracy", type=float, help="Exit 1 if accuracy falls below this")
+    parser.add_argument("--max-p99-us", type=float, help="Exit 1 if p99 latency exceeds this")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    labels = load_labels(args.labels)
+
+    classifier = IntentClassifier()
+    report = {
+        "examples": len(labels),
+        "classifier": evaluate(lambda query: classifier.classify(query)["agent"], labels, args.repeats),
+        "legacy": evaluate(legacy_classify, labels, args.repeats),
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    result = report["classifier"]
+    failed = False
+    if args.min_accuracy is not None and result["accuracy"] < args.min_accuracy:
+        print(f"Accuracy {result['accuracy']} below {args.min_accuracy}", file=sys.stderr)
+        failed = True
+    if args.max_p99_us is not None and result["latency_us"]["p99"] > args.max_p99_us:
+        print(f"p99 latency {result['latency_us']['p99']}us above {args.max_p99_us}us", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
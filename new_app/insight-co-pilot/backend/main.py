@@ -2,11 +2,15 @@ import os
 import pathlib
 import json
 import dotenv
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, APIRouter, Depends
 
 dotenv.load_dotenv()
 
 from databutton_app.mw.auth_mw import AuthConfig, get_authorized_user
+from app.libs.database import create_pool, close_pool, pool_stats
+from app.libs.system_context import start_listener, stop_listener
+from app.libs.training_service import shutdown_training_service
 
 
 def get_router_config() -> dict:
@@ -74,11 +78,40 @@ def get_firebase_config() -> dict | None:
     return None
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared database pool on startup; stop training workers and close the pool on shutdown."""
+    try:
+        await create_pool()
+    except Exception as e:
+        # Requests retry pool creation lazily, so a database outage at boot is not fatal
+        print(f"Database pool creation failed: {e}")
+    try:
+        await start_listener()
+    except Exception as e:
+        # The system context cache falls back to TTL expiry
+        print(f"System context listener failed to start: {e}")
+    yield
+    await shutdown_training_service()
+    await stop_listener()
+    await close_pool()
+
+
 def create_app() -> FastAPI:
     """Create the app. This is called by uvicorn with the factory option to construct the app object."""
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
     app.include_router(import_api_routers())
 
+    @app.get("/health/db")
+    def database_health() -> dict:
+        return pool_stats()
+
+    @app.get("/health/workflows")
+    def workflow_cache_health() -> dict:
+        # Imported lazily: API modules load with error isolation in import_api_routers
+        from app.libs.agent_workflow import workflow_cache_stats
+        return workflow_cache_stats()
+
     for route in app.routes:
         if hasattr(route, "methods"):
             for method in route.methods:
@@ -0,0 +1,90 @@
+-- Support for the cached chat system context (app/libs/system_context.py).
+--
+-- 1. table_row_counts keeps an incrementally maintained row count so the
+--    context never runs COUNT(*) over weekly_metrics.
+-- 2. Statement-level triggers send a system_context_changed notification
+--    whenever a table that feeds the context is written.
+--
+-- Safe to re-run.
+
+CREATE TABLE IF NOT EXISTS table_row_counts (
+    table_name TEXT PRIMARY KEY,
+    row_count BIGINT NOT NULL DEFAULT 0
+);
+
+-- Seed from the current contents; the triggers below keep it in sync
+INSERT INTO table_row_counts (table_name, row_count)
+SELECT 'weekly_metrics', COUNT(*) FROM weekly_metrics
+ON CONFLICT (table_name) DO UPDATE SET row_count = EXCLUDED.row_count;
+
+-- Transition tables let one trigger call account for a whole bulk statement
+CREATE OR REPLACE FUNCTION count_inserted_rows() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE table_row_counts
+    SET row_count = row_count + (SELECT COUNT(*) FROM new_rows)
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION count_deleted_rows() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE table_row_counts
+    SET row_count = row_count - (SELECT COUNT(*) FROM old_rows)
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION reset_row_count() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE table_row_counts SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS weekly_metrics_count_insert ON weekly_metrics;
+CREATE TRIGGER weekly_metrics_count_insert
+    AFTER INSERT ON weekly_metrics
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_inserted_rows();
+
+DROP TRIGGER IF EXISTS weekly_metrics_count_delete ON weekly_metrics;
+CREATE TRIGGER weekly_metrics_count_delete
+    AFTER DELETE ON weekly_metrics
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_deleted_rows();
+
+DROP TRIGGER IF EXISTS weekly_metrics_count_truncate ON weekly_metrics;
+CREATE TRIGGER weekly_metrics_count_truncate
+    AFTER TRUNCATE ON weekly_metrics
+    FOR EACH STATEMENT EXECUTE FUNCTION reset_row_count();
+
+-- Change notifications. Postgres folds identical notifications raised in the
+-- same transaction, so a bulk insert wakes listeners once.
+CREATE OR REPLACE FUNCTION notify_system_context_changed() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('system_context_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS business_units_notify_context ON business_units;
+CREATE TRIGGER business_units_notify_context
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON business_units
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_system_context_changed();
+
+DROP TRIGGER IF EXISTS lobs_notify_context ON lobs;
+CREATE TRIGGER lobs_notify_context
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON lobs
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_system_context_changed();
+
+DROP TRIGGER IF EXISTS datasets_notify_context ON datasets;
+CREATE TRIGGER datasets_notify_context
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON datasets
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_system_context_changed();
+
+DROP TRIGGER IF EXISTS weekly_metrics_notify_context ON weekly_metrics;
+CREATE TRIGGER weekly_metrics_notify_context
+    AFTER INSERT OR DELETE OR TRUNCATE ON weekly_metrics
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_system_context_changed();
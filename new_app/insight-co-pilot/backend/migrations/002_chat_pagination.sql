@@ -0,0 +1,17 @@
+-- Indexes for keyset pagination in the chat API (app/apis/chat/__init__.py).
+--
+-- GET /chat/sessions pages on (updated_at, session_id) newest first, and
+-- GET /chat/sessions/{id} pages a session's messages on (created_at, id).
+-- Both queries are served by an index range scan that stops after one page.
+--
+-- CONCURRENTLY avoids blocking chat writes while the indexes build, so run
+-- this file outside a transaction block (e.g. plain psql -f). Safe to re-run.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS chat_sessions_updated_at_idx
+    ON chat_sessions (updated_at DESC, session_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS chat_messages_session_created_idx
+    ON chat_messages (session_id, created_at, id);
+
+-- Refresh the planner statistics that back the estimated session total
+ANALYZE chat_sessions;
@@ -0,0 +1,39 @@
+-- Tables of the Postgres LangGraph checkpointer (app/libs/checkpointer.py).
+--
+-- workflow_checkpoints holds each thread's newest checkpoints; older ones are
+-- pruned as new ones are stored, and idle threads are swept by created_at.
+-- workflow_checkpoint_writes holds pending writes and goes with its checkpoint.
+--
+-- Apply before running with CHECKPOINTER=postgres (the default). Safe to re-run.
+
+CREATE TABLE IF NOT EXISTS workflow_checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    checkpoint_type TEXT NOT NULL,
+    checkpoint BYTEA NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BYTEA NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+
+CREATE INDEX IF NOT EXISTS workflow_checkpoints_created_at_idx
+    ON workflow_checkpoints (created_at);
+
+CREATE TABLE IF NOT EXISTS workflow_checkpoint_writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    value_type TEXT NOT NULL,
+    value BYTEA NOT NULL,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx),
+    FOREIGN KEY (thread_id, checkpoint_ns, checkpoint_id)
+        REFERENCES workflow_checkpoints (thread_id, checkpoint_ns, checkpoint_id)
+        ON DELETE CASCADE
+);
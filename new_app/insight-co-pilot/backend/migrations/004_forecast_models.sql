@@ -0,0 +1,18 @@
+-- Trained forecast models of the model store (app/libs/model_store.py).
+--
+-- One row per (lob_id, metric_name) series: the newest fitted Prophet model,
+-- the fingerprint of the data it was trained on, and its predictions keyed by
+-- horizon. A refit replaces the row.
+--
+-- Apply before running with MODEL_STORE=postgres (the default). Safe to re-run.
+
+CREATE TABLE IF NOT EXISTS forecast_models (
+    lob_id INTEGER NOT NULL,
+    metric_name TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    model_json TEXT NOT NULL,
+    predictions JSONB NOT NULL DEFAULT '{}',
+    trained_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (lob_id, metric_name)
+);
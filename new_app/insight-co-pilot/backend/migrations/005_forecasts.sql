@@ -0,0 +1,23 @@
+-- Persisted batch forecasts (app/libs/batch_forecast.py).
+--
+-- POST /forecasting/batch writes every series' predictions under the run's
+-- run_id. forecasts_series_idx serves the newest run of one series for
+-- GET /forecasting/forecasts/{lob_id}/{metric_name}.
+--
+-- Safe to re-run.
+
+CREATE TABLE IF NOT EXISTS forecasts (
+    run_id TEXT NOT NULL,
+    lob_id INTEGER NOT NULL,
+    metric_name TEXT NOT NULL,
+    week_date DATE NOT NULL,
+    yhat DOUBLE PRECISION NOT NULL,
+    yhat_lower DOUBLE PRECISION,
+    yhat_upper DOUBLE PRECISION,
+    model_type TEXT NOT NULL DEFAULT 'prophet',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (run_id, lob_id, metric_name, week_date)
+);
+
+CREATE INDEX IF NOT EXISTS forecasts_series_idx
+    ON forecasts (lob_id, metric_name, created_at DESC);
@@ -0,0 +1,74 @@
+"""Tests for ModelTrainerAgent's model-type dispatch in app/libs/agents.py.
+
+The database-backed helpers the agent calls are replaced with in-memory
+fakes, so the fast forecasters run for real without a database.
+"""
+
+import asyncio
+import contextlib
+from datetime import date, timedelta
+
+import pytest
+
+from app.libs import agents
+from app.libs.agents import ModelTrainerAgent
+
+SERIES = [(date(2024, 1, 7) + timedelta(weeks=i), 100.0 + 2 * i) for i in range(40)]
+
+
+@pytest.fixture
+def series_db(monkeypatch):
+    @contextlib.asynccontextmanager
+    async def acquire():
+        yield None
+
+    async def resolve_metric(lob_id, metric_name):
+        return {"metric_name": metric_name or "orders"}
+
+    async def fetch_series(conn, lob_id, metric_name):
+        return SERIES
+
+    monkeypatch.setattr(agents, "acquire", acquire)
+    monkeypatch.setattr(agents, "resolve_metric", resolve_metric)
+    monkeypatch.setattr(agents, "fetch_series", fetch_series)
+
+
+def train(params):
+    return asyncio.run(ModelTrainerAgent().execute(params))
+
+
+@pytest.mark.parametrize("model_type", ["holt_winters", "seasonal_naive", "moving_average", "ets"])
+def test_fast_model_types_forecast_through_the_agent(series_db, model_type):
+    result = train({"lob_id": 1, "metric_name": "orders", "model_type": model_type, "periods": 4})
+
+    assert result.get("success"), result
+    assert result["metric_name"] == "orders"
+    assert result["training_samples"] == len(SERIES)
+    assert len(result["predictions"]) == 4
+
+
+def test_unknown_model_type_lists_the_available_ones(series_db):
+    result = train({"lob_id": 1, "metric_name": "orders", "model_type": "arima"})
+
+    assert "not yet implemented" in result["error"]
+
+
+@pytest.mark.parametrize("periods", [0, -2, "4"])
+def test_invalid_periods_are_rejected_before_training(series_db, periods):
+    result = train({"lob_id": 1, "metric_name": "orders", "model_type": "holt_winters", "periods": periods})
+
+    assert "periods must be" in result["error"]
+
+
+def test_auto_selection_trains_the_selected_fast_model(series_db, monkeypatch):
+    async def select_model(lob_id, metric_name):
+        return {"model_type": "holt_winters", "reason": "Lowest backtest SMAPE (1.2)"}
+
+    monkeypatch.setattr(agents, "select_model", select_model)
+
+    result = train({"lob_id": 1, "periods": 6})
+
+    assert result.get("success"), result
+    assert result["model_type"] == "holt_winters"
+    assert result["model_selection"] == "Lowest backtest SMAPE (1.2)"
+    assert len(result["predictions"]) == 6
@@ -0,0 +1,68 @@
+"""Tests for fold layout and scoring in app/libs/backtesting.py."""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.libs.backtesting import BACKTEST_MIN_TRAIN, backtest_model, fold_origins, score_forecasts
+
+
+def test_fold_origins_end_at_the_last_horizon():
+    assert fold_origins(100, folds=4, horizon=8) == [68, 76, 84, 92]
+
+
+def test_fold_origins_drop_folds_with_too_little_training_data():
+    length = BACKTEST_MIN_TRAIN + 10
+
+    assert fold_origins(length, folds=4, horizon=8) == [length - 8]
+    assert fold_origins(BACKTEST_MIN_TRAIN + 7, folds=4, horizon=8) == []
+
+
+def test_score_forecasts_perfect_forecast_scores_zero():
+    actuals = np.array([[1.0, 2.0, 3.0]])
+
+    scores = score_forecasts(actuals, actuals)
+
+    for name in ("mae", "rmse", "mape", "smape"):
+        assert scores[name][0] == 0
+
+
+def test_score_forecasts_known_values():
+    scores = score_forecasts([2.0, 4.0], [3.0, 2.0])
+
+    assert scores["mae"] == pytest.approx(1.5)
+    assert scores["rmse"] == pytest.approx(np.sqrt(2.5))
+    assert scores["mape"] == pytest.approx((0.5 + 0.5) / 2 * 100)
+    assert scores["smape"] == pytest.approx((2 / 5 + 4 / 6) / 2 * 100)
+
+
+def test_score_forecasts_skips_zero_actuals():
+    scores = score_forecasts([0.0, 0.0, 2.0], [0.0, 1.0, 1.0])
+
+    # MAPE only averages the non-zero actual; sMAPE skips the all-zero point
+    assert scores["mape"] == pytest.approx(50.0)
+    assert scores["smape"] == pytest.approx((2.0 + 2 / 3) / 2 * 100)
+    assert np.isnan(score_forecasts([0.0], [0.0])["smape"])
+
+
+def test_score_forecasts_reduces_over_several_axes():
+    actuals = np.ones((3, 4))
+    forecasts = np.stack([actuals, actuals + 1])
+
+    scores = score_forecasts(actuals, forecasts, axis=(-2, -1))
+
+    assert scores["mae"].tolist() == [0.0, 1.0]
+
+
+def test_backtest_model_forecasts_each_fold_from_its_origin():
+    start = date(2022, 1, 2)
+    series = [(start + timedelta(weeks=i), 50 + 3.0 * i) for i in range(60)]
+    origins = fold_origins(len(series), folds=3, horizon=5)
+
+    result = backtest_model("holt_winters", series, origins, 5)
+
+    forecasts = np.array(result["forecasts"])
+    actuals = np.stack([[value for _, value in series[origin:origin + 5]] for origin in origins])
+    assert forecasts.shape == (3, 5)
+    assert np.allclose(forecasts, actuals)
@@ -0,0 +1,92 @@
+"""Tests for the NumPy forecasters in app/libs/forecasters.py."""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.libs.forecasters import FORECASTERS, Z_80, forecast, resolve_model_type
+
+
+def weekly(values):
+    start = date(2024, 1, 7)
+    return [(start + timedelta(weeks=i), float(value)) for i, value in enumerate(values)]
+
+
+@pytest.mark.parametrize("model_type", list(FORECASTERS))
+def test_constant_series_forecasts_the_constant(model_type):
+    yhat, half_width, _ = FORECASTERS[model_type](np.full(60, 250.0), 8)
+
+    assert np.allclose(yhat, 250.0)
+    assert np.allclose(half_width, 0.0)
+
+
+def test_holt_winters_extends_a_linear_trend():
+    y = 10 + 2.5 * np.arange(40)
+
+    yhat, _, params = FORECASTERS["holt_winters"](y, 6)
+
+    assert np.allclose(yhat, y[-1] + 2.5 * np.arange(1, 7))
+    assert not params["seasonal"]
+
+
+def test_holt_winters_interval_follows_the_damped_trend_variance():
+    y = 50 + 1.5 * np.arange(60) + np.random.default_rng(4).normal(0, 3, 60)
+
+    _, half_width, params = FORECASTERS["holt_winters"](y, 3)
+
+    alpha, beta, phi = params["alpha"], params["beta"], params["phi"]
+    c1 = alpha * (1 + beta * phi)
+    c2 = alpha * (1 + beta * (phi + phi ** 2))
+    sigma = half_width[0] / Z_80
+    assert half_width[1] == pytest.approx(Z_80 * sigma * np.sqrt(1 + c1 ** 2))
+    assert half_width[2] == pytest.approx(Z_80 * sigma * np.sqrt(1 + c1 ** 2 + c2 ** 2))
+
+
+def test_seasonal_naive_repeats_the_last_season():
+    season = np.arange(52, dtype=float)
+    y = np.concatenate([season, season + 100])
+
+    yhat, _, params = FORECASTERS["seasonal_naive"](y, 60)
+
+    assert np.array_equal(yhat[:52], season + 100)
+    assert np.array_equal(yhat[52:], season[:8] + 100)
+    assert params["season_length"] == 52
+
+
+def test_moving_average_window_leaves_residuals_on_short_series():
+    yhat, half_width, params = FORECASTERS["moving_average"](np.array([1.0, 3.0, 2.0, 5.0, 4.0]), 3)
+
+    assert params["window"] == 2
+    assert np.allclose(yhat, 4.5)
+    assert np.all(np.diff(half_width) > 0)
+
+
+def test_forecast_returns_weekly_predictions_after_the_last_week():
+    series = weekly(100 + np.arange(30))
+
+    result = forecast("ets", series, 3)
+
+    assert result["model_type"] == "holt_winters"
+    assert [p["ds"] for p in result["predictions"]] == ["2024-08-04", "2024-08-11", "2024-08-18"]
+    for p in result["predictions"]:
+        assert p["yhat_lower"] <= p["yhat"] <= p["yhat_upper"]
+
+
+@pytest.mark.parametrize("model_type", list(FORECASTERS))
+@pytest.mark.parametrize("periods", [0, -1])
+def test_forecast_rejects_horizons_below_one(model_type, periods):
+    with pytest.raises(ValueError, match="periods must be at least 1"):
+        forecast(model_type, weekly(range(20)), periods)
+
+
+def test_forecast_rejects_short_series():
+    with pytest.raises(ValueError, match="Insufficient data"):
+        forecast("moving_average", weekly([1, 2, 3]), 4)
+
+
+def test_resolve_model_type_maps_aliases():
+    assert resolve_model_type("Exponential Smoothing") == "holt_winters"
+    assert resolve_model_type("Simple Moving Average") == "moving_average"
+    assert resolve_model_type("snaive") == "seasonal_naive"
+    assert resolve_model_type("prophet") == "prophet"
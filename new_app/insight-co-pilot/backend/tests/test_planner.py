@@ -0,0 +1,38 @@
+"""Tests for clause splitting and plan building in app/libs/planner.py."""
+
+import pytest
+
+from app.libs.intent_classifier import classify_intent
+from app.libs.planner import build_plan, split_clauses
+
+
+def plan_agents(query):
+    return [step["agent"] for step in build_plan(query, classify_intent(query))]
+
+
+@pytest.mark.parametrize("query", [
+    "compare Phone and Chat",
+    "difference between Phone and Chat",
+    "list datasets and business units",
+])
+def test_and_inside_a_single_request_does_not_split(query):
+    assert split_clauses(query) == [query]
+
+
+def test_single_intent_query_with_and_is_one_step():
+    assert plan_agents("what is the difference between Phone and Chat") == ["comparison_analyzer"]
+
+
+def test_and_before_a_new_intent_splits():
+    assert split_clauses("compare Phone and Chat and forecast next quarter") == [
+        "compare Phone and Chat",
+        "forecast next quarter",
+    ]
+    assert plan_agents("compare Phone vs Chat and forecast next quarter") == [
+        "comparison_analyzer",
+        "model_trainer",
+    ]
+
+
+def test_explicit_conjunctions_always_split():
+    assert split_clauses("show revenue and then forecast") == ["show revenue", "forecast"]
@@ -0,0 +1,101 @@
+"""Tests for the vectorized scenario engine in app/libs/scenario_engine.py."""
+
+import numpy as np
+import pytest
+
+from app.libs.scenario_engine import (
+    SCENARIO_MAX_GRID,
+    estimate_dynamics,
+    project_grid,
+    sensitivity,
+    simulate_paths,
+    summarize_paths,
+)
+
+
+def test_project_grid_compounds_every_combination():
+    values = project_grid([100, 200], [0.0, 0.1], [1, 2])
+
+    assert values.shape == (2, 2, 2)
+    assert values[1, 1, 1] == pytest.approx(200 * 1.1 ** 2)
+    assert np.allclose(values[:, 0, :], [[100, 100], [200, 200]])
+
+
+def test_project_grid_rejects_oversized_grids():
+    with pytest.raises(ValueError, match="limit"):
+        project_grid(np.ones(SCENARIO_MAX_GRID + 1), [0.1], [1])
+
+
+def test_sensitivity_applies_each_change_to_each_baseline():
+    assert np.allclose(sensitivity([100, 50], [-0.1, 0.2]), [[90, 120], [45, 60]])
+
+
+def test_paths_without_volatility_compound_exactly():
+    paths = simulate_paths(100, 0.02, 0.0, 5, paths=10, seed=1)
+
+    assert np.allclose(paths, 100 * 1.02 ** np.arange(1, 6))
+
+
+def test_seeded_monte_carlo_mean_matches_closed_form():
+    paths = simulate_paths(100, 0.01, 0.05, 12, paths=50000, seed=7)
+
+    assert paths[:, -1].mean() == pytest.approx(100 * 1.01 ** 12, rel=0.005)
+    assert np.array_equal(paths, simulate_paths(100, 0.01, 0.05, 12, paths=50000, seed=7))
+
+
+def test_summarize_paths_orders_percentile_bands():
+    summary = summarize_paths(simulate_paths(100, 0.0, 0.05, 4, paths=2000, seed=3), 100, target=110)
+
+    final = summary["projections"][-1]
+    assert final["p5"] < final["p25"] < final["p50"] < final["p75"] < final["p95"]
+    assert 0 < summary["probability_below_baseline"] < 1
+    assert 0 < summary["probability_reaching_target"] < 1
+
+
+def test_constant_growth_has_that_growth_and_no_volatility():
+    dynamics = estimate_dynamics(100 * 1.03 ** np.arange(20))
+
+    assert dynamics["growth_rate"] == pytest.approx(0.03)
+    assert dynamics["volatility"] == pytest.approx(0.0, abs=1e-12)
+    assert dynamics["weeks"] == 19
+
+
+def test_growth_rate_is_the_arithmetic_mean_weekly_change():
+    # Log changes alternate +0.1 and -0.1: the median path is flat, but the
+    # mean weekly change is cosh(0.1) - 1
+    changes = np.tile([0.1, -0.1], 1000)
+    values = 100 * np.exp(np.concatenate(([0.0], np.cumsum(changes))))
+
+    dynamics = estimate_dynamics(values)
+
+    assert dynamics["growth_rate"] == pytest.approx(np.cosh(0.1) - 1, rel=0.01)
+
+
+def test_monte_carlo_from_history_keeps_the_historical_mean_growth():
+    rng = np.random.default_rng(11)
+    drift, volatility = 0.004, 0.08
+    values = 100 * np.exp(np.cumsum(rng.normal(drift, volatility, 5000)))
+    dynamics = estimate_dynamics(values)
+
+    paths = simulate_paths(1000, dynamics["growth_rate"], dynamics["volatility"], 12, paths=50000, seed=5)
+
+    expected = 1000 * np.exp(12 * (drift + volatility ** 2 / 2))
+    assert paths[:, -1].mean() == pytest.approx(expected, rel=0.02)
+
+
+@pytest.mark.parametrize("gap", [0.0, -3.0, np.nan])
+def test_gaps_do_not_become_changes_across_non_adjacent_weeks(gap):
+    values = 100 * 1.02 ** np.arange(30)
+    values[[10, 20, 21]] = gap
+
+    dynamics = estimate_dynamics(values)
+
+    assert dynamics["growth_rate"] == pytest.approx(0.02)
+    assert dynamics["volatility"] == pytest.approx(0.0, abs=1e-12)
+    assert dynamics["weeks"] == 29 - 5
+    assert dynamics["last_value"] == pytest.approx(values[-1])
+
+
+def test_dynamics_need_two_changes_between_positive_weeks():
+    assert "error" in estimate_dynamics([5.0, 0.0, 6.0, -1.0, 7.0, 8.0])
+    assert "error" not in estimate_dynamics([5.0, 0.0, 6.0, 7.0, 8.0])
@@ -0,0 +1,74 @@
+"""Tests for compute_features and candidate_models in app/libs/series_features.py."""
+
+import numpy as np
+import pytest
+
+from app.libs.series_features import candidate_models, compute_features
+
+
+def test_linear_series_is_all_trend():
+    features = compute_features(5 + 2.0 * np.arange(30))
+
+    assert features["length"] == 30
+    assert features["trend_strength"] == pytest.approx(1.0)
+    assert features["trend_slope"] == pytest.approx(2.0)
+    assert features["seasonal_autocorrelation"] is None
+
+
+def test_constant_series_has_no_trend_or_volatility():
+    features = compute_features(np.full(20, 7.0))
+
+    assert features["trend_strength"] == 0.0
+    assert features["volatility"] == 0.0
+    assert features["intermittency"] == 0.0
+
+
+def test_yearly_cycle_is_seasonal_after_two_years():
+    t = np.arange(156)
+    y = 100 + 20 * np.sin(2 * np.pi * t / 52)
+
+    features = compute_features(y)
+
+    assert features["seasonal_autocorrelation"] > 0.5
+    assert compute_features(y[:103])["seasonal_autocorrelation"] is None
+
+
+def test_intermittency_is_the_share_of_zero_weeks():
+    features = compute_features(np.array([0.0, 3.0, 0.0, 5.0, 0.0, 0.0, 4.0, 2.0]))
+
+    assert features["intermittency"] == 0.5
+
+
+def features(**overrides):
+    base = {
+        "length": 120,
+        "trend_strength": 0.1,
+        "trend_slope": 0.0,
+        "seasonal_autocorrelation": None,
+        "intermittency": 0.0,
+        "volatility": 0.1,
+    }
+    return {**base, **overrides}
+
+
+def models(candidates):
+    return [model for model, _ in candidates]
+
+
+def test_intermittent_series_prefers_moving_average():
+    assert models(candidate_models(features(intermittency=0.4)))[0] == "moving_average"
+
+
+def test_stable_series_skips_prophet():
+    candidates = models(candidate_models(features()))
+
+    assert candidates[0] == "moving_average"
+    assert "prophet" not in candidates
+    assert "seasonal_naive" in candidates
+
+
+def test_trend_and_seasonality_add_prophet_last():
+    candidates = models(candidate_models(features(trend_strength=0.8, seasonal_autocorrelation=0.6)))
+
+    assert candidates[0] == "holt_winters"
+    assert candidates[-1] == "prophet"
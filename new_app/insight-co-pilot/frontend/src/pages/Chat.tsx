@@ -6,6 +6,8 @@ import { ScrollArea } from '@/components/ui/scroll-area';
 import { Card } from '@/components/ui/card';
 import { SettingsDialog } from 'components/SettingsDialog';
 import Plot from 'react-plotly.js';
+import ReactMarkdown from 'react-markdown';
+import remarkGfm from 'remark-gfm';
 
 interface Message {
   role: 'user' | 'assistant';
@@ -66,54 +68,80 @@ export default function Chat() {
       }
 
       let assistantMessage = '';
-      let currentSessionId = sessionId;
-      
+      let plotlyChart: any = null;
+      let buffer = '';
+
       // Add empty assistant message that we'll update
       setMessages(prev => [...prev, { role: 'assistant', content: '' }]);
 
-      while (true) {
-        const { done, value } = await reader.read();
-        if (done) break;
-
-        const chunk = decoder.decode(value, { stream: true });
-        
-        // Check if chunk contains session ID
-        if (chunk.startsWith('SESSION_ID:')) {
-          const newSessionId = chunk.replace('SESSION_ID:', '').trim();
-          if (newSessionId) {
-            currentSessionId = newSessionId;
-            setSessionId(newSessionId);
-          }
-          continue;
-        }
-        
-        assistantMessage += chunk;
-        
-        // Update the last message (assistant's response)
+      const updateAssistantMessage = () => {
+        const content = assistantMessage;
+        const chart = plotlyChart;
         setMessages(prev => {
           const newMessages = [...prev];
-          
-          // Extract Plotly chart if present
-          let textContent = assistantMessage;
-          let plotlyChart = null;
-          
-          const chartMatch = assistantMessage.match(/\[PLOTLY_CHART\](.*?)\[\/PLOTLY_CHART\]/s);
-          if (chartMatch) {
-            try {
-              plotlyChart = JSON.parse(chartMatch[1]);
-              textContent = assistantMessage.replace(/\[PLOTLY_CHART\].*?\[\/PLOTLY_CHART\]/s, '').trim();
-            } catch (e) {
-              console.error('Failed to parse Plotly chart:', e);
-            }
-          }
-          
           newMessages[newMessages.length - 1] = {
             role: 'assistant',
-            content: textContent,
-            plotlyChart: plotlyChart
+            content,
+            plotlyChart: chart
           };
           return newMessages;
         });
+      };
+
+      // Server-sent events: "event: <name>\ndata: <json>\n\n"
+      const handleEvent = (rawEvent: string) => {
+        let eventName = 'message';
+        const dataLines: string[] = [];
+        for (const line of rawEvent.split('\n')) {
+          if (line.startsWith('event:')) {
+            eventName = line.slice(6).trim();
+          } else if (line.startsWith('data:')) {
+            dataLines.push(line.slice(5).trimStart());
+          }
+        }
+        if (dataLines.length === 0) return;
+
+        let data: any;
+        try {
+          data = JSON.parse(dataLines.join('\n'));
+        } catch (e) {
+          console.error('Failed to parse stream event:', e);
+          return;
+        }
+
+        switch (eventName) {
+          case 'session':
+            if (data.session_id) {
+              setSessionId(data.session_id);
+            }
+            break;
+          case 'token':
+            assistantMessage += data.text;
+            updateAssistantMessage();
+            break;
+          case 'chart':
+            plotlyChart = data.config;
+            updateAssistantMessage();
+            break;
+          case 'error':
+            assistantMessage = data.message;
+            updateAssistantMessage();
+            break;
+        }
+      };
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary = buffer.indexOf('\n\n');
+        while (boundary !== -1) {
+          handleEvent(buffer.slice(0, boundary));
+          buffer = buffer.slice(boundary + 2);
+          boundary = buffer.indexOf('\n\n');
+        }
       }
     } catch (error) {
       console.error('Chat error:', error);
@@ -212,7 +240,13 @@ export default function Chat() {
                             : 'bg-slate-800 text-slate-100 border border-slate-700'
                         }`}
                       >
-                        <p className="text-sm leading-relaxed whitespace-pre-wrap">{message.content}</p>
+                        {message.role === 'assistant' ? (
+                          <div className="text-sm leading-relaxed space-y-2 [&_table]:w-full [&_table]:border-collapse [&_th]:border [&_th]:border-slate-600 [&_th]:px-2 [&_th]:py-1 [&_th]:text-left [&_td]:border [&_td]:border-slate-700 [&_td]:px-2 [&_td]:py-1 [&_ul]:list-disc [&_ul]:pl-5">
+                            <ReactMarkdown remarkPlugins={[remarkGfm]}>{message.content}</ReactMarkdown>
+                          </div>
+                        ) : (
+                          <p className="text-sm leading-relaxed whitespace-pre-wrap">{message.content}</p>
+                        )}
                       </div>
                       {message.plotlyChart && (
                         <div className="bg-slate-800 border border-slate-700 rounded-xl p-4">